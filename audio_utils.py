@@ -1,9 +1,34 @@
 """
 Утилиты для работы с аудио
 """
+import mmap
 import wave
+import struct
 from pathlib import Path
 
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+# Шаг увеличения файла при записи через mmap (байт)
+MMAP_GROW_BYTES = 8 * 1024 * 1024
+# Формат хранения голосов
+VOICE_SAMPLE_RATE = 24000
+# Размер блока при потоковом декодировании (кадров)
+DECODE_BLOCK_FRAMES = 65536
+
+# Параметры оптимизации референса: анализ энергии по кадрам
+PROMPT_FRAME_MS = 20
+PROMPT_SILENCE_DB = -40.0  # порог тишины относительно самого громкого кадра
+PROMPT_PAD_MS = 150  # запас тишины по краям речи
+PROMPT_MIN_TRIM_SECONDS = 0.3  # меньшая обрезка не имеет смысла
+PROMPT_CLIP_PENALTY = 5.0  # штраф за кадр с клиппингом
+PROMPT_BOUNDARY_BONUS = 2.0  # бонус за начало и конец окна в паузе
+
+
+class UnsupportedAudioError(Exception):
+    """Формат не поддерживается встроенным декодером"""
+
 
 def get_audio_duration(file_path):
     """
@@ -39,4 +64,242 @@ def get_voice_accuracy_info(voice_file, optimal_duration=15.0):
     Получение информации о точности голоса из файла
     """
     duration = get_audio_duration(voice_file)
-    return calculate_voice_accuracy(duration, optimal_duration)
\ No newline at end of file
+    return calculate_voice_accuracy(duration, optimal_duration)
+
+
+class StreamingWavWriter:
+    """
+    Потоковая запись WAV: кадры дописываются в файл по мере генерации,
+    заголовок RIFF обновляется после каждой записи, поэтому даже при сбое
+    на диске остается корректный частичный файл.
+    """
+
+    def __init__(self, file_path, sample_rate, channels=1, sample_format="float32", use_mmap=False):
+        if sample_format not in ("float32", "pcm16"):
+            raise ValueError(f"Неподдерживаемый формат: {sample_format}")
+
+        self.file_path = Path(file_path)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.sample_width = 4 if sample_format == "float32" else 2
+        self.use_mmap = use_mmap
+        self.frames_written = 0
+
+        # Файл может быть жесткой ссылкой (например, на запись кэша) - создаем новый
+        self.file_path.unlink(missing_ok=True)
+        self._file = open(self.file_path, "w+b")
+        self._mmap = None
+        self._write_header()
+        self._data_start = self._file.tell()
+        self._data_bytes = 0
+
+    def write(self, samples):
+        """Дописывание кадров (numpy массив или тензор, значения в [-1, 1])"""
+        if hasattr(samples, "detach"):
+            samples = samples.detach().cpu().numpy()
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.channels == 1:
+            samples = samples.reshape(-1)
+        elif samples.ndim == 2 and samples.shape[0] == self.channels:
+            samples = samples.T
+        samples = np.ascontiguousarray(samples)
+
+        if self.sample_format == "pcm16":
+            data = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        else:
+            data = samples.astype("<f4").tobytes()
+
+        if self.use_mmap:
+            self._write_mmap(data)
+        else:
+            self._file.seek(self._data_start + self._data_bytes)
+            self._file.write(data)
+
+        self._data_bytes += len(data)
+        self.frames_written = self._data_bytes // (self.sample_width * self.channels)
+        self._update_sizes()
+
+    def close(self):
+        """Завершение записи и финальное исправление заголовка"""
+        if self._file is None:
+            return
+        self._update_sizes()
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        self._file.truncate(self._data_start + self._data_bytes)
+        self._file.close()
+        self._file = None
+
+    @property
+    def duration(self):
+        return self.frames_written / float(self.sample_rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_mmap(self, data):
+        end = self._data_start + self._data_bytes + len(data)
+        if self._mmap is None or end > len(self._mmap):
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.flush()
+            self._file.truncate(max(end, self._data_start + self._data_bytes + MMAP_GROW_BYTES))
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+        start = self._data_start + self._data_bytes
+        self._mmap[start:end] = data
+
+    def _write_header(self):
+        is_float = self.sample_format == "float32"
+        block_align = self.channels * self.sample_width
+        fmt_chunk = struct.pack(
+            "<HHIIHH", WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM,
+            self.channels, self.sample_rate, self.sample_rate * block_align,
+            block_align, self.sample_width * 8
+        )
+        if is_float:
+            fmt_chunk += struct.pack("<H", 0)
+
+        self._file.write(b"RIFF" + struct.pack("<I", 0) + b"WAVE")
+        self._file.write(b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk)
+        self._fact_offset = None
+        if is_float:
+            # Для float формата требуется чанк fact с числом кадров
+            self._fact_offset = self._file.tell() + 8
+            self._file.write(b"fact" + struct.pack("<II", 4, 0))
+        self._data_size_offset = self._file.tell() + 4
+        self._file.write(b"data" + struct.pack("<I", 0))
+
+    def _update_sizes(self):
+        riff_size = self._data_start - 8 + self._data_bytes
+        values = [(4, riff_size), (self._data_size_offset, self._data_bytes)]
+        if self._fact_offset is not None:
+            values.append((self._fact_offset, self.frames_written))
+
+        for offset, value in values:
+            packed = struct.pack("<I", min(value, 0xFFFFFFFF))
+            if self._mmap is not None:
+                self._mmap[offset:offset + 4] = packed
+            else:
+                self._file.seek(offset)
+                self._file.write(packed)
+        if self._mmap is None:
+            self._file.flush()
+
+
+def is_voice_format(file_path, sample_rate=VOICE_SAMPLE_RATE):
+    """Проверка, что файл уже WAV PCM16 моно с нужной частотой"""
+    try:
+        with wave.open(str(file_path), 'rb') as wav_file:
+            return (wav_file.getnchannels() == 1 and wav_file.getsampwidth() == 2
+                    and wav_file.getframerate() == sample_rate)
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def convert_to_voice_wav(input_path, output_path, sample_rate=VOICE_SAMPLE_RATE, check_cancelled=None):
+    """
+    Потоковое декодирование и ресемплинг в WAV PCM16 моно без запуска ffmpeg.
+    Если формат не поддерживается (или нет soundfile/soxr) - UnsupportedAudioError.
+    """
+    try:
+        import soundfile as sf
+        import soxr
+    except ImportError as e:
+        raise UnsupportedAudioError(str(e))
+
+    try:
+        source = sf.SoundFile(str(input_path))
+    except (RuntimeError, TypeError) as e:
+        raise UnsupportedAudioError(str(e))
+
+    with source:
+        resampler = None
+        if source.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(source.samplerate, sample_rate, 1, dtype="float32")
+
+        try:
+            with StreamingWavWriter(output_path, sample_rate, sample_format="pcm16") as writer:
+                for block in source.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype="float32", always_2d=True):
+                    if check_cancelled:
+                        check_cancelled()
+                    mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+                    if resampler is not None:
+                        mono = resampler.resample_chunk(mono)
+                    writer.write(mono)
+                if resampler is not None:
+                    writer.write(resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        except RuntimeError as e:
+            # Ошибка декодирования посреди файла (например, неполная поддержка кодека)
+            raise UnsupportedAudioError(str(e))
+
+
+def find_best_prompt_window(samples, sample_rate, optimal_duration=15.0):
+    """
+    Поиск лучшего фрагмента референса: обрезка тишины по краям и выбор окна
+    оптимальной длительности с наибольшей долей речи и без клиппинга.
+    Возвращает (начало, конец) в отсчетах.
+    """
+    hop = int(sample_rate * PROMPT_FRAME_MS / 1000)
+    n_frames = len(samples) // hop
+    if n_frames == 0:
+        return 0, len(samples)
+
+    frames = samples[:n_frames * hop].reshape(n_frames, hop).astype(np.float64)
+    db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    voiced = db > db.max() + PROMPT_SILENCE_DB
+    if not voiced.any():
+        return 0, len(samples)
+
+    voiced_frames = np.flatnonzero(voiced)
+    pad = PROMPT_PAD_MS // PROMPT_FRAME_MS
+    first = max(voiced_frames[0] - pad, 0)
+    last = min(voiced_frames[-1] + pad + 1, n_frames)
+
+    window = int(round(optimal_duration * 1000 / PROMPT_FRAME_MS))
+    if last - first <= window:
+        start, end = first, last
+    else:
+        # Сумма оценок кадров в каждом окне через кумулятивную сумму
+        clipped = np.max(np.abs(frames), axis=1) >= 0.99
+        frame_scores = voiced[first:last] - PROMPT_CLIP_PENALTY * clipped[first:last]
+        cumulative = np.concatenate(([0.0], np.cumsum(frame_scores)))
+        scores = cumulative[window:] - cumulative[:-window]
+
+        # Окно лучше начинать и заканчивать в паузе, чтобы не резать слова
+        starts = np.arange(first, last - window + 1)
+        # Сумма булевых массивов numpy - логическое ИЛИ, поэтому паузы считаются как целые
+        boundary_pauses = (~voiced[starts]).astype(int) + (~voiced[starts + window - 1]).astype(int)
+        scores = scores + PROMPT_BOUNDARY_BONUS * boundary_pauses
+
+        start = first + int(np.argmax(scores))
+        end = start + window
+
+    end_sample = len(samples) if end >= n_frames else end * hop
+    return start * hop, end_sample
+
+
+def optimize_voice_prompt(input_path, output_path, optimal_duration=15.0):
+    """
+    Запись оптимизированного референса (WAV PCM16 моно) в output_path.
+    Возвращает False, если обрезка не требуется и файл не создан.
+    """
+    with wave.open(str(input_path), 'rb') as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            return False
+        sample_rate = wav_file.getframerate()
+        samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+
+    samples = samples.astype(np.float32) / 32768.0
+    start, end = find_best_prompt_window(samples, sample_rate, optimal_duration)
+    if len(samples) - (end - start) < PROMPT_MIN_TRIM_SECONDS * sample_rate:
+        return False
+
+    with StreamingWavWriter(output_path, sample_rate, sample_format="pcm16") as writer:
+        writer.write(samples[start:end])
+    return True
@@ -0,0 +1,179 @@
+"""
+Бэкенды выполнения модели: eager PyTorch, torch.compile и ONNX Runtime.
+Артефакты компиляции и экспорта хранятся на диске с ключом по версии модели.
+"""
+import os
+import inspect
+import logging
+import threading
+from pathlib import Path
+
+import torch
+
+from performance import BACKEND_EAGER, BACKEND_COMPILE, BACKEND_ONNX
+
+BACKEND_CACHE_DIR = Path("cache") / "backends"
+ONNX_OPSET = 17
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_dir(backend):
+    """Папка артефактов бэкенда для текущих версий модели и torch"""
+    from result_cache import model_version
+
+    key = f"chatterbox-{model_version()}_torch-{torch.__version__}".replace("+", "_")
+    path = BACKEND_CACHE_DIR / key / backend
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def apply_backend(model, backend, device):
+    """Подготовка загруженной модели к выполнению выбранным бэкендом (на месте)"""
+    if backend == BACKEND_COMPILE:
+        compile_model(model)
+    elif backend == BACKEND_ONNX:
+        use_onnx_decoder(model, device)
+    elif backend != BACKEND_EAGER:
+        raise ValueError(f"Неизвестный бэкенд: {backend}")
+    return model
+
+
+def compile_model(model):
+    """
+    torch.compile для шага трансформера T3 и оценщика декодера S3Gen.
+    Компилируется только forward, поэтому хуки прогресса остаются вне графа.
+    Кэш графов Inductor хранится в папке артефактов, повторный запуск не компилирует заново.
+    """
+    cache_dir = artifact_dir(BACKEND_COMPILE)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(cache_dir.resolve()))
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+
+    for module in (model.t3.tfmr, model.s3gen.flow.decoder.estimator):
+        module.forward = torch.compile(module.forward, dynamic=True)
+
+
+def use_onnx_decoder(model, device):
+    """Замена оценщика декодера S3Gen сессией ONNX Runtime"""
+    import onnxruntime  # noqa: F401 - проверяем наличие до замены модуля
+
+    decoder = model.s3gen.flow.decoder
+    path = artifact_dir(BACKEND_ONNX) / "s3gen_flow_estimator.onnx"
+    decoder.estimator = OnnxModule(decoder.estimator, path, device)
+
+
+class OnnxModule(torch.nn.Module):
+    """
+    Модуль, выполняющий граф ONNX вместо исходного модуля.
+    Граф экспортируется при первом вызове по реальным входам и сохраняется на диск;
+    при ошибке экспорта или выполнения используется исходный модуль.
+    """
+
+    def __init__(self, module, onnx_path, device):
+        super().__init__()
+        self.module = module
+        self.onnx_path = Path(onnx_path)
+        self.session_device = device
+        self.input_names = list(inspect.signature(module.forward).parameters)
+        self._session = None
+        self._failed = False
+        self._lock = threading.Lock()
+        if self.onnx_path.exists():
+            try:
+                self._session = self._create_session()
+            except Exception:
+                # Поврежденный артефакт экспортируется заново при первом вызове
+                self.onnx_path.unlink(missing_ok=True)
+
+    @property
+    def dtype(self):
+        """Тип данных исходного модуля: chatterbox приводит входы оценщика к estimator.dtype"""
+        if hasattr(self.module, "dtype"):
+            return self.module.dtype
+        return next(self.module.parameters()).dtype
+
+    @property
+    def device(self):
+        """Устройство исходного модуля"""
+        if hasattr(self.module, "device"):
+            return self.module.device
+        return next(self.module.parameters()).device
+
+    def forward(self, *args, **kwargs):
+        inputs = self._bind(args, kwargs)
+        if self._failed:
+            return self.module(**inputs)
+
+        with self._lock:
+            if self._session is None:
+                try:
+                    self._export(inputs)
+                    self._session = self._create_session()
+                except Exception as e:
+                    logger.warning("ONNX: экспорт %s не удался, используется PyTorch: %s", self.onnx_path.name, e)
+                    self._failed = True
+                    return self.module(**inputs)
+
+        feeds = {
+            name: value.detach().float().cpu().numpy()
+            for name, value in inputs.items() if name in self._session_inputs
+        }
+        try:
+            output = self._session.run(None, feeds)[0]
+        except Exception as e:
+            # Граф не подходит для этих входов (формы, типы): дальше только PyTorch
+            logger.warning("ONNX: выполнение %s не удалось, используется PyTorch: %s", self.onnx_path.name, e)
+            self._failed = True
+            return self.module(**inputs)
+        reference = next(v for v in inputs.values() if isinstance(v, torch.Tensor))
+        return torch.from_numpy(output).to(device=reference.device, dtype=reference.dtype)
+
+    def _bind(self, args, kwargs):
+        bound = dict(zip(self.input_names, args))
+        bound.update(kwargs)
+        # Необязательные входы (None) в граф не попадают
+        return {name: value for name, value in bound.items() if isinstance(value, torch.Tensor)}
+
+    def _export(self, inputs):
+        names = list(inputs)
+        dynamic_axes = {}
+        for name, value in inputs.items():
+            axes = {0: "batch"}
+            if value.dim() >= 3:
+                axes[value.dim() - 1] = "time"
+            dynamic_axes[name] = axes
+        dynamic_axes["output"] = {0: "batch", 2: "time"}
+
+        tmp_path = self.onnx_path.with_name(self.onnx_path.name + ".tmp")
+        with torch.inference_mode(False), torch.no_grad():
+            example = tuple(value.clone() for value in inputs.values())
+            torch.onnx.export(
+                _KeywordAdapter(self.module, names), example, str(tmp_path),
+                input_names=names, output_names=["output"],
+                dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET,
+            )
+        tmp_path.replace(self.onnx_path)
+
+    def _create_session(self):
+        import onnxruntime as ort
+
+        providers = ["CPUExecutionProvider"]
+        if str(self.session_device).startswith("cuda") and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(str(self.onnx_path), options, providers=providers)
+        self._session_inputs = {i.name for i in session.get_inputs()}
+        return session
+
+
+class _KeywordAdapter(torch.nn.Module):
+    """Вызов модуля с именованными входами для экспорта (позиционные аргументы -> имена)"""
+
+    def __init__(self, module, names):
+        super().__init__()
+        self.module = module
+        self.names = names
+
+    def forward(self, *args):
+        return self.module(**dict(zip(self.names, args)))
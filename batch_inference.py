@@ -0,0 +1,191 @@
+"""
+Пакетная генерация речи для нескольких фрагментов текста за один проход T3
+
+Ограничение: многоязычная модель в generate() завершает речь с помощью анализатора
+выравнивания внимания (AlignmentStreamAnalyzer): он не дает остановиться раньше конца
+текста и принудительно ставит стоп-токен при затянутом хвосте или повторах.
+Пакетное семплирование его не использует - фрагмент заканчивается по стоп-токену
+модели или по MAX_NEW_TOKENS, поэтому изредка речь может оборваться раньше
+или затянуться по сравнению с generate(). Поэтому пакетное семплирование включается
+явно (размер пакета больше 1), а результаты двух путей кэшируются под разными ключами.
+"""
+import logging
+
+import torch
+import torch.nn.functional as F
+
+# Размер пакета по умолчанию: 1 - каждый фрагмент через generate() с анализатором выравнивания
+DEFAULT_BATCH_SIZE = 1
+# Путь семплирования T3 (часть ключа кэша результатов)
+SAMPLING_GENERATE = "generate"
+SAMPLING_BATCHED = "batched"
+# Параметры семплирования (как в ChatterboxMultilingualTTS.generate)
+MAX_NEW_TOKENS = 1000
+TEMPERATURE = 0.8
+CFG_WEIGHT = 0.5
+REPETITION_PENALTY = 2.0
+MIN_P = 0.05
+TOP_P = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def sampling_path(batch_size):
+    """Путь семплирования для размера пакета"""
+    return SAMPLING_BATCHED if batch_size > 1 else SAMPLING_GENERATE
+
+
+def bucket_by_length(texts, batch_size):
+    """
+    Группировка индексов текстов в пакеты близкой длины,
+    чтобы минимизировать долю паддинга
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def _prepare_text_tokens(model, text, language):
+    from chatterbox.mtl_tts import punc_norm
+
+    hp = model.t3.hp
+    tokens = model.tokenizer.text_to_tokens(
+        punc_norm(text), language_id=language.lower() if language else None
+    ).to(model.device)
+    tokens = torch.cat([tokens, tokens], dim=0)  # пара последовательностей для CFG
+    tokens = F.pad(tokens, (1, 0), value=hp.start_text_token)
+    return F.pad(tokens, (0, 1), value=hp.stop_text_token)
+
+
+@torch.inference_mode()
+def sample_speech_tokens(model, texts, language):
+    """
+    Семплирование речевых токенов T3 для пакета текстов.
+    Входы выравниваются паддингом слева, каждая пара строк (cond/uncond)
+    соответствует одному тексту. Возвращает список тензоров токенов.
+    Конец речи - только стоп-токен модели, без анализатора выравнивания generate()
+    (см. описание модуля).
+    """
+    t3 = model.t3
+    hp = t3.hp
+    device = model.device
+    batch = len(texts)
+
+    # Эмбеддинги условий, текста и начального речевого токена для каждого текста
+    embeds = []
+    for text in texts:
+        text_tokens = _prepare_text_tokens(model, text, language)
+        speech_tokens = hp.start_speech_token * torch.ones_like(text_tokens[:, :1])
+        embed, _ = t3.prepare_input_embeds(
+            t3_cond=model.conds.t3,
+            text_tokens=text_tokens,
+            speech_tokens=speech_tokens,
+            cfg_weight=CFG_WEIGHT,
+        )
+        embeds.append(embed)
+
+    max_len = max(e.size(1) for e in embeds)
+    dim = embeds[0].size(2)
+    inputs = embeds[0].new_zeros(2 * batch, max_len, dim)
+    attention_mask = torch.zeros(2 * batch, max_len, dtype=torch.long, device=device)
+    for i, embed in enumerate(embeds):
+        inputs[2 * i:2 * i + 2, max_len - embed.size(1):] = embed
+        attention_mask[2 * i:2 * i + 2, max_len - embed.size(1):] = 1
+
+    bos_token = torch.full((1, 1), hp.start_speech_token, dtype=torch.long, device=device)
+    bos_embed = t3.speech_emb(bos_token) + t3.speech_pos_emb.get_fixed_embedding(0)
+    inputs = torch.cat([inputs, bos_embed.expand(2 * batch, -1, -1)], dim=1)
+    attention_mask = F.pad(attention_mask, (0, 1), value=1)
+    position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+    from transformers.generation.logits_process import (
+        MinPLogitsWarper, RepetitionPenaltyLogitsProcessor, TopPLogitsWarper
+    )
+    repetition_penalty = RepetitionPenaltyLogitsProcessor(penalty=REPETITION_PENALTY)
+    min_p_warper = MinPLogitsWarper(min_p=MIN_P)
+    top_p_warper = TopPLogitsWarper(top_p=TOP_P)
+
+    generated = bos_token.expand(batch, 1).clone()
+    finished = torch.zeros(batch, dtype=torch.bool, device=device)
+    lengths = torch.full((batch,), MAX_NEW_TOKENS, dtype=torch.long, device=device)
+
+    output = t3.tfmr(
+        inputs_embeds=inputs,
+        attention_mask=attention_mask,
+        position_ids=position_ids,
+        use_cache=True,
+        return_dict=True,
+    )
+    for step in range(MAX_NEW_TOKENS):
+        logits = t3.speech_head(output.last_hidden_state[:, -1, :]).view(batch, 2, -1)
+        cond, uncond = logits[:, 0, :], logits[:, 1, :]
+        logits = cond + CFG_WEIGHT * (cond - uncond)
+
+        logits = repetition_penalty(generated, logits)
+        logits = logits / TEMPERATURE
+        logits = min_p_warper(generated, logits)
+        logits = top_p_warper(generated, logits)
+        next_token = torch.multinomial(torch.softmax(logits, dim=-1), num_samples=1)
+
+        # Завершенные строки дополняются стоп-токеном
+        next_token[finished] = hp.stop_speech_token
+        is_stop = next_token.view(-1) == hp.stop_speech_token
+        lengths[is_stop & ~finished] = step
+        finished |= is_stop
+        generated = torch.cat([generated, next_token], dim=1)
+        if finished.all():
+            break
+
+        next_embed = t3.speech_emb(next_token) + t3.speech_pos_emb.get_fixed_embedding(step + 1)
+        attention_mask = F.pad(attention_mask, (0, 1), value=1)
+        position_ids = position_ids[:, -1:] + 1
+        output = t3.tfmr(
+            inputs_embeds=next_embed.repeat_interleave(2, dim=0),
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=output.past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+
+    # Отбрасываем BOS и все начиная со стоп-токена
+    return [generated[i, 1:1 + int(lengths[i])] for i in range(batch)]
+
+
+@torch.inference_mode()
+def decode_speech_tokens(model, speech_tokens):
+    """Декодирование речевых токенов в аудио через S3Gen и нанесение водяного знака"""
+    from chatterbox.models.s3tokenizer import drop_invalid_tokens
+
+    speech_tokens = drop_invalid_tokens(speech_tokens).to(model.device)
+    wav, _ = model.s3gen.inference(speech_tokens=speech_tokens, ref_dict=model.conds.gen)
+    wav = wav.squeeze(0).detach().cpu().numpy()
+    wav = model.watermarker.apply_watermark(wav, sample_rate=model.sr)
+    return torch.from_numpy(wav).unsqueeze(0)
+
+
+def generate_batch(model, texts, language, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Генерация аудио для списка текстов пакетами близкой длины.
+    Результаты возвращаются в исходном порядке текстов.
+    """
+    results = [None] * len(texts)
+    for bucket in bucket_by_length(texts, batch_size):
+        bucket_texts = [texts[i] for i in bucket]
+
+        if len(bucket) > 1:
+            try:
+                tokens = sample_speech_tokens(model, bucket_texts, language)
+            except (AttributeError, TypeError, ImportError, NotImplementedError) as e:
+                # Внутреннее API модели (другая версия chatterbox) не поддерживает пакет - генерируем по одному.
+                # Прочие ошибки (нехватка памяти, ошибки размерностей, отмена) не маскируются
+                logger.warning("Пакетная генерация недоступна, фрагменты генерируются по одному: %s", e)
+                tokens = None
+        else:
+            tokens = None
+
+        for position, index in enumerate(bucket):
+            if tokens is None:
+                results[index] = model.generate(text=bucket_texts[position], language_id=language)
+            else:
+                results[index] = decode_speech_tokens(model, tokens[position])
+    return results
@@ -0,0 +1,233 @@
+"""
+Пакетная генерация речи из манифеста без графического интерфейса
+
+Пример:
+    python batch_render.py jobs.jsonl --device cpu --output-dir output
+    python batch_render.py jobs.jsonl --format opus --bitrate 48
+
+Манифест - JSONL или CSV с полями text, voice, language, output.
+Поле voice - имя голоса из voices/ или путь к WAV файлу (пусто - голос модели по умолчанию).
+Поле output - имя файла без расширения, допустимы подпапки внутри папки результатов.
+Задание с ненайденным голосом или недопустимым именем файла считается ошибкой, остальные выполняются.
+"""
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from pathlib import Path, PurePath
+from itertools import groupby
+
+import torchaudio as ta
+
+from voice import VoiceGenerator
+from batch_inference import DEFAULT_BATCH_SIZE, sampling_path
+from text_utils import split_text_into_chunks
+from result_cache import result_cache
+from export import export_pool, export_path, default_bitrate, EXPORT_FORMATS, FORMAT_WAV
+
+VOICES_DIR = Path("voices")
+DEFAULT_LANGUAGE = "ru"
+
+
+def read_manifest(manifest_path):
+    """Чтение списка заданий из JSONL или CSV файла"""
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, encoding="utf-8", newline="") as f:
+        if manifest_path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    seen = set()
+    for number, row in enumerate(rows, 1):
+        text = (row.get("text") or "").strip()
+        output = (row.get("output") or "").strip()
+        if not text or not output:
+            raise ValueError(f"Строка {number}: поля text и output обязательны")
+        if output in seen:
+            raise ValueError(f"Строка {number}: повторяющееся имя файла '{output}'")
+        seen.add(output)
+        job = {
+            "text": text,
+            "voice": "",
+            "language": (row.get("language") or DEFAULT_LANGUAGE).strip(),
+            "output": output,
+            # Ошибка задания: выполнение пропускается, задание считается неудачным
+            "error": None,
+        }
+        try:
+            check_output_name(output)
+            job["voice"] = resolve_voice((row.get("voice") or "").strip())
+        except (ValueError, FileNotFoundError) as e:
+            job["error"] = str(e)
+        jobs.append(job)
+    return jobs
+
+
+def check_output_name(output):
+    """Имя результата должно оставаться внутри папки результатов: без абсолютного пути и '..'"""
+    path = PurePath(output.replace("\\", "/"))
+    if path.is_absolute() or path.drive or ".." in path.parts or not path.name:
+        raise ValueError(f"Недопустимое имя файла '{output}'")
+
+
+def resolve_voice(voice):
+    """Путь к файлу голоса по имени из voices/ или по пути"""
+    if not voice:
+        return ""
+    path = Path(voice)
+    if path.suffix.lower() != ".wav":
+        path = VOICES_DIR / f"{voice}.wav"
+    if not path.exists():
+        raise FileNotFoundError(f"Голос не найден: {voice}")
+    return str(path)
+
+
+def load_done(state_path):
+    """Имена уже сгенерированных файлов из журнала прогресса"""
+    if not state_path.exists():
+        return set()
+    with open(state_path, encoding="utf-8") as f:
+        return {json.loads(line)["output"] for line in f if line.strip()}
+
+
+def render_job(generator, job, output_path, batch_size, export_format=FORMAT_WAV, bitrate=None):
+    """
+    Генерация одного задания с атомарной записью результата.
+    Сжатый формат кодируется из WAV в пуле экспорта: возвращается Future кодирования (для WAV - None).
+    """
+    compressed = export_format != FORMAT_WAV
+    wav_path = output_path.with_name(output_path.stem + ".src.wav") if compressed else output_path
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_key = result_cache.key_for(job["text"], job["voice"] or None, job["language"],
+                                     performance=generator.performance, device=generator.device,
+                                     sampling=sampling_path(batch_size))
+    if result_cache.materialize(cache_key, wav_path):
+        info = ta.info(str(wav_path))
+        duration, gen_time = info.num_frames / info.sample_rate, 0.0
+    else:
+        chunks = split_text_into_chunks(job["text"])
+        audios, sr, gen_time = generator.generate_batch(chunks, job["voice"] or None, batch_size=batch_size)
+
+        tmp_path = wav_path.with_name(wav_path.stem + ".part.wav")
+        with generator.open_writer(str(tmp_path), sr) as writer:
+            for audio in audios:
+                writer.write(audio)
+        tmp_path.replace(wav_path)
+        result_cache.store(cache_key, wav_path)
+        duration = writer.duration
+
+    future = None
+    if compressed:
+        future = export_pool.export_file(wav_path, output_path, export_format, bitrate, delete_source=True)
+    return duration, gen_time, future
+
+
+def run(args):
+    jobs = read_manifest(args.manifest)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    state_path = Path(args.state) if args.state else output_dir / f".{Path(args.manifest).stem}.done.jsonl"
+    done = load_done(state_path) if args.resume else set()
+    pending = [
+        job for job in jobs
+        if not (job["output"] in done and export_path(output_dir, job["output"], args.format).exists())
+    ]
+    print(f"Заданий: {len(jobs)}, уже готово: {len(jobs) - len(pending)}, осталось: {len(pending)}")
+
+    # Группируем по языку и голосу, чтобы переиспользовать модель и условия голоса
+    pending.sort(key=lambda job: (job["language"], job["voice"]))
+    bitrate = args.bitrate or default_bitrate(args.format)
+    generators = {}
+    failed = 0
+    total_start = time.time()
+    total_audio = 0.0
+    # Кодирование завершается в потоках пула экспорта: журнал и счетчики под блокировкой
+    lock = threading.Lock()
+    encoded = []
+
+    with open(state_path, "a" if args.resume else "w", encoding="utf-8") as state:
+
+        def report(job, output_path, start, duration, gen_time, export=None, reported=None):
+            """Запись в журнал после появления итогового файла"""
+            nonlocal failed, total_audio
+            error = export.exception() if export is not None else None
+            name = job["output"] + output_path.suffix
+            try:
+                with lock:
+                    if error is not None:
+                        failed += 1
+                        print(f"[ошибка] {name}: ошибка кодирования: {error}", file=sys.stderr)
+                        return
+                    elapsed = time.time() - start
+                    total_audio += duration
+                    state.write(json.dumps({"output": job["output"], "seconds": round(elapsed, 3)},
+                                           ensure_ascii=False) + "\n")
+                    state.flush()
+                    print(f"[готово] {name}: аудио {duration:.2f} сек, генерация {gen_time:.2f} сек, "
+                          f"всего {elapsed:.2f} сек, RTF {elapsed / max(duration, 1e-9):.2f}")
+            finally:
+                if reported is not None:
+                    reported.set()
+
+        for (language, voice), group in groupby(pending, key=lambda job: (job["language"], job["voice"])):
+            generator = generators.setdefault(language, VoiceGenerator(device=args.device, language=language))
+            for job in group:
+                if job["error"]:
+                    with lock:
+                        failed += 1
+                        print(f"[ошибка] {job['output']}: {job['error']}", file=sys.stderr)
+                    continue
+                output_path = export_path(output_dir, job["output"], args.format)
+                start = time.time()
+                try:
+                    duration, gen_time, export = render_job(
+                        generator, job, output_path, args.batch_size, args.format, bitrate
+                    )
+                except Exception as e:
+                    with lock:
+                        failed += 1
+                        print(f"[ошибка] {job['output']}: {e}", file=sys.stderr)
+                    continue
+
+                if export is None:
+                    report(job, output_path, start, duration, gen_time)
+                else:
+                    # Генерация следующего задания не ждет кодирования
+                    reported = threading.Event()
+                    encoded.append(reported)
+                    export.add_done_callback(
+                        lambda future, job=job, output_path=output_path, start=start, duration=duration,
+                        gen_time=gen_time, reported=reported:
+                        report(job, output_path, start, duration, gen_time, future, reported)
+                    )
+
+        # Итог - после записи в журнал всех закодированных файлов
+        for reported in encoded:
+            reported.wait()
+
+    total_time = time.time() - total_start
+    print(f"Итого: {len(pending) - failed} файлов, {total_audio:.1f} сек аудио за {total_time:.1f} сек, ошибок: {failed}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная генерация речи из манифеста")
+    parser.add_argument("manifest", help="JSONL или CSV файл с заданиями")
+    parser.add_argument("--output-dir", default="output", help="папка для результатов")
+    parser.add_argument("--device", default="cuda", help="устройство (cuda или cpu)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="размер пакета фрагментов; больше 1 - пакетное семплирование без анализатора выравнивания")
+    parser.add_argument("--format", default=FORMAT_WAV, choices=list(EXPORT_FORMATS), help="формат результата")
+    parser.add_argument("--bitrate", type=int, help="битрейт Opus/MP3, кбит/с (по умолчанию - формата)")
+    parser.add_argument("--state", help="журнал прогресса для продолжения после перезапуска")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="начать заново, игнорируя журнал")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
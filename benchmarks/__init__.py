@@ -0,0 +1,3 @@
+"""
+Бенчмарки синтеза и импорта голосов (не тесты): python -m benchmarks.run --help
+"""
@@ -0,0 +1,144 @@
+"""
+Отчет о точности и скорости режимов производительности CPU.
+
+    python -m benchmarks.cpu_modes --stub
+    python -m benchmarks.cpu_modes --threads 4,8 --json cpu_modes.json
+
+Для каждой конфигурации (потоки, inference_mode, bfloat16, int8, бэкенд) текст
+синтезируется с одинаковым зерном и сравнивается с базовой конфигурацией
+(настройки torch по умолчанию): время, RTF, отношение длительностей,
+спектральное расхождение (дБ) и SNR при совпадении длины.
+"""
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from benchmarks.suites import PARAGRAPH_TEXT
+
+SEED = 1234
+N_FFT = 1024
+HOP = 256
+
+
+def power_spectrum(wav):
+    """Средний спектр мощности по кадрам"""
+    if len(wav) < N_FFT:
+        wav = np.pad(wav, (0, N_FFT - len(wav)))
+    n_frames = 1 + (len(wav) - N_FFT) // HOP
+    frames = np.lib.stride_tricks.as_strided(
+        wav, shape=(n_frames, N_FFT), strides=(wav.strides[0] * HOP, wav.strides[0])
+    )
+    return (np.abs(np.fft.rfft(frames * np.hanning(N_FFT), axis=1)) ** 2).mean(axis=0)
+
+
+def compare_audio(reference, candidate):
+    """Расхождение кандидата с эталоном"""
+    reference_power, candidate_power = power_spectrum(reference), power_spectrum(candidate)
+    # Общий порог 80 дБ ниже максимума, чтобы тишина между гармониками не доминировала
+    floor = max(reference_power.max(), candidate_power.max()) * 1e-8 + 1e-20
+    difference = 10 * np.log10(np.maximum(reference_power, floor) / np.maximum(candidate_power, floor))
+    result = {
+        "duration_ratio": len(candidate) / len(reference) if len(reference) else None,
+        "spectral_distance_db": float(np.sqrt(np.mean(difference ** 2))),
+        "snr_db": None,
+    }
+    if len(reference) == len(candidate):
+        noise = np.sum((reference - candidate) ** 2)
+        result["snr_db"] = float(10 * np.log10(np.sum(reference ** 2) / noise)) if noise > 0 else float("inf")
+    return result
+
+
+def default_configs(threads):
+    from performance import PerformanceConfig, BACKEND_EAGER, BACKEND_COMPILE, BACKEND_ONNX
+
+    configs = [PerformanceConfig(inference_mode=False, backend=BACKEND_EAGER)]
+    for n in threads:
+        configs += [
+            PerformanceConfig(intra_op_threads=n),
+            PerformanceConfig(intra_op_threads=n, bf16_autocast=True),
+            PerformanceConfig(intra_op_threads=n, int8_quantization=True),
+            PerformanceConfig(intra_op_threads=n, bf16_autocast=True, int8_quantization=True),
+            PerformanceConfig(intra_op_threads=n, backend=BACKEND_COMPILE),
+            PerformanceConfig(intra_op_threads=n, backend=BACKEND_ONNX),
+        ]
+    return configs
+
+
+def run_config(config, text, repeat):
+    import torch
+    from voice import VoiceGenerator, model_registry
+
+    generator = VoiceGenerator(device="cpu", performance=config)
+    generator.load_model()
+    times = []
+    audio = None
+    sr = None
+    for _ in range(repeat):
+        torch.manual_seed(SEED)
+        start = time.perf_counter()
+        audio, sr, _ = generator.generate_speech(text)
+        times.append(time.perf_counter() - start)
+    if generator.variant:
+        # Квантизованная модель больше не нужна - освобождаем память до следующей конфигурации
+        model_registry.unload("cpu", generator.variant)
+    wav = audio.squeeze().detach().float().cpu().numpy()
+    return wav, sr, float(np.median(times)), generator.last_metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Точность и скорость режимов производительности CPU")
+    parser.add_argument("--stub", action="store_true", help="модель-заглушка вместо Chatterbox")
+    parser.add_argument("--threads", default="", help="числа потоков через запятую (по умолчанию текущее)")
+    parser.add_argument("--repeat", type=int, default=2, help="повторы на конфигурацию (медиана времени)")
+    parser.add_argument("--text", default=PARAGRAPH_TEXT, help="текст для синтеза")
+    parser.add_argument("--json", help="файл для отчета JSON")
+    args = parser.parse_args(argv)
+
+    import torch
+
+    if args.stub:
+        from voice import model_registry
+        from benchmarks.stub_model import stub_loader
+        model_registry.set_loader(stub_loader)
+
+    threads = [int(n) for n in args.threads.split(",") if n.strip()] or [torch.get_num_threads()]
+    rows = []
+    reference = None
+    baseline_time = None
+    for config in default_configs(threads):
+        try:
+            wav, sr, elapsed, metrics = run_config(config, args.text, args.repeat)
+        except Exception as e:
+            rows.append({"config": config.to_dict(), "label": config.label(), "error": str(e)})
+            print(f"{config.label():<55} ошибка: {e}", file=sys.stderr)
+            continue
+        if reference is None:
+            reference, baseline_time = wav, elapsed
+        row = {
+            "config": config.to_dict(),
+            "label": config.label(),
+            "time_s": round(elapsed, 4),
+            "speedup": round(baseline_time / elapsed, 3) if elapsed else None,
+            "rtf": round(elapsed / (len(wav) / sr), 4) if len(wav) else None,
+            "tokens_per_sec": round(metrics.tokens_per_sec, 2) if metrics else None,
+        }
+        row.update(compare_audio(reference, wav))
+        rows.append(row)
+        snr = f"{row['snr_db']:.1f}" if row["snr_db"] is not None else "-"
+        print(f"{row['label']:<55} {row['time_s']:8.3f} с  x{row['speedup']:<6} RTF {row['rtf']}  "
+              f"спектр {row['spectral_distance_db']:.2f} дБ  SNR {snr}  длит. {row['duration_ratio']:.3f}",
+              file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"text_chars": len(args.text), "seed": SEED, "results": rows}, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
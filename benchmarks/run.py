@@ -0,0 +1,118 @@
+"""
+Запуск бенчмарков синтеза и импорта голосов.
+
+    python -m benchmarks.run --stub --output bench.json
+    python -m benchmarks.run --stub --compare bench.json
+
+Результаты пишутся в JSON (в stdout или в --output). С --compare результаты
+сравниваются с сохраненным базовым файлом; при ухудшении больше допуска код
+возврата 1. --stub подменяет модель детерминированной заглушкой (без весов и GPU).
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+
+# Метрики, для которых больше - лучше; остальные (время, RTF, память) - меньше лучше
+HIGHER_IS_BETTER = {"tokens_per_sec"}
+DEFAULT_TOLERANCE = 0.15
+# Абсолютные изменения меньше этих порогов не считаются регрессией (шум таймера и аллокатора)
+MIN_ABS_DELTA = {"peak_rss_mb": 16.0}
+MIN_ABS_SECONDS = 0.005
+
+
+def environment(args):
+    """Описание окружения для сравнения результатов"""
+    import os
+    import torch
+    from result_cache import model_version
+
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "cuda": torch.cuda.is_available(),
+        "model": "stub" if args.stub else model_version(),
+        "device": args.device,
+        "repeat": args.repeat,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Сравнение с базовыми результатами; возвращает (строки отчета, число регрессий)"""
+    base = {entry["name"]: entry["metrics"] for entry in baseline.get("results", [])}
+    lines = []
+    regressions = 0
+    for entry in results:
+        old_metrics = base.get(entry["name"])
+        if old_metrics is None:
+            lines.append(f"{entry['name']}: нет в базовом файле")
+            continue
+        for key, new in entry["metrics"].items():
+            old = old_metrics.get(key)
+            if old is None or new is None or not old:
+                continue
+            change = (new - old) / abs(old)
+            worse = -change if key in HIGHER_IS_BETTER else change
+            min_delta = MIN_ABS_DELTA.get(key, MIN_ABS_SECONDS if key.endswith("_s") else 0.0)
+            regressed = worse > tolerance and abs(new - old) > min_delta
+            regressions += regressed
+            mark = "РЕГРЕССИЯ" if regressed else ""
+            lines.append(f"{entry['name']:<45} {key:<16} {old:>10.4f} -> {new:>10.4f} {change:+7.1%} {mark}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки синтеза речи и импорта голосов")
+    parser.add_argument("--stub", action="store_true", help="детерминированная модель-заглушка вместо Chatterbox")
+    parser.add_argument("--device", default="cpu", help="устройство (cpu или cuda)")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов (берется медиана)")
+    parser.add_argument("--warmup", type=int, default=1, help="прогревочные прогоны синтеза")
+    parser.add_argument("--lengths", default="short,paragraph,long", help="длины текста через запятую")
+    parser.add_argument("--threads", default="", help="числа потоков torch через запятую (по умолчанию текущее)")
+    parser.add_argument("--suites", default="load,conditioning,synthesis,import", help="наборы через запятую")
+    parser.add_argument("--output", help="файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="базовый файл результатов для сравнения")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="допустимое ухудшение (доля)")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from voice import model_registry
+        from benchmarks.stub_model import stub_loader
+        model_registry.set_loader(stub_loader)
+
+    from benchmarks.suites import run_all
+
+    threads = [int(n) for n in args.threads.split(",") if n.strip()] or [None]
+    results = run_all(
+        args.device,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        lengths=[name.strip() for name in args.lengths.split(",") if name.strip()],
+        threads=threads,
+        suites=[name.strip() for name in args.suites.split(",") if name.strip()],
+    )
+    report = {"environment": environment(args), "results": results}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.tolerance)
+        print("\n".join(lines), file=sys.stderr)
+        print(f"Регрессий: {regressions}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
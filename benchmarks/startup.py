@@ -0,0 +1,105 @@
+"""
+Отчет о времени запуска: разбор -X importtime и время до интерактивного окна.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --json startup.json --budget 1.0
+
+Приложение запускается в отдельном процессе (QT_QPA_PLATFORM=offscreen) с
+AI_VOICE_STARTUP_PROFILE=1, main.py сообщает время до отрисовки окна и
+закрывается. Код возврата 1, если превышен бюджет или до окна загружен torch.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Время от запуска до интерактивного окна (секунды)
+STARTUP_BUDGET_S = 1.0
+# Модули, которые не должны загружаться до появления окна менеджера голосов
+FORBIDDEN_MODULES = ("torch", "torchaudio", "chatterbox", "transformers")
+
+
+def parse_importtime(stderr):
+    """Строки 'import time: self [us] | cumulative | имя' -> список записей"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entries.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def run_startup(timeout=60):
+    """Запуск main.py и сбор профиля"""
+    env = dict(os.environ, AI_VOICE_STARTUP_PROFILE="1")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout
+    )
+    wall = time.perf_counter() - start
+
+    report = None
+    for line in process.stdout.splitlines():
+        if line.startswith("{"):
+            report = json.loads(line)
+    if process.returncode != 0 or report is None:
+        raise RuntimeError(f"main.py завершился с кодом {process.returncode}:\n{process.stderr[-2000:]}")
+
+    imports = parse_importtime(process.stderr)
+    top_level = sorted((e for e in imports if e["depth"] == 0), key=lambda e: -e["cumulative_ms"])
+    return {
+        "startup_s": report["startup_s"],
+        "process_wall_s": wall,
+        "heavy_modules": report["heavy_modules"],
+        "import_total_ms": sum(e["cumulative_ms"] for e in top_level),
+        "top_imports": top_level[:25],
+        "forbidden_imported": sorted({e["module"].split(".")[0] for e in imports} & set(FORBIDDEN_MODULES)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Профиль запуска приложения")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_S, help="допустимое время до окна (секунды)")
+    parser.add_argument("--json", help="файл для отчета JSON")
+    parser.add_argument("--top", type=int, default=15, help="число самых медленных импортов в отчете")
+    args = parser.parse_args(argv)
+
+    result = run_startup()
+    print(f"До интерактивного окна: {result['startup_s']:.3f} с (процесс целиком {result['process_wall_s']:.3f} с)")
+    print(f"Импорты верхнего уровня: {result['import_total_ms']:.0f} мс")
+    for entry in result["top_imports"][:args.top]:
+        print(f"  {entry['cumulative_ms']:9.1f} мс  {entry['module']}")
+
+    problems = []
+    if result["forbidden_imported"]:
+        problems.append(f"до появления окна загружены: {', '.join(result['forbidden_imported'])}")
+    if result["process_wall_s"] > args.budget:
+        problems.append(f"запуск дольше бюджета {args.budget:.2f} с")
+    for problem in problems:
+        print(f"ОШИБКА: {problem}", file=sys.stderr)
+
+    if args.json:
+        result["budget_s"] = args.budget
+        result["ok"] = not problems
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Детерминированная заглушка ChatterboxMultilingualTTS для бенчмарков без весов и GPU.
+Повторяет структуру модулей (t3.tfmr, s3gen.flow.decoder.estimator, s3gen.mel2wav) и
+способ их вызова: как и chatterbox, s3gen.inference вызывает estimator.forward() и
+mel2wav.inference() напрямую, поэтому хуки прогресса и метрики этапов работают так же,
+как с настоящей моделью.
+"""
+import zlib
+import wave
+
+import numpy as np
+import torch
+from torch import nn
+
+SAMPLE_RATE = 24000
+# Частота речевых токенов S3 (токенов в секунду аудио) и токенов на символ текста
+TOKEN_RATE = 25
+TOKENS_PER_CHAR = 1.6
+MAX_NEW_TOKENS = 1000
+HIDDEN_SIZE = 512
+MEL_BINS = 80
+DECODER_STEPS = 10
+
+
+class StubT3Cond:
+    def __init__(self, speaker_emb):
+        self.speaker_emb = speaker_emb
+
+    def to(self, device):
+        return StubT3Cond(self.speaker_emb.to(device))
+
+
+class StubConditionals:
+    """Аналог Conditionals(t3, gen)"""
+
+    def __init__(self, t3, gen):
+        self.t3 = t3
+        self.gen = gen
+
+    def to(self, device):
+        return StubConditionals(self.t3.to(device), {k: v.to(device) for k, v in self.gen.items()})
+
+
+class StubT3(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.tfmr = nn.Sequential(
+            nn.Linear(HIDDEN_SIZE, HIDDEN_SIZE * 2), nn.GELU(), nn.Linear(HIDDEN_SIZE * 2, HIDDEN_SIZE)
+        )
+
+    def inference(self, prompt, n_tokens):
+        """Проход по промпту, затем по одному вызову трансформера на токен"""
+        hidden = self.tfmr(prompt)[:, -1:]
+        tokens = []
+        for _ in range(n_tokens):
+            hidden = self.tfmr(hidden)
+            tokens.append(hidden[0, 0, :MEL_BINS])
+        # Как и у настоящей T3, результат не зависит от точности вычислений внутри
+        return torch.stack(tokens, dim=-1).float()
+
+
+class StubDecoder(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.estimator = nn.Conv1d(MEL_BINS, MEL_BINS, kernel_size=3, padding=1)
+
+
+class StubFlow(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.decoder = StubDecoder()
+
+
+class StubVocoder(nn.Module):
+    """Синусоида, огибающая которой зависит от мел-признаков"""
+
+    hop = SAMPLE_RATE // TOKEN_RATE // 2
+
+    def forward(self, mel):
+        envelope = torch.sigmoid(mel.mean(dim=1, keepdim=True))
+        envelope = nn.functional.interpolate(envelope, scale_factor=self.hop, mode="linear")[:, 0]
+        t = torch.arange(envelope.shape[-1], device=mel.device) / SAMPLE_RATE
+        return 0.3 * envelope * torch.sin(2 * torch.pi * 180.0 * t)
+
+    def inference(self, speech_feat, cache_source=None):
+        """Как HiFTGenerator.inference: (аудио, источник)"""
+        return self.forward(speech_feat), None
+
+
+class StubS3Gen(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.flow = StubFlow()
+        self.mel2wav = StubVocoder()
+
+    def inference(self, speech_tokens, ref_dict):
+        """Шаги решателя через estimator.forward() и вокодер через mel2wav.inference(), как в S3Token2Wav"""
+        mel = speech_tokens.unsqueeze(0).repeat_interleave(2, dim=-1)
+        mel = mel + ref_dict["prompt_feat"]
+        for _ in range(DECODER_STEPS):
+            mel = mel + 0.1 * self.flow.decoder.estimator.forward(mel)
+        return self.mel2wav.inference(speech_feat=mel)
+
+
+class StubModel:
+    """
+    Модель-заглушка: число токенов пропорционально длине текста, на каждый токен
+    один проход небольшого трансформера, затем 10 шагов декодера и вокодер.
+    Результат зависит только от текста и голоса.
+    """
+
+    sr = SAMPLE_RATE
+
+    def __init__(self, device):
+        self.device = torch.device(device)
+        torch.manual_seed(0)
+        self.t3 = StubT3().to(self.device).eval()
+        self.s3gen = StubS3Gen().to(self.device).eval()
+        self.conds = StubConditionals(
+            StubT3Cond(torch.zeros(1, HIDDEN_SIZE, device=self.device)),
+            {"prompt_feat": torch.zeros(1, MEL_BINS, 1, device=self.device)},
+        )
+
+    @classmethod
+    def from_pretrained(cls, device):
+        return cls(device)
+
+    def prepare_conditionals(self, wav_fpath, exaggeration=0.5):
+        """Условия из спектральной огибающей референса (как будто эмбеддинг диктора)"""
+        with wave.open(str(wav_fpath), "rb") as wav_file:
+            samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype="<i2")
+        frames = samples[:len(samples) // HIDDEN_SIZE * HIDDEN_SIZE].reshape(-1, HIDDEN_SIZE)
+        spectrum = np.abs(np.fft.rfft(frames.astype(np.float32) / 32768.0, axis=1)).mean(axis=0)
+        embedding = torch.from_numpy(np.resize(spectrum, HIDDEN_SIZE).astype(np.float32))
+        self.conds = StubConditionals(
+            StubT3Cond(embedding.unsqueeze(0).to(self.device)),
+            {"prompt_feat": embedding[:MEL_BINS].view(1, MEL_BINS, 1).to(self.device)},
+        )
+
+    @torch.inference_mode()
+    def generate(self, text, language_id="ru", **kwargs):
+        generator = torch.Generator().manual_seed(zlib.crc32(f"{language_id}:{text}".encode("utf-8")))
+        n_tokens = min(max(int(len(text) * TOKENS_PER_CHAR), 1), MAX_NEW_TOKENS)
+
+        prompt = torch.randn(1, max(len(text), 1), HIDDEN_SIZE, generator=generator).to(self.device)
+        tokens = self.t3.inference(prompt + self.conds.t3.speaker_emb, n_tokens)
+
+        # S3Gen: шаги решателя и вокодер
+        wav, _ = self.s3gen.inference(speech_tokens=tokens, ref_dict=self.conds.gen)
+        return wav.detach().cpu()
+
+
+def stub_loader(device):
+    """Загрузчик для model_registry.set_loader()"""
+    return StubModel(device)
@@ -0,0 +1,239 @@
+"""
+Наборы бенчмарков: загрузка модели, синтез через VoiceGenerator и импорт голосов.
+Каждый бенчмарк возвращает список записей {"name": ..., "params": ..., "metrics": ...}.
+"""
+import time
+import shutil
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+from metrics import current_rss_mb, peak_rss_mb
+
+SHORT_TEXT = "Привет! Это короткая проверка синтеза речи."
+PARAGRAPH_TEXT = (
+    "Синтез речи превращает письменный текст в звучащую речь. Современные модели "
+    "сначала предсказывают последовательность речевых токенов, а затем декодер "
+    "превращает их в мел-спектрограмму и звуковую волну. Качество зависит от "
+    "референсной записи голоса, длины фрагментов и параметров семплирования. "
+    "Чем короче задержка до первого звука, тем естественнее ощущается диалог."
+)
+LONG_TEXT = " ".join([PARAGRAPH_TEXT] * 8)
+
+TEXTS = {"short": SHORT_TEXT, "paragraph": PARAGRAPH_TEXT, "long": LONG_TEXT}
+
+
+class RssSampler:
+    """Максимум резидентной памяти за время блока (опрос в отдельном потоке)"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, rss)
+
+
+def summarize(samples):
+    """Медиана по повторам для каждой метрики"""
+    keys = samples[0].keys()
+    return {key: round(statistics.median(s[key] for s in samples), 4) for key in keys
+            if all(s.get(key) is not None for s in samples)}
+
+
+def write_test_voice(path, seconds=12.0, sample_rate=24000, channels=1, pcm16=True):
+    """Синтетическая запись голоса: гармоники с паузами, детерминированная"""
+    import soundfile as sf
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    wav = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # Слоги по 0.25 с и паузы по 0.5 с каждые 2 с
+    wav *= (np.sin(2 * np.pi * 4 * t) > -0.3) * ((t % 2.0) < 1.5)
+    wav = (0.3 * wav / np.max(np.abs(wav))).astype(np.float32)
+    if channels > 1:
+        wav = np.repeat(wav[:, None], channels, axis=1)
+    sf.write(str(path), wav, sample_rate, subtype="PCM_16" if pcm16 else "FLOAT")
+    return Path(path)
+
+
+def bench_load(device, repeat):
+    """Время загрузки модели в реестр (модель выгружается перед каждым повтором)"""
+    from voice import VoiceGenerator, model_registry
+
+    samples = []
+    for _ in range(repeat):
+        model_registry.unload_all()
+        with RssSampler() as sampler:
+            load_time = VoiceGenerator(device=device).load_model()
+        samples.append({"load_s": load_time, "peak_rss_mb": sampler.peak_mb})
+    return [{"name": "load", "params": {"device": device}, "metrics": summarize(samples)}]
+
+
+def run_synthesis(generator, text, reference_file):
+    """Один прогон потоковой генерации: задержка первого аудио, RTF, скорость токенов"""
+    start = time.perf_counter()
+    first_audio = None
+    audio_seconds = 0.0
+    tokens = 0
+    sampling = 0.0
+    for _, _, audio, sr, _ in generator.generate_stream(text, reference_file):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+        if audio is not None:
+            audio_seconds += audio.shape[-1] / sr
+        tokens += generator.last_metrics.tokens
+        sampling += generator.last_metrics.stages["sampling"]
+    total = time.perf_counter() - start
+    return {
+        "first_audio_s": first_audio,
+        "total_s": total,
+        "audio_s": audio_seconds,
+        "rtf": total / audio_seconds if audio_seconds else None,
+        "tokens_per_sec": tokens / sampling if sampling else None,
+    }
+
+
+def bench_synthesis(device, repeat, warmup, lengths, voice_file, threads):
+    """Синтез для каждой длины текста, с голосом и без, для каждого числа потоков"""
+    import torch
+    from voice import VoiceGenerator
+    from performance import PerformanceConfig
+
+    generator = VoiceGenerator(device=device)
+    generator.load_model()
+    default_threads = torch.get_num_threads()
+    results = []
+    try:
+        for num_threads in threads:
+            # Потоки задаются режимом генерации: он применяется при каждом вызове
+            generator.performance = PerformanceConfig(intra_op_threads=num_threads)
+            for voice in ("none", "reference"):
+                reference_file = str(voice_file) if voice == "reference" else None
+                for length in lengths:
+                    text = TEXTS[length]
+                    for _ in range(warmup):
+                        run_synthesis(generator, text, reference_file)
+                    samples = []
+                    for _ in range(repeat):
+                        with RssSampler() as sampler:
+                            sample = run_synthesis(generator, text, reference_file)
+                        sample["peak_rss_mb"] = sampler.peak_mb
+                        samples.append(sample)
+                    results.append({
+                        "name": f"synthesis/{length}/{voice}/threads={num_threads}",
+                        "params": {"device": device, "text_chars": len(text), "voice": voice,
+                                   "threads": num_threads},
+                        "metrics": summarize(samples),
+                    })
+    finally:
+        torch.set_num_threads(default_threads)
+    return results
+
+
+def bench_conditioning(device, repeat, voice_file):
+    """Подготовка условий голоса: первый расчет и повторное получение из кэша"""
+    from voice import model_registry
+    from conditioning_cache import conditioning_cache
+
+    samples = []
+    with model_registry.use(device) as model:
+        for _ in range(repeat):
+            conditioning_cache.invalidate(voice_file)
+            start = time.perf_counter()
+            conditioning_cache.get(model, voice_file)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            conditioning_cache.get(model, voice_file)
+            samples.append({"cold_s": cold, "cached_s": time.perf_counter() - start})
+    return [{"name": "conditioning", "params": {"device": device}, "metrics": summarize(samples)}]
+
+
+def bench_import(repeat, workdir, files=8):
+    """Импорт голосов (VoiceImporter, как в AudioImportThread): один файл разных форматов и пакет"""
+    from voice_import import VoiceImporter
+
+    sources = workdir / "sources"
+    sources.mkdir(exist_ok=True)
+    inputs = {
+        "wav24k_mono": write_test_voice(sources / "voice24k.wav"),
+        "wav48k_stereo": write_test_voice(sources / "voice48k.wav", sample_rate=48000, channels=2, pcm16=False),
+        "flac44k_stereo": write_test_voice(sources / "voice44k.flac", seconds=40.0, sample_rate=44100, channels=2),
+    }
+
+    results = []
+    for name, source in inputs.items():
+        samples = []
+        for run in range(repeat):
+            voices_dir = workdir / f"voices_{name}_{run}"
+            voices_dir.mkdir()
+            with RssSampler() as sampler:
+                start = time.perf_counter()
+                VoiceImporter(voices_dir).import_file(source, "voice")
+                elapsed = time.perf_counter() - start
+            samples.append({"import_s": elapsed, "peak_rss_mb": sampler.peak_mb})
+            shutil.rmtree(voices_dir)
+        results.append({"name": f"import/{name}", "params": {"file": source.name}, "metrics": summarize(samples)})
+
+    samples = []
+    for run in range(repeat):
+        voices_dir = workdir / f"voices_many_{run}"
+        voices_dir.mkdir()
+        items = [(inputs["wav48k_stereo"], f"voice{i}") for i in range(files)]
+        start = time.perf_counter()
+        VoiceImporter(voices_dir).import_many(items)
+        samples.append({"import_s": time.perf_counter() - start})
+        shutil.rmtree(voices_dir)
+    results.append({"name": f"import/many={files}", "params": {"files": files}, "metrics": summarize(samples)})
+    return results
+
+
+def run_all(device, repeat=3, warmup=1, lengths=("short", "paragraph", "long"), threads=(None,),
+            suites=("load", "conditioning", "synthesis", "import")):
+    """Запуск выбранных наборов; возвращает список записей результатов"""
+    import torch
+
+    threads = [n or torch.get_num_threads() for n in threads]
+    workdir = Path(tempfile.mkdtemp(prefix="ai_voice_bench_"))
+    results = []
+    try:
+        voices_dir = workdir / "voices"
+        voices_dir.mkdir()
+        voice_file = write_test_voice(voices_dir / "reference.wav")
+
+        if "load" in suites:
+            results += bench_load(device, repeat)
+        if "conditioning" in suites:
+            results += bench_conditioning(device, repeat, voice_file)
+        if "synthesis" in suites:
+            results += bench_synthesis(device, repeat, warmup, lengths, voice_file, threads)
+        if "import" in suites:
+            results += bench_import(repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results.append({"name": "process", "params": {}, "metrics": {"peak_rss_mb": peak_rss_mb()}})
+    return results
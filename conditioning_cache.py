@@ -0,0 +1,131 @@
+"""
+Кэш условий голоса (эмбеддинг диктора, токены промпта, мел-признаки)
+"""
+import hashlib
+import threading
+from pathlib import Path
+
+# Расширение файла кэша, сохраняемого рядом с голосом в voices/
+CONDS_SUFFIX = ".conds.pt"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def conds_path_for(voice_file):
+    """Путь к файлу кэша условий для голоса"""
+    voice_file = Path(voice_file)
+    return voice_file.with_name(voice_file.stem + CONDS_SUFFIX)
+
+
+def file_content_hash(file_path):
+    """SHA-1 содержимого файла"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_conds(conds):
+    """Отдельный объект условий: generate() может подменить conds.t3"""
+    if conds is None:
+        return None
+    return type(conds)(conds.t3, conds.gen)
+
+
+class ConditioningCache:
+    """
+    Кэш условий модели для референсных голосов.
+    Ключ - путь, mtime и хэш содержимого файла; условия хранятся в памяти
+    и на диске рядом с файлом голоса, поэтому повторная генерация тем же
+    голосом не пересчитывает их.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memory = {}  # (путь, устройство) -> (хэш, условия)
+        self._hashes = {}  # путь -> (mtime_ns, размер, хэш)
+
+    def get(self, model, voice_file):
+        """Условия для голоса: из памяти, с диска или вычисленные моделью"""
+        voice_file = Path(voice_file).resolve()
+        content_hash = self.content_hash(voice_file)
+        key = (str(voice_file), str(model.device))
+
+        with self._lock:
+            cached = self._memory.get(key)
+        if cached and cached[0] == content_hash:
+            return copy_conds(cached[1])
+
+        conds = self._load(voice_file, content_hash, model.device)
+        if conds is None:
+            model.prepare_conditionals(str(voice_file))
+            conds = model.conds
+            self._save(voice_file, content_hash, conds)
+
+        with self._lock:
+            self._memory[key] = (content_hash, conds)
+        return copy_conds(conds)
+
+    def invalidate(self, voice_file):
+        """Сброс кэша голоса (при удалении или замене файла)"""
+        voice_file = Path(voice_file).resolve()
+        with self._lock:
+            self._hashes.pop(str(voice_file), None)
+            for key in [k for k in self._memory if k[0] == str(voice_file)]:
+                del self._memory[key]
+        conds_path_for(voice_file).unlink(missing_ok=True)
+
+    def content_hash(self, voice_file):
+        """Хэш содержимого, пересчитывается только при изменении mtime или размера"""
+        voice_file = Path(voice_file).resolve()
+        stat = voice_file.stat()
+        with self._lock:
+            known = self._hashes.get(str(voice_file))
+        if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return known[2]
+
+        content_hash = file_content_hash(voice_file)
+        with self._lock:
+            self._hashes[str(voice_file)] = (stat.st_mtime_ns, stat.st_size, content_hash)
+        return content_hash
+
+    @staticmethod
+    def _load(voice_file, content_hash, device):
+        conds_path = conds_path_for(voice_file)
+        if not conds_path.exists():
+            return None
+
+        import torch
+        from chatterbox.mtl_tts import Conditionals, T3Cond
+
+        try:
+            data = torch.load(conds_path, map_location="cpu", weights_only=True)
+        except Exception:
+            return None
+
+        if data.get("sha1") != content_hash or data.get("mtime_ns") != voice_file.stat().st_mtime_ns:
+            return None
+        return Conditionals(T3Cond(**data["t3"]), data["gen"]).to(device)
+
+    @staticmethod
+    def _save(voice_file, content_hash, conds):
+        import torch
+
+        conds_path = conds_path_for(voice_file)
+        tmp_path = conds_path.with_name(conds_path.name + ".tmp")
+        data = {
+            "path": str(voice_file),
+            "mtime_ns": voice_file.stat().st_mtime_ns,
+            "sha1": content_hash,
+            "t3": conds.t3.__dict__,
+            "gen": conds.gen,
+        }
+        try:
+            torch.save(data, tmp_path)
+            tmp_path.replace(conds_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+
+# Глобальный экземпляр для использования в других модулях
+conditioning_cache = ConditioningCache()
@@ -4,6 +4,8 @@
 import sys
 import io
 import re
+import time
+import threading
 from PyQt6.QtCore import QObject, pyqtSignal
 
 # Компилируем регулярные выражения один раз для производительности
@@ -13,6 +15,16 @@ PROGRESS_PATTERNS = {
     'general': re.compile(r'(\d+)%')
 }
 
+# Разделители строк: tqdm перерисовывает строку через \r
+LINE_SEPARATORS = re.compile(r'(\r\n|\r|\n)')
+
+# Максимальная частота сигналов прогресса (в секунду)
+PROGRESS_MAX_RATE = 10
+# Интервал пересылки накопленного вывода в настоящий stdout (секунды)
+FORWARD_INTERVAL = 0.05
+# Размер буфера, при котором вывод пересылается сразу
+FORWARD_BUFFER_LIMIT = 64 * 1024
+
 # Ключевые слова для быстрой проверки
 WARNING_KEYWORDS = {
     'WARNING:', 'Warning:', 'warning:',
@@ -42,7 +54,12 @@ IMPORTANT_LOG_KEYWORDS = {
 
 
 class ConsoleCapture(QObject):
-    """Перехват консольного вывода и извлечение прогресс-информации"""
+    """
+    Перехват консольного вывода и извлечение прогресс-информации.
+    Строки собираются из частичных записей; вывод пересылается в настоящий
+    stdout пакетами, а сигналы прогресса прореживаются до max_rate в секунду
+    (передается последнее значение).
+    """
     
     # Сигналы для отправки данных в UI
     progress_detected = pyqtSignal(int, str)  # процент, сообщение
@@ -51,67 +68,154 @@ class ConsoleCapture(QObject):
     error_detected = pyqtSignal(str)  # ошибка
     generation_complete = pyqtSignal()  # генерация завершена
     
-    def __init__(self):
+    def __init__(self, max_rate=PROGRESS_MAX_RATE):
         super().__init__()
         self.original_stdout = sys.stdout
         self.original_stderr = sys.stderr
         self.captured_output = io.StringIO()
+        self.max_rate = max_rate
+        self._lock = threading.Lock()
+        self._line = ""  # незавершенная строка
+        self._forward = []  # вывод, ожидающий пересылки
+        self._forward_size = 0
+        self._last_forward = 0.0
+        self._pending_progress = None  # последнее непереданное значение прогресса
+        self._last_progress_emit = 0.0
+        self._stop_event = None
+        self._flusher = None
         
+    def set_max_rate(self, max_rate):
+        """Изменение максимальной частоты сигналов прогресса"""
+        self.max_rate = max_rate
+
     def start_capture(self):
         """Начать перехват вывода"""
+        if self._flusher is not None:
+            return
         sys.stdout = self
         sys.stderr = self
+        # Отдельный поток доставляет отложенный прогресс и хвост вывода, даже если записи прекратились
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(self._stop_event,), daemon=True)
+        self._flusher.start()
         
     def stop_capture(self):
         """Остановить перехват вывода"""
         sys.stdout = self.original_stdout
         sys.stderr = self.original_stderr
+        if self._flusher is not None:
+            self._stop_event.set()
+            self._flusher.join()
+            self._flusher = None
+        self._drain(force=True)
         
     def write(self, text):
         """Перехватываем весь вывод"""
-        # Сохраняем в оригинальный поток
-        self.original_stdout.write(text)
-        self.original_stdout.flush()
-        
-        # Анализируем текст на предмет прогресс-баров и логов
-        self._analyze_output(text)
+        if not text:
+            return 0
+        with self._lock:
+            self._forward.append(text)
+            self._forward_size += len(text)
+            parts = LINE_SEPARATORS.split(self._line + text)
+            self._line = parts.pop()
+            lines = list(zip(parts[0::2], parts[1::2]))
+        # Кадр, завершенный '\r', затирается следующей строкой: анализируем только последний
+        # кадр перерисовки tqdm в пакете записи, промежуточные даже не разбираем
+        lines = [(line, separator) for number, (line, separator) in enumerate(lines)
+                 if separator != '\r' or number == len(lines) - 1]
+        for line, separator in lines:
+            self._analyze_line(line, redraw=separator == '\r')
+        if self._forward_size >= FORWARD_BUFFER_LIMIT:
+            self._forward_output()
+        return len(text)
         
     def flush(self):
-        """Обязательный метод для sys.stdout"""
-        pass
-        
-    def _analyze_output(self, text):
-        """Анализ вывода на предмет прогресс-баров и важных сообщений"""
-        lines = text.strip().split('\n')
+        """Обязательный метод для sys.stdout; пересылка идет пакетами"""
+        if time.monotonic() - self._last_forward >= FORWARD_INTERVAL:
+            self._forward_output()
+
+    def isatty(self):
+        return False
+
+    @property
+    def encoding(self):
+        return getattr(self.original_stdout, "encoding", "utf-8")
+
+    def _flush_loop(self, stop_event):
+        interval = min(FORWARD_INTERVAL, 1.0 / self.max_rate if self.max_rate else FORWARD_INTERVAL)
+        while not stop_event.wait(interval):
+            self._drain()
+
+    def _drain(self, force=False):
+        """Пересылка накопленного вывода и отложенного прогресса"""
+        self._forward_output()
+        self._emit_progress(force=force)
+
+    def _forward_output(self):
+        with self._lock:
+            if not self._forward:
+                return
+            text = "".join(self._forward)
+            self._forward.clear()
+            self._forward_size = 0
+            self._last_forward = time.monotonic()
+        try:
+            self.original_stdout.write(text)
+            self.original_stdout.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _emit_progress(self, force=False):
+        """Отправка последнего значения прогресса не чаще max_rate"""
+        now = time.monotonic()
+        with self._lock:
+            if self._pending_progress is None:
+                return
+            if not force and self.max_rate and now - self._last_progress_emit < 1.0 / self.max_rate:
+                return
+            percentage, message = self._pending_progress
+            self._pending_progress = None
+            self._last_progress_emit = now
+        self.progress_detected.emit(percentage, message)
         
-        for line in lines:
-            if not line.strip():
-                continue
-                
-            # Проверяем на завершение генерации
-            if self._is_generation_complete(line):
-                self.generation_complete.emit()
-                continue
-                
-            # Проверяем на прогресс-бары
+    def _analyze_line(self, line, redraw=False):
+        """Анализ одной строки на предмет прогресс-баров и важных сообщений"""
+        line = line.strip()
+        if not line:
+            return
+
+        # Проверяем на завершение генерации
+        if self._is_generation_complete(line):
+            self._emit_progress(force=True)
+            self.generation_complete.emit()
+            return
+
+        # Проверяем на прогресс-бары (быстрая проверка до регулярных выражений)
+        if '%' in line:
             progress_info = self._extract_progress(line)
             if progress_info:
-                self.progress_detected.emit(progress_info['percentage'], progress_info['message'])
-                continue
-                
-            # Проверяем на предупреждения
-            if self._is_warning(line):
-                self.warning_detected.emit(line)
-                continue
-                
-            # Проверяем на ошибки
-            if self._is_error(line):
-                self.error_detected.emit(line)
-                continue
-                
-            # Обычные логи
-            if self._is_important_log(line):
-                self.log_message.emit(line)
+                with self._lock:
+                    self._pending_progress = (progress_info['percentage'], progress_info['message'])
+                self._emit_progress(force=progress_info['percentage'] >= 100)
+                return
+
+        # Перерисованная строка без прогресса - промежуточный кадр
+        if redraw:
+            return
+
+        # Проверяем на предупреждения
+        if self._is_warning(line):
+            self.warning_detected.emit(line)
+            return
+            
+        # Проверяем на ошибки
+        if self._is_error(line):
+            self.error_detected.emit(line)
+            return
+            
+        # Обычные логи
+        if self._is_important_log(line):
+            self.log_message.emit(line)
                 
     def _extract_progress(self, line):
         """Извлечение информации о прогрессе из строки"""
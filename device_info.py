@@ -0,0 +1,86 @@
+"""
+Возможности устройств (CUDA) с кэшем между запусками, чтобы окно не ждало импорта torch
+"""
+import os
+import sys
+import json
+import threading
+from pathlib import Path
+
+DEVICE_CACHE_FILE = Path("cache") / "devices.json"
+
+_lock = threading.Lock()
+_capabilities = None
+
+
+def _fingerprint():
+    """Признаки окружения, при изменении которых кэш устаревает"""
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        torch_version = version("torch")
+    except PackageNotFoundError:
+        torch_version = None
+    return {
+        "python": sys.executable,
+        "torch": torch_version,
+        "cuda_visible_devices": os.environ.get("CUDA_VISIBLE_DEVICES"),
+    }
+
+
+def probe_devices():
+    """Опрос устройств через torch (медленно: импортирует torch и инициализирует CUDA)"""
+    import torch
+
+    cuda = torch.cuda.is_available()
+    return {
+        "cuda": cuda,
+        "cuda_devices": [torch.cuda.get_device_name(i) for i in range(torch.cuda.device_count())] if cuda else [],
+    }
+
+
+def device_capabilities(refresh=False):
+    """Возможности устройств: из памяти, из кэша на диске или опросом torch"""
+    global _capabilities
+    with _lock:
+        if _capabilities is not None and not refresh:
+            return dict(_capabilities)
+
+        fingerprint = _fingerprint()
+        if not refresh:
+            try:
+                with open(DEVICE_CACHE_FILE, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("fingerprint") == fingerprint:
+                    _capabilities = data["capabilities"]
+                    return dict(_capabilities)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        _capabilities = probe_devices()
+        _save(fingerprint, _capabilities)
+        return dict(_capabilities)
+
+
+def refresh_device_cache():
+    """Повторный опрос устройств (вызывается из фонового потока, когда torch уже загружен)"""
+    return device_capabilities(refresh=True)
+
+
+def cuda_available():
+    return device_capabilities()["cuda"]
+
+
+def default_device():
+    """Устройство по умолчанию: GPU при наличии CUDA"""
+    return "cuda" if cuda_available() else "cpu"
+
+
+def _save(fingerprint, capabilities):
+    tmp_path = DEVICE_CACHE_FILE.with_name(DEVICE_CACHE_FILE.name + ".tmp")
+    try:
+        DEVICE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "capabilities": capabilities}, f)
+        tmp_path.replace(DEVICE_CACHE_FILE)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,283 @@
+"""
+Экспорт результата в сжатые форматы (FLAC, Opus, MP3) в фоновом пуле потоков.
+Фрагменты передаются кодировщику по мере синтеза, итоговый файл появляется
+атомарно после завершения кодирования; генерация следующего задания его не ждет.
+"""
+import queue
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_utils import DECODE_BLOCK_FRAMES, UnsupportedAudioError
+
+FORMAT_WAV = "wav"
+FORMAT_FLAC = "flac"
+FORMAT_OPUS = "opus"
+FORMAT_MP3 = "mp3"
+
+# Формат и подтип libsndfile, кодек и контейнер ffmpeg, битрейты (кбит/с)
+EXPORT_FORMATS = {
+    FORMAT_WAV: {"label": "WAV", "bitrates": ()},
+    FORMAT_FLAC: {
+        "label": "FLAC", "sf_format": "FLAC", "sf_subtype": "PCM_16",
+        "codec": "flac", "muxer": "flac", "bitrates": (),
+    },
+    FORMAT_OPUS: {
+        "label": "Opus", "sf_format": "OGG", "sf_subtype": "OPUS",
+        "codec": "libopus", "muxer": "opus", "bitrates": (24, 32, 48, 64, 96, 128),
+        "default_bitrate": 48, "bitrate_range": (6, 256), "bitrate_mode": None,
+    },
+    FORMAT_MP3: {
+        "label": "MP3", "sf_format": "MP3", "sf_subtype": "MPEG_LAYER_III",
+        "codec": "libmp3lame", "muxer": "mp3", "bitrates": (64, 96, 128, 192, 256, 320),
+        "default_bitrate": 128, "bitrate_range": (32, 320), "bitrate_mode": "CONSTANT",
+    },
+}
+
+# Число потоков кодирования
+EXPORT_WORKERS = 2
+# Суффикс незавершенного файла
+PARTIAL_SUFFIX = ".part"
+
+_END = object()
+_ABORT = object()
+
+
+class ExportCancelled(Exception):
+    """Экспорт прерван вместе с генерацией"""
+
+
+def export_path(directory, name, export_format):
+    """Путь итогового файла с расширением формата"""
+    return Path(directory) / f"{name}.{export_format}"
+
+
+def default_bitrate(export_format):
+    return EXPORT_FORMATS[export_format].get("default_bitrate")
+
+
+def _compression_level(spec, bitrate, sample_rate):
+    """
+    libsndfile задает качество уровнем сжатия 0..1, а не битрейтом:
+    битрейт переводится в уровень линейно по диапазону кодека (приближенно)
+    """
+    low, high = spec["bitrate_range"]
+    if spec is EXPORT_FORMATS[FORMAT_MP3] and sample_rate < 32000:
+        # MPEG-2 Layer III для частот ниже 32 кГц
+        low, high = 8, 160
+    return float(np.clip((high - bitrate) / (high - low), 0.0, 1.0))
+
+
+class SoundFileEncoder:
+    """Кодирование в процессе через libsndfile (soundfile)"""
+
+    def __init__(self, path, sample_rate, export_format, bitrate=None):
+        try:
+            import soundfile as sf
+        except ImportError as e:
+            raise UnsupportedAudioError(str(e))
+
+        spec = EXPORT_FORMATS[export_format]
+        if not sf.check_format(spec["sf_format"], spec["sf_subtype"]):
+            raise UnsupportedAudioError(f"libsndfile не поддерживает {spec['label']}")
+        options = {}
+        if bitrate and spec["bitrates"]:
+            options["compression_level"] = _compression_level(spec, bitrate, sample_rate)
+            if spec["bitrate_mode"]:
+                options["bitrate_mode"] = spec["bitrate_mode"]
+        try:
+            self._file = sf.SoundFile(
+                str(path), "w", samplerate=sample_rate, channels=1,
+                format=spec["sf_format"], subtype=spec["sf_subtype"], **options
+            )
+        except (RuntimeError, TypeError) as e:
+            raise UnsupportedAudioError(str(e))
+
+    def write(self, samples):
+        self._file.write(samples)
+
+    def close(self):
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+
+
+class FfmpegEncoder:
+    """Кодирование дочерним процессом ffmpeg: кадры float32 через stdin или готовый файл source"""
+
+    def __init__(self, path, sample_rate, export_format, bitrate=None, source=None):
+        spec = EXPORT_FORMATS[export_format]
+        if source is None:
+            inputs = ['-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0']
+        else:
+            inputs = ['-i', str(source)]
+        cmd = ['ffmpeg', '-loglevel', 'error', '-y', *inputs, '-ac', '1', '-c:a', spec["codec"]]
+        if bitrate and spec["bitrates"]:
+            cmd += ['-b:a', f'{bitrate}k']
+        cmd += ['-f', spec["muxer"], str(path)]
+        try:
+            self._process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE if source is None else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg не найден")
+
+    def write(self, samples):
+        self._process.stdin.write(np.asarray(samples, dtype="<f4").tobytes())
+
+    def close(self):
+        if self._process.stdin is not None:
+            self._process.stdin.close()
+        stderr = self._process.stderr.read()
+        if self._process.wait() != 0:
+            message = stderr.decode('utf-8', errors='replace').strip().splitlines()
+            raise RuntimeError(message[-1] if message else f"ffmpeg завершился с кодом {self._process.returncode}")
+
+    def abort(self):
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+
+
+def open_encoder(path, sample_rate, export_format, bitrate=None):
+    """Кодировщик формата: в процессе через soundfile, иначе ffmpeg"""
+    try:
+        return SoundFileEncoder(path, sample_rate, export_format, bitrate)
+    except UnsupportedAudioError:
+        if shutil.which('ffmpeg') is None:
+            raise
+        return FfmpegEncoder(path, sample_rate, export_format, bitrate)
+
+
+def _to_samples(samples):
+    if hasattr(samples, "detach"):
+        samples = samples.detach().cpu().numpy()
+    return np.asarray(samples, dtype=np.float32).reshape(-1)
+
+
+class ExportStream:
+    """
+    Входной поток кодирования: write() только ставит фрагмент в очередь.
+    future завершается путем итогового файла или ошибкой кодирования.
+    """
+
+    def __init__(self, output_path, sample_rate, export_format, bitrate=None):
+        self.output_path = Path(output_path)
+        self.sample_rate = sample_rate
+        self.export_format = export_format
+        self.bitrate = bitrate
+        self.future = None
+        self._queue = queue.Queue()
+
+    def write(self, samples):
+        # После ошибки кодировщика данные больше не копятся
+        if self.future is None or not self.future.done():
+            self._queue.put(_to_samples(samples))
+
+    def close(self):
+        """Все фрагменты переданы"""
+        self._queue.put(_END)
+
+    def abort(self):
+        """Прерывание: незавершенный файл удаляется"""
+        self._queue.put(_ABORT)
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class ExportPool:
+    """
+    Пул фонового кодирования. Поток пула занят потоком экспорта, пока тот открыт,
+    поэтому число одновременно кодируемых файлов ограничено EXPORT_WORKERS.
+    """
+
+    def __init__(self, max_workers=EXPORT_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def open(self, output_path, sample_rate, export_format, bitrate=None):
+        """Кодирование по мере поступления фрагментов (см. ExportStream)"""
+        stream = ExportStream(output_path, sample_rate, export_format, bitrate)
+        stream.future = self._submit(self._encode_stream, stream)
+        return stream
+
+    def export_file(self, source_path, output_path, export_format, bitrate=None, delete_source=False):
+        """Кодирование готового WAV; возвращает Future с путем итогового файла"""
+        return self._submit(self._encode_file, Path(source_path), Path(output_path),
+                            export_format, bitrate, delete_source)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export")
+            return self._executor.submit(fn, *args)
+
+    def _encode_stream(self, stream):
+        partial_path = stream.output_path.with_name(stream.output_path.name + PARTIAL_SUFFIX)
+        encoder = None
+        try:
+            encoder = open_encoder(partial_path, stream.sample_rate, stream.export_format, stream.bitrate)
+            while True:
+                item = stream._queue.get()
+                if item is _ABORT:
+                    raise ExportCancelled()
+                if item is _END:
+                    break
+                encoder.write(item)
+            encoder, finished = None, encoder
+            finished.close()
+            partial_path.replace(stream.output_path)
+            return stream.output_path
+        except BaseException:
+            if encoder is not None:
+                encoder.abort()
+            partial_path.unlink(missing_ok=True)
+            raise
+
+    def _encode_file(self, source_path, output_path, export_format, bitrate, delete_source):
+        partial_path = output_path.with_name(output_path.name + PARTIAL_SUFFIX)
+        try:
+            try:
+                import soundfile as sf
+            except ImportError:
+                sf = None
+
+            if sf is None:
+                encoder = FfmpegEncoder(partial_path, None, export_format, bitrate, source=source_path)
+                encoder.close()
+            else:
+                with sf.SoundFile(str(source_path)) as source:
+                    encoder = open_encoder(partial_path, source.samplerate, export_format, bitrate)
+                    try:
+                        for block in source.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype="float32", always_2d=True):
+                            encoder.write(block.mean(axis=1) if block.shape[1] > 1 else block[:, 0])
+                    except BaseException:
+                        encoder.abort()
+                        raise
+                    encoder.close()
+            partial_path.replace(output_path)
+            return output_path
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        finally:
+            if delete_source:
+                source_path.unlink(missing_ok=True)
+
+
+# Глобальный пул экспорта для окон генерации и пакетной обработки
+export_pool = ExportPool()
@@ -0,0 +1,31 @@
+"""
+Настройки генерации из окна настроек: устройство, язык и режим производительности.
+Окно генерации пересоздается при каждом переходе, поэтому выбор пользователя
+хранится здесь до выхода из приложения; по нему же прогревается модель в фоне.
+"""
+from device_info import default_device
+from performance import PerformanceConfig
+
+
+class GenerationSettings:
+    """Текущие настройки генерации для всех окон"""
+
+    def __init__(self):
+        self._device = None
+        self.language = "ru"
+        self.performance = PerformanceConfig()
+
+    @property
+    def device(self):
+        """Выбранное устройство; по умолчанию GPU при наличии CUDA (определяется при первом обращении)"""
+        if self._device is None:
+            self._device = default_device()
+        return self._device
+
+    @device.setter
+    def device(self, device):
+        self._device = device
+
+
+# Глобальные настройки для окон генерации и фоновой загрузки модели
+generation_settings = GenerationSettings()
@@ -1,15 +1,29 @@
+import time
 from pathlib import Path
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QTextEdit, QCheckBox,
                              QLineEdit, QProgressBar, QMessageBox, QApplication,
-                             QTextBrowser, QDialog, QComboBox, QFrame)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
+                             QTextBrowser, QDialog, QComboBox, QFrame, QSpinBox,
+                             QListWidget, QListWidgetItem)
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QTimer
 from PyQt6.QtGui import QIcon, QPixmap
 
 from styles import AppStyles
-from voice import VoiceGenerator
+from voice import VoiceGenerator, AudioStreamPlayer
+from playback import playback_engine
+from progress import (STAGE_SAMPLING, STAGE_DECODING, STAGE_VOCODER, STAGE_WATERMARK, STAGE_DONE,
+                      CancellationToken)
 from console_capture import console_capture
-import torch
+from text_utils import split_text_into_chunks
+from result_cache import result_cache
+from device_info import cuda_available
+from performance import PerformanceConfig, BACKENDS
+from generation_settings import generation_settings
+from metrics import GenerationMetrics, append_metrics
+from export import export_pool, export_path, default_bitrate, EXPORT_FORMATS, FORMAT_WAV
+from job_queue import (job_queue, GenerationJob, JOB_RUNNING, JOB_QUEUED, JOB_CANCELLED, JOB_ENCODING,
+                       JOB_STATUS_LABELS,
+                       PRIORITY_NORMAL, PRIORITY_LABELS)
 
 # Константы для стилей прогресс-бара
 PROGRESS_BAR_STYLES = {
@@ -48,7 +62,7 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Настройки")
-        self.setFixedSize(250, 150)
+        self.setFixedSize(250, 320)
         self.setModal(True)
         
         # Установка иконки
@@ -136,6 +150,44 @@ class SettingsDialog(QDialog):
         language_layout.addWidget(language_label)
         language_layout.addWidget(self.language_combo)
         
+        # Производительность CPU
+        cpu_layout = QVBoxLayout()
+        cpu_label = QLabel("Производительность CPU:")
+        cpu_label.setStyleSheet("font-weight: bold;")
+
+        threads_layout = QHBoxLayout()
+        threads_label = QLabel("Потоки:")
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(0, 256)
+        self.threads_spin.setSpecialValueText("авто")
+        self.threads_spin.setToolTip("Число потоков вычислений (авто - по умолчанию torch)")
+        threads_layout.addWidget(threads_label)
+        threads_layout.addWidget(self.threads_spin)
+
+        self.inference_mode_checkbox = QCheckBox("inference_mode")
+        self.inference_mode_checkbox.setChecked(True)
+        self.inference_mode_checkbox.setToolTip("Генерация без учета градиентов")
+        self.bf16_checkbox = QCheckBox("bfloat16 (семплирование)")
+        self.bf16_checkbox.setToolTip("Быстрее на CPU с поддержкой bfloat16, возможна небольшая потеря качества")
+        self.int8_checkbox = QCheckBox("int8 квантизация")
+        self.int8_checkbox.setToolTip("Квантизация трансформера: меньше памяти и быстрее, модель загружается отдельно")
+
+        cpu_layout.addWidget(cpu_label)
+        cpu_layout.addLayout(threads_layout)
+        cpu_layout.addWidget(self.inference_mode_checkbox)
+        cpu_layout.addWidget(self.bf16_checkbox)
+        cpu_layout.addWidget(self.int8_checkbox)
+
+        backend_layout = QHBoxLayout()
+        backend_label = QLabel("Бэкенд:")
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(BACKENDS)
+        self.backend_combo.setToolTip("compile - torch.compile, onnx - декодер в ONNX Runtime.\n"
+                                      "Первый запуск дольше: граф компилируется и сохраняется на диск")
+        backend_layout.addWidget(backend_label)
+        backend_layout.addWidget(self.backend_combo)
+        cpu_layout.addLayout(backend_layout)
+
         # Кнопки
         button_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -150,12 +202,13 @@ class SettingsDialog(QDialog):
         # Сборка
         layout.addLayout(device_layout)
         layout.addLayout(language_layout)
+        layout.addLayout(cpu_layout)
         layout.addLayout(button_layout)
         
         self.setLayout(layout)
         
         # Инициализация значений
-        self.cuda_available = torch.cuda.is_available()
+        self.cuda_available = cuda_available()
         self.device_index = 0 if self.cuda_available else 1
         self.language_index = 0
         self.devices = ["GPU", "CPU"]
@@ -192,6 +245,10 @@ class SettingsDialog(QDialog):
     
     def update_device_tabs(self):
         """Обновление стилей табов устройств"""
+        # bfloat16 и int8 применяются только на CPU
+        cpu_selected = self.device_index == 1
+        self.bf16_checkbox.setEnabled(cpu_selected)
+        self.int8_checkbox.setEnabled(cpu_selected)
         if self.device_index == 0:  # GPU выбран
             self.gpu_tab.setStyleSheet("""
                 QPushButton {
@@ -254,13 +311,35 @@ class SettingsDialog(QDialog):
         """Получить выбранный язык"""
         return self.languages[self.language_index]
 
+    def set_performance(self, performance):
+        """Установка значений настроек производительности"""
+        self.threads_spin.setValue(performance.intra_op_threads or 0)
+        self.inference_mode_checkbox.setChecked(performance.inference_mode)
+        self.bf16_checkbox.setChecked(performance.bf16_autocast)
+        self.int8_checkbox.setChecked(performance.int8_quantization)
+        if performance.backend in BACKENDS:
+            self.backend_combo.setCurrentIndex(BACKENDS.index(performance.backend))
+
+    def get_performance(self):
+        """Получить настройки производительности"""
+        return PerformanceConfig(
+            intra_op_threads=self.threads_spin.value() or None,
+            inference_mode=self.inference_mode_checkbox.isChecked(),
+            bf16_autocast=self.bf16_checkbox.isChecked(),
+            int8_quantization=self.int8_checkbox.isChecked(),
+            backend=self.backend_combo.currentText(),
+        )
+
 
-class GenerationWorker(QThread):
-    """Поток для генерации речи"""
+class GenerationWorker(QObject):
+    """Генерация речи для одного задания (выполняется в потоке инференса очереди заданий)"""
     progress_updated = pyqtSignal(int, str)  # процент, сообщение
     generation_finished = pyqtSignal(bool, str, str)  # success, message, file_path
+    chunk_finished = pyqtSignal(int, int)  # готово фрагментов, всего фрагментов
+    stage_progress = pyqtSignal(object)  # ProgressEvent от модели
 
-    def __init__(self, text, voice_path, play_after, save_file, filename, device="cuda", language="ru"):
+    def __init__(self, text, voice_path, play_after, save_file, filename, device="cuda", language="ru",
+                 performance=None, export_format=FORMAT_WAV, bitrate=None):
         super().__init__()
         self.text = text
         self.voice_path = voice_path
@@ -269,40 +348,136 @@ class GenerationWorker(QThread):
         self.filename = filename
         self.device = device
         self.language = language
+        self.performance = performance
+        self.export_format = export_format
+        self.bitrate = bitrate
+        # Future итогового сжатого файла: кодирование завершается в пуле экспорта
+        self.export_future = None
         self.is_running = True
+        # Отмена проверяется моделью на каждом шаге семплирования и декодирования
+        self.cancel_token = CancellationToken()
+        # Метрики последней генерации (GenerationMetrics), пишутся в logs/metrics.jsonl
+        self.metrics = None
 
     def stop(self):
         self.is_running = False
+        self.cancel_token.cancel()
 
     def run(self):
-        # Начинаем перехват консольного вывода
-        console_capture.start_capture()
-        
+        capturing = False
         try:
             # Этап 1: Инициализация генератора
             self.progress_updated.emit(5, "Запуск программы...")
             if not self.is_running:
                 return
 
-            voice_generator = VoiceGenerator(device=self.device, language=self.language)
+            voice_generator = VoiceGenerator(device=self.device, language=self.language,
+                                             performance=self.performance)
 
-            # Этап 2: Загрузка модели (если нужно)
+            # Готовый результат из кэша не требует ни загрузки модели, ни генерации
+            voice_file = self.voice_path if self.voice_path and Path(self.voice_path).exists() else None
+            cache_key = result_cache.key_for(self.text, voice_file, self.language,
+                                             performance=voice_generator.performance,
+                                             device=voice_generator.device)
+            if self.finish_from_cache(voice_generator, cache_key):
+                return
+
+            # Этап 2: Загрузка модели (если нужно) - модель общая для всех генераций
             self.progress_updated.emit(15, "Загрузка модели TTS...")
             if not self.is_running:
                 return
 
+            # Прогресс скачивания весов доступен только в выводе huggingface_hub
+            if not voice_generator.is_loaded:
+                console_capture.start_capture()
+                capturing = True
+            metrics = GenerationMetrics(self.device, self.language, len(self.text))
+            metrics.add_stage("load", voice_generator.load_model())
+
+            # Структурированные события заменяют разбор консоли; перехват остается запасным вариантом
+            if capturing and voice_generator.progress_supported:
+                console_capture.stop_capture()
+                capturing = False
+            elif not capturing and not voice_generator.progress_supported:
+                console_capture.start_capture()
+                capturing = True
+            on_progress = self.stage_progress.emit if voice_generator.progress_supported else None
+
             # Генерация речи с отслеживанием прогресса
             self.progress_updated.emit(25, "Подготовка текста...")
             if not self.is_running:
                 return
 
-            # Генерация речи
-            audio, sr, gen_time = voice_generator.generate_speech(
-                text=self.text,
-                reference_file=self.voice_path
-            )
+            # Потоковая генерация по предложениям: воспроизведение начинается с первого фрагмента,
+            # а кадры сразу дописываются в файл без накопления всего аудио в памяти
+            output_dir = Path("output")
+            # Сжатый файл кодируется в фоне из тех же фрагментов, WAV при этом уходит только в кэш
+            compressed = self.save_file and self.export_format != FORMAT_WAV
+            filepath = output_dir / f"{self.filename}.wav" if self.save_file and not compressed else None
+            export_target = export_path(output_dir, self.filename, self.export_format) if compressed else None
+            if self.save_file:
+                output_dir.mkdir(exist_ok=True)
+            target_path = filepath if filepath is not None else result_cache.temp_path(cache_key)
 
-            if audio is None:
+            player = None
+            writer = None
+            exporter = None
+            self.chunk_finished.emit(0, len(split_text_into_chunks(self.text)))
+            try:
+                for index, total, chunk_audio, sr, _ in voice_generator.generate_stream(
+                    text=self.text,
+                    reference_file=self.voice_path,
+                    on_progress=on_progress,
+                    cancel_token=self.cancel_token
+                ):
+                    if voice_generator.last_metrics is not None:
+                        metrics.merge(voice_generator.last_metrics)
+                    if not self.is_running:
+                        return
+                    if chunk_audio is None:
+                        continue
+
+                    save_started = time.perf_counter()
+                    if writer is None:
+                        writer = voice_generator.open_writer(str(target_path), sr)
+                        if export_target is not None:
+                            exporter = export_pool.open(export_target, sr, self.export_format, self.bitrate)
+                    writer.write(chunk_audio)
+                    if exporter is not None:
+                        exporter.write(chunk_audio)
+                    metrics.add_stage("save", time.perf_counter() - save_started)
+
+                    if self.play_after:
+                        if player is None:
+                            player = AudioStreamPlayer(sr)
+                        player.feed(chunk_audio)
+
+                    progress = 25 + int(60 * (index + 1) / total)
+                    self.chunk_finished.emit(index + 1, total)
+                    self.progress_updated.emit(progress, f"Фрагмент {index + 1} из {total}")
+            finally:
+                save_started = time.perf_counter()
+                if writer is not None:
+                    writer.close()
+                if exporter is not None:
+                    if self.is_running:
+                        exporter.close()
+                        self.export_future = exporter.future
+                    else:
+                        exporter.abort()
+                metrics.add_stage("save", time.perf_counter() - save_started)
+                # Воспроизведение продолжается в playback_engine, поток инференса его не ждет;
+                # при прерывании недоигранный трек останавливается
+                playback_started = time.perf_counter()
+                play_success = player.close() if player else False
+                if player is not None and not self.is_running:
+                    player.stop()
+                metrics.add_stage("playback", time.perf_counter() - playback_started)
+                # Частичный файл для кэша не нужен; частичный файл в output/ остается пригодным
+                if not self.is_running and filepath is None:
+                    target_path.unlink(missing_ok=True)
+
+            if writer is None or writer.frames_written == 0:
                 self.generation_finished.emit(False, "Ошибка генерации: не удалось сгенерировать аудио", "")
                 return
 
@@ -315,30 +490,26 @@ class GenerationWorker(QThread):
             result_message = ""
 
             # Воспроизведение
-            if self.play_after and self.is_running:
-                self.progress_updated.emit(90, "Воспроизведение аудио...")
-                play_success = voice_generator.play_audio(audio, sr)
+            if self.play_after:
                 if play_success:
-                    result_message += "Аудио воспроизведено. "
+                    result_message += "Аудио воспроизводится. "
                 else:
                     result_message += "Ошибка воспроизведения. "
 
-            # Сохранение
-            if self.save_file and self.is_running:
-                self.progress_updated.emit(95, "Сохранение файла...")
-                output_dir = Path("output")
-                output_dir.mkdir(exist_ok=True)
-                filepath = output_dir / f"{self.filename}.wav"
-                save_success = voice_generator.save_audio(audio, sr, str(filepath))
-                if save_success:
-                    result_message += f"Файл сохранен как: {self.filename}.wav"
-                else:
-                    result_message += "Ошибка сохранения файла."
+            # Сохранение (файл уже записан по мере генерации или кодируется в фоне)
+            if filepath is not None:
+                result_message += f"Файл сохранен как: {self.filename}.wav"
+            elif export_target is not None:
+                result_message += f"Файл сохранен как: {export_target.name}"
 
             # Завершение
             if self.is_running:
+                self.store_in_cache(cache_key, target_path, move=filepath is None)
+                self.metrics = metrics
+                append_metrics(metrics)
                 self.progress_updated.emit(100, "Генерация завершена!")
-                file_path = str(filepath) if self.save_file and save_success else ""
+                saved_path = filepath if filepath is not None else export_target
+                file_path = str(saved_path) if saved_path is not None else ""
                 self.generation_finished.emit(True, result_message.strip(), file_path)
 
         except Exception as e:
@@ -346,7 +517,58 @@ class GenerationWorker(QThread):
                 self.generation_finished.emit(False, f"Ошибка генерации: {str(e)}", "")
         finally:
             # Останавливаем перехват консольного вывода
-            console_capture.stop_capture()
+            if capturing:
+                console_capture.stop_capture()
+
+    def finish_from_cache(self, voice_generator, cache_key):
+        """Завершение генерации готовым результатом из кэша"""
+        cached_path = result_cache.lookup(cache_key)
+        if cached_path is None:
+            return False
+
+        result_message = ""
+        file_path = ""
+
+        if self.play_after and self.is_running:
+            self.progress_updated.emit(90, "Воспроизведение аудио...")
+            audio, sr = voice_generator.load_audio(str(cached_path))
+            if voice_generator.play_audio(audio, sr):
+                result_message += "Аудио воспроизводится. "
+            else:
+                result_message += "Ошибка воспроизведения. "
+
+        if self.save_file and self.is_running:
+            self.progress_updated.emit(95, "Сохранение файла...")
+            output_dir = Path("output")
+            output_dir.mkdir(exist_ok=True)
+            filepath = export_path(output_dir, self.filename, self.export_format)
+            if self.export_format == FORMAT_WAV:
+                saved = result_cache.materialize(cache_key, filepath)
+            else:
+                # Копия записи кэша, чтобы вытеснение не помешало фоновому кодированию
+                source_path = result_cache.temp_path(cache_key).with_suffix(".export.wav")
+                saved = result_cache.materialize(cache_key, source_path)
+                if saved:
+                    self.export_future = export_pool.export_file(
+                        source_path, filepath, self.export_format, self.bitrate, delete_source=True
+                    )
+            if saved:
+                file_path = str(filepath)
+                result_message += f"Файл сохранен как: {filepath.name}"
+            else:
+                result_message += "Ошибка сохранения файла."
+
+        if self.is_running:
+            self.progress_updated.emit(100, "Генерация завершена!")
+            self.generation_finished.emit(True, result_message.strip(), file_path)
+        return True
+
+    def store_in_cache(self, cache_key, audio_path, move=False):
+        """Сохранение результата в кэш (ошибки кэша не влияют на генерацию)"""
+        try:
+            result_cache.store(cache_key, audio_path, move=move)
+        except OSError:
+            pass
 
 
 class GenerationWindow(QMainWindow):
@@ -354,15 +576,29 @@ class GenerationWindow(QMainWindow):
         super().__init__()
         self.voice_path = voice_path
         self.voice_name = voice_name
-        self.generation_thread = None
+        # Задание, прогресс которого показан в прогресс-баре
+        self.active_job = None
+        self.queue_connected = False
         self.progress_timer = None
         self.current_progress = 0
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.structured_progress = False
         
-        # Настройки по умолчанию
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.language = "ru"
+        # Настройки общие для всех окон генерации и сохраняются при переходах между окнами
+        self.device = generation_settings.device
+        self.language = generation_settings.language
+        self.performance = generation_settings.performance
         
         self.setup_ui()
+
+        # Очередь общая для всех окон: показываем задания, поставленные раньше
+        self._connect_queue_signals()
+        self._connect_console_signals()
+        self.queue_connected = True
+        self.refresh_queue()
+        if job_queue.current is not None:
+            self.activate_job(job_queue.current)
         
     def _connect_console_signals(self):
         """Подключение сигналов консольного вывода"""
@@ -376,7 +612,7 @@ class GenerationWindow(QMainWindow):
 
     def setup_ui(self):
         self.setWindowTitle("Генератор речи")
-        self.setMinimumSize(800, 600)
+        self.setMinimumSize(800, 700)
         
         # Установка иконки окна
         icon_path = Path("assets/icon.ico")
@@ -477,7 +713,20 @@ class GenerationWindow(QMainWindow):
         self.filename_edit.setStyleSheet(AppStyles.get_line_edit_style())
         self.filename_edit.setEnabled(False)
 
+        # Формат и битрейт файла (сжатые форматы кодируются в фоне)
+        self.format_combo = QComboBox()
+        for export_format, spec in EXPORT_FORMATS.items():
+            self.format_combo.addItem(spec["label"], export_format)
+        self.format_combo.setEnabled(False)
+        self.format_combo.currentIndexChanged.connect(self.on_format_changed)
+
+        self.bitrate_combo = QComboBox()
+        self.bitrate_combo.setToolTip("Битрейт (кбит/с)")
+        self.bitrate_combo.setEnabled(False)
+
         filename_layout.addWidget(self.filename_edit, 1)
+        filename_layout.addWidget(self.format_combo)
+        filename_layout.addWidget(self.bitrate_combo)
 
         settings_layout.addLayout(checkbox_layout)
         settings_layout.addLayout(filename_layout)
@@ -497,22 +746,77 @@ class GenerationWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         self.progress_bar.setStyleSheet(AppStyles.get_progress_bar_style())
 
-        self.generate_btn = QPushButton("Начать генерацию")
+        # Приоритет нового задания
+        self.priority_combo = QComboBox()
+        for priority, label in PRIORITY_LABELS.items():
+            self.priority_combo.addItem(label, priority)
+        self.priority_combo.setCurrentIndex(self.priority_combo.findData(PRIORITY_NORMAL))
+        self.priority_combo.setFixedHeight(40)
+        self.priority_combo.setToolTip("Приоритет задания в очереди")
+
+        self.generate_btn = QPushButton("В очередь")
         self.generate_btn.setFixedHeight(40)
         self.generate_btn.setStyleSheet(AppStyles.get_button_style("primary"))
         self.generate_btn.clicked.connect(self.start_generation)
 
         progress_bar_layout.addWidget(self.progress_bar, 1)
         progress_bar_layout.addSpacing(10)
+        progress_bar_layout.addWidget(self.priority_combo)
         progress_bar_layout.addWidget(self.generate_btn)
 
         progress_layout.addLayout(progress_bar_layout)
 
+        # Очередь заданий
+        queue_layout = QVBoxLayout()
+
+        self.queue_list = QListWidget()
+        self.queue_list.setFixedHeight(130)
+        self.queue_list.itemSelectionChanged.connect(self.update_queue_buttons)
+
+        queue_buttons_layout = QHBoxLayout()
+
+        self.move_up_btn = QPushButton("↑")
+        self.move_up_btn.setToolTip("Выполнить раньше")
+        self.move_up_btn.clicked.connect(lambda: self.move_selected_job(-1))
+        self.move_down_btn = QPushButton("↓")
+        self.move_down_btn.setToolTip("Выполнить позже")
+        self.move_down_btn.clicked.connect(lambda: self.move_selected_job(1))
+
+        self.job_priority_combo = QComboBox()
+        for priority, label in PRIORITY_LABELS.items():
+            self.job_priority_combo.addItem(label, priority)
+        self.job_priority_combo.setToolTip("Приоритет выбранного задания")
+        self.job_priority_combo.currentIndexChanged.connect(self.on_job_priority_changed)
+
+        self.cancel_job_btn = QPushButton("Отменить")
+        self.cancel_job_btn.clicked.connect(self.cancel_selected_job)
+        self.clear_jobs_btn = QPushButton("Очистить завершенные")
+        self.clear_jobs_btn.clicked.connect(job_queue.clear_finished)
+        self.stop_playback_btn = QPushButton("■ Звук")
+        self.stop_playback_btn.setToolTip("Остановить воспроизведение и очистить очередь воспроизведения")
+        self.stop_playback_btn.clicked.connect(playback_engine.stop)
+
+        for button in (self.move_up_btn, self.move_down_btn, self.cancel_job_btn, self.clear_jobs_btn,
+                       self.stop_playback_btn):
+            button.setStyleSheet(AppStyles.get_button_style("secondary"))
+
+        queue_buttons_layout.addWidget(self.move_up_btn)
+        queue_buttons_layout.addWidget(self.move_down_btn)
+        queue_buttons_layout.addWidget(self.job_priority_combo)
+        queue_buttons_layout.addStretch()
+        queue_buttons_layout.addWidget(self.cancel_job_btn)
+        queue_buttons_layout.addWidget(self.clear_jobs_btn)
+        queue_buttons_layout.addWidget(self.stop_playback_btn)
+
+        queue_layout.addWidget(self.queue_list)
+        queue_layout.addLayout(queue_buttons_layout)
+
         # Сборка интерфейса
         main_layout.addLayout(header_layout)
         main_layout.addWidget(self.text_edit, 1)
         main_layout.addLayout(settings_layout)
         main_layout.addLayout(progress_layout)
+        main_layout.addLayout(queue_layout)
 
         central_widget.setLayout(main_layout)
 
@@ -524,11 +828,24 @@ class GenerationWindow(QMainWindow):
     def on_save_toggled(self, checked):
         """Обработка переключения чекбокса сохранения"""
         self.filename_edit.setEnabled(checked)
+        self.format_combo.setEnabled(checked)
+        self.on_format_changed()
         if not checked and not self.play_checkbox.isChecked():
             self.play_checkbox.setChecked(True)
 
+    def on_format_changed(self, index=None):
+        """Список битрейтов выбранного формата (для форматов без потерь недоступен)"""
+        export_format = self.format_combo.currentData()
+        bitrates = EXPORT_FORMATS[export_format]["bitrates"]
+        self.bitrate_combo.clear()
+        for bitrate in bitrates:
+            self.bitrate_combo.addItem(f"{bitrate} кбит/с", bitrate)
+        if bitrates:
+            self.bitrate_combo.setCurrentIndex(self.bitrate_combo.findData(default_bitrate(export_format)))
+        self.bitrate_combo.setEnabled(bool(bitrates) and self.save_checkbox.isChecked())
+
     def start_generation(self):
-        """Начало генерации речи"""
+        """Постановка текста в очередь заданий; редактор остается доступным"""
         text = self.text_edit.toPlainText().strip()
 
         if not text:
@@ -544,44 +861,223 @@ class GenerationWindow(QMainWindow):
         save_file = self.save_checkbox.isChecked()
         filename = self.filename_edit.text().strip() if save_file else ""
 
-        # Блокируем интерфейс
-        self.generate_btn.setEnabled(False)
-        self.back_btn.setEnabled(False)
-        self.text_edit.setEnabled(False)
-        self.play_checkbox.setEnabled(False)
-        self.save_checkbox.setEnabled(False)
-        self.filename_edit.setEnabled(False)
+        job = GenerationJob(
+            text, self.voice_path, self.voice_name, play_after, save_file, filename,
+            self.device, self.language, self.performance,
+            priority=self.priority_combo.currentData(),
+            export_format=self.format_combo.currentData(),
+            bitrate=self.bitrate_combo.currentData()
+        )
+        job_queue.submit(job)
+
+        # Имя файла относится к поставленному заданию - следующее нужно ввести заново
+        if save_file:
+            self.filename_edit.clear()
+
+    def _connect_queue_signals(self):
+        """Подключение сигналов очереди заданий"""
+        job_queue.queue_changed.connect(self.refresh_queue)
+        job_queue.job_changed.connect(self.on_job_changed)
+        job_queue.job_progress.connect(self.on_job_progress)
+        job_queue.job_chunk_finished.connect(self.on_job_chunk_finished)
+        job_queue.job_stage_progress.connect(self.on_job_stage_progress)
+        job_queue.job_finished.connect(self.on_job_finished)
+
+    def _disconnect_queue_signals(self):
+        """Отключение сигналов очереди (очередь переживает окно)"""
+        job_queue.queue_changed.disconnect(self.refresh_queue)
+        job_queue.job_changed.disconnect(self.on_job_changed)
+        job_queue.job_progress.disconnect(self.on_job_progress)
+        job_queue.job_chunk_finished.disconnect(self.on_job_chunk_finished)
+        job_queue.job_stage_progress.disconnect(self.on_job_stage_progress)
+        job_queue.job_finished.disconnect(self.on_job_finished)
+
+    def activate_job(self, job):
+        """Показ прогресса выполняемого задания в прогресс-баре"""
+        self.active_job = job
+
+        # Останавливаем таймер предыдущего задания
+        if self.progress_timer:
+            self.progress_timer.stop()
+            self.progress_timer = None
 
         # Показываем прогресс-бар и сбрасываем стиль
         self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        self.progress_bar.setFormat("Подготовка...")
+        self.progress_bar.setValue(job.progress)
+        self.progress_bar.setFormat(f"#{job.id}: {job.message or 'Подготовка...'}")
         # Сбрасываем стиль к обычному
         self.progress_bar.setStyleSheet(AppStyles.get_progress_bar_style())
 
-        # Подключаем перехват консольного вывода
-        self._connect_console_signals()
-
-        # Запускаем поток генерации
-        self.generation_thread = GenerationWorker(
-            text, self.voice_path, play_after, save_file, filename, self.device, self.language
-        )
-        self.generation_thread.progress_updated.connect(self.on_progress_updated)
-        self.generation_thread.generation_finished.connect(self.on_generation_finished)
-        self.generation_thread.start()
+        self.current_progress = job.progress
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.structured_progress = False
+
+    def _is_active(self, job):
+        return job is self.active_job and job.status == JOB_RUNNING
+
+    def job_item_text(self, job):
+        """Строка задания в списке очереди"""
+        text = f"#{job.id} [{JOB_STATUS_LABELS[job.status]}] {job.voice_name}: {job.title}"
+        if job.status == JOB_RUNNING:
+            text += f" — {job.progress}%"
+        elif job.status == JOB_QUEUED and job.priority != PRIORITY_NORMAL:
+            text += f" (приоритет: {PRIORITY_LABELS[job.priority].lower()})"
+        return text
+
+    def refresh_queue(self):
+        """Перестроение списка заданий с сохранением выделения"""
+        selected = self.selected_job()
+        self.queue_list.blockSignals(True)
+        self.queue_list.clear()
+        for job in job_queue.jobs():
+            item = QListWidgetItem(self.job_item_text(job))
+            item.setData(Qt.ItemDataRole.UserRole, job)
+            if job.result_message:
+                item.setToolTip(job.result_message)
+            self.queue_list.addItem(item)
+            if job is selected:
+                item.setSelected(True)
+                self.queue_list.setCurrentItem(item)
+        self.queue_list.blockSignals(False)
+        self.update_queue_buttons()
+
+    def _find_item(self, job):
+        for row in range(self.queue_list.count()):
+            item = self.queue_list.item(row)
+            if item.data(Qt.ItemDataRole.UserRole) is job:
+                return item
+        return None
+
+    def selected_job(self):
+        item = self.queue_list.currentItem()
+        return item.data(Qt.ItemDataRole.UserRole) if item is not None and item.isSelected() else None
+
+    def update_queue_buttons(self):
+        """Доступность действий для выбранного задания"""
+        job = self.selected_job()
+        queued = job is not None and job.status == JOB_QUEUED
+        self.move_up_btn.setEnabled(queued)
+        self.move_down_btn.setEnabled(queued)
+        self.job_priority_combo.setEnabled(queued)
+        self.cancel_job_btn.setEnabled(job is not None and not job.is_finished)
+        if queued:
+            self.job_priority_combo.blockSignals(True)
+            self.job_priority_combo.setCurrentIndex(self.job_priority_combo.findData(job.priority))
+            self.job_priority_combo.blockSignals(False)
+
+    def move_selected_job(self, offset):
+        job = self.selected_job()
+        if job is not None:
+            job_queue.move(job, offset)
+
+    def cancel_selected_job(self):
+        job = self.selected_job()
+        if job is not None:
+            job_queue.cancel(job)
+
+    def on_job_priority_changed(self, index):
+        job = self.selected_job()
+        if job is not None:
+            job_queue.set_priority(job, self.job_priority_combo.itemData(index))
+
+    def on_job_changed(self, job):
+        """Смена статуса задания: новое выполняемое задание показывается в прогресс-баре"""
+        if job.status == JOB_RUNNING and job is not self.active_job:
+            self.activate_job(job)
+        elif job.status == JOB_CANCELLED and job is self.active_job:
+            if self.progress_timer:
+                self.progress_timer.stop()
+                self.progress_timer = None
+            self.progress_bar.setFormat(f"#{job.id}: отменено")
+        elif job.status == JOB_ENCODING and job is self.active_job:
+            self.progress_bar.setFormat(f"#{job.id}: кодирование {job.export_format.upper()}...")
+        item = self._find_item(job)
+        if item is not None:
+            item.setText(self.job_item_text(job))
+        self.update_queue_buttons()
+
+    def on_job_progress(self, job, value, message):
+        item = self._find_item(job)
+        if item is not None:
+            item.setText(self.job_item_text(job))
+        if self._is_active(job):
+            self.on_progress_updated(value, f"#{job.id}: {message}")
+
+    def on_job_chunk_finished(self, job, done, total):
+        if self._is_active(job):
+            self.on_chunk_finished(done, total)
+
+    def on_job_stage_progress(self, job, event):
+        if self._is_active(job):
+            self.on_stage_progress(event)
+
+    def on_job_finished(self, job, success, message, file_path):
+        """
+        Завершение задания (для сжатых форматов - после кодирования):
+        диалог результата показывается, когда очередь опустела
+        """
+        show_dialog = not job_queue.is_busy
+        if job is self.active_job:
+            self.on_generation_finished(success, message, file_path, show_dialog)
+        elif show_dialog:
+            self.show_result(success, message, file_path)
 
     def on_progress_updated(self, value, message):
         """Обновление прогресса генерации"""
         self.progress_bar.setValue(value)
         self.progress_bar.setFormat(f"{message} ({value}%)")
 
+    def on_chunk_finished(self, done, total):
+        """Учет готовых фрагментов потоковой генерации"""
+        self.chunks_done = done
+        self.chunks_total = total
+
+    def on_stage_progress(self, event):
+        """Обработка структурированного прогресса модели"""
+        self.structured_progress = True
+
+        # Доля этапа внутри фрагмента: семплирование 70%, декодирование 25%, вокодер 5%
+        if event.stage == STAGE_SAMPLING:
+            within = 0.7 * event.fraction
+            message = f"Генерация речи: {event.step} ток., {event.tokens_per_sec:.0f} ток/с"
+        elif event.stage == STAGE_DECODING:
+            within = 0.7 + 0.25 * event.fraction
+            message = "Декодирование аудио"
+        elif event.stage == STAGE_VOCODER:
+            within = 0.95
+            message = "Вокодер"
+        elif event.stage == STAGE_WATERMARK:
+            within = 0.98
+            message = "Водяной знак"
+        elif event.stage == STAGE_DONE:
+            within = 1.0
+            message = "Фрагмент готов"
+        else:
+            within = 0.0
+            message = "Подготовка голоса"
+
+        if event.chunks > 1:
+            message = f"{message} (фрагмент {event.chunk + 1} из {event.chunks})"
+        ui_percentage = 25 + int(60 * (event.chunk + within) / max(event.chunks, 1))
+        # Прогресс не откатывается назад
+        ui_percentage = max(ui_percentage, self.progress_bar.value())
+
+        self.progress_bar.setValue(ui_percentage)
+        self.progress_bar.setFormat(f"{message} ({ui_percentage}%)")
+        self.current_progress = ui_percentage
+
     def on_console_progress(self, percentage, message):
-        """Обработка прогресса из консоли"""
+        """Обработка прогресса из консоли (если события модели недоступны)"""
+        if self.structured_progress or self.active_job is None or self.active_job.status != JOB_RUNNING:
+            return
         # Конвертируем проценты: 100% загрузки файлов = 25% общего прогресса
         if "Загрузка файлов" in message:
             ui_percentage = int(percentage * 0.25)  # 0-25%
         elif "Генерация речи" in message:
-            ui_percentage = 25 + int(percentage * 0.6)  # 25-85%
+            # Прогресс текущего фрагмента внутри его доли от 25-85%
+            total = max(self.chunks_total, self.chunks_done + 1)
+            ui_percentage = 25 + int(60 * (self.chunks_done + percentage / 100) / total)
         else:
             ui_percentage = percentage
             
@@ -591,10 +1087,16 @@ class GenerationWindow(QMainWindow):
 
     def on_generation_complete(self):
         """Обработка завершения генерации - начинаем плавное увеличение до 100%"""
-        # Устанавливаем прогресс на 80%
-        self.current_progress = 80
-        self.progress_bar.setValue(80)
-        self.progress_bar.setFormat("Подготовка к воспроизведению... (80%)")
+        # Завершение промежуточного фрагмента не означает конец генерации
+        if self.active_job is None or self.active_job.status != JOB_RUNNING:
+            return
+        if self.structured_progress or self.chunks_done + 1 < self.chunks_total or self.progress_timer:
+            return
+
+        # Устанавливаем прогресс не ниже 80%
+        self.current_progress = max(self.current_progress, 80)
+        self.progress_bar.setValue(self.current_progress)
+        self.progress_bar.setFormat(f"Подготовка к воспроизведению... ({self.current_progress}%)")
         
         # Запускаем таймер для плавного увеличения
         self.progress_timer = QTimer()
@@ -613,38 +1115,33 @@ class GenerationWindow(QMainWindow):
                 self.progress_timer.stop()
                 self.progress_timer = None
 
-    def on_generation_finished(self, success, message, file_path):
+    def on_generation_finished(self, success, message, file_path, show_dialog=True):
         """Завершение генерации"""
-        # Отключаем перехват консольного вывода
-        self._disconnect_console_signals()
-        
         # Останавливаем таймер если он работает
         if self.progress_timer:
             self.progress_timer.stop()
             self.progress_timer = None
-        
-        # Разблокируем интерфейс
-        self.generate_btn.setEnabled(True)
-        self.back_btn.setEnabled(True)
-        self.text_edit.setEnabled(True)
-        self.play_checkbox.setEnabled(True)
-        self.save_checkbox.setEnabled(True)
-        self.filename_edit.setEnabled(self.save_checkbox.isChecked())
 
         if success:
             # Зеленый прогресс-бар с текстом "Готово"
             self.progress_bar.setValue(100)
             self.progress_bar.setFormat("Готово")
             self.progress_bar.setStyleSheet(PROGRESS_BAR_STYLES['success'])
-            
-            # Показываем кастомный диалог с кнопкой "Открыть папку"
-            dialog = SuccessDialog(self, message, file_path)
-            dialog.exec()
         else:
             # Красный прогресс-бар при ошибке
             self.progress_bar.setValue(100)
             self.progress_bar.setFormat("Ошибка")
             self.progress_bar.setStyleSheet(PROGRESS_BAR_STYLES['error'])
+
+        if show_dialog:
+            self.show_result(success, message, file_path)
+
+    def show_result(self, success, message, file_path):
+        """Диалог результата: итоговый файл с кнопкой "Открыть папку" или ошибка"""
+        if success:
+            dialog = SuccessDialog(self, message, file_path)
+            dialog.exec()
+        else:
             QMessageBox.critical(self, "Ошибка", message)
 
     def open_settings(self):
@@ -664,38 +1161,33 @@ class GenerationWindow(QMainWindow):
         
         dialog.update_device_tabs()
         dialog.language_combo.setCurrentIndex(dialog.language_index)
+        dialog.set_performance(self.performance)
         
         # Показываем диалог
         if dialog.exec() == QDialog.DialogCode.Accepted:
             # Сохраняем новые настройки
             self.device = dialog.get_device()
             self.language = dialog.get_language()
+            self.performance = dialog.get_performance()
+            generation_settings.device = self.device
+            generation_settings.language = self.language
+            generation_settings.performance = self.performance
             
             # Показываем уведомление об изменении настроек
             QMessageBox.information(
                 self, 
                 "Настройки сохранены", 
-                f"Устройство: {self.device.upper()}\nЯзык: {self.language.upper()}"
+                f"Устройство: {self.device.upper()}\nЯзык: {self.language.upper()}\n"
+                f"Производительность: {self.performance.label()}"
             )
 
     def go_back(self):
         """Возврат к менеджеру голосов"""
-        if self.generation_thread and self.generation_thread.isRunning():
-            reply = QMessageBox.question(
-                self,
-                'Подтверждение',
-                'Генерация еще выполняется. Вы уверены, что хотите прервать процесс и вернуться?',
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-                QMessageBox.StandardButton.No
-            )
-            if reply == QMessageBox.StandardButton.No:
-                return
-            self.generation_thread.stop()
-            self.generation_thread.wait(1000)  # Ждем до 1 секунды для завершения
-
         # Импортируем здесь, чтобы избежать циклического импорта
         from voice_manager import VoiceManagerWindow
 
+        # Задания продолжают выполняться в очереди и будут видны при следующем входе;
+        # модель остается в model_registry
         # Создаем и показываем окно менеджера голосов
         self.voice_manager = VoiceManagerWindow()
         self.voice_manager.show()
@@ -703,6 +1195,14 @@ class GenerationWindow(QMainWindow):
         # Закрываем текущее окно
         self.close()
 
+    def closeEvent(self, event):
+        """Закрытое окно больше не получает события очереди и консоли"""
+        if self.queue_connected:
+            self._disconnect_queue_signals()
+            self._disconnect_console_signals()
+            self.queue_connected = False
+        super().closeEvent(event)
+
 
 class SuccessDialog(QDialog):
     """Диалог успешной генерации с кнопкой открытия папки"""
@@ -0,0 +1,330 @@
+"""
+Очередь заданий генерации: один долгоживущий поток инференса выполняет задания
+по приоритету и порядку. Очередь глобальная, поэтому задания продолжают
+выполняться при переходах между окнами генерации и менеджера голосов.
+"""
+import time
+import itertools
+import threading
+
+from PyQt6.QtCore import QObject, QThread, QCoreApplication, pyqtSignal
+
+# Статусы заданий
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_ENCODING = "encoding"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "В очереди",
+    JOB_RUNNING: "Выполняется",
+    JOB_ENCODING: "Кодирование",
+    JOB_DONE: "Готово",
+    JOB_FAILED: "Ошибка",
+    JOB_CANCELLED: "Отменено",
+}
+
+# Приоритеты: меньше - раньше
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_LABELS = {
+    PRIORITY_HIGH: "Высокий",
+    PRIORITY_NORMAL: "Обычный",
+    PRIORITY_LOW: "Низкий",
+}
+
+# Сколько завершенных заданий хранится в истории очереди
+MAX_FINISHED_JOBS = 50
+
+_job_ids = itertools.count(1)
+
+
+class GenerationJob:
+    """Задание генерации: текст, голос, параметры вывода и настройки на момент постановки в очередь"""
+
+    def __init__(self, text, voice_path, voice_name, play_after, save_file, filename,
+                 device="cuda", language="ru", performance=None, priority=PRIORITY_NORMAL,
+                 export_format="wav", bitrate=None):
+        self.id = next(_job_ids)
+        self.text = text
+        self.voice_path = voice_path
+        self.voice_name = voice_name
+        self.play_after = play_after
+        self.save_file = save_file
+        self.filename = filename
+        self.device = device
+        self.language = language
+        self.performance = performance
+        self.priority = priority
+        self.export_format = export_format
+        self.bitrate = bitrate
+        self.status = JOB_QUEUED
+        # Отмена запрошена, когда задание уже взято потоком инференса, но воркер еще не создан
+        self.cancel_requested = False
+        self.progress = 0
+        self.message = ""
+        self.result_message = ""
+        self.file_path = ""
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def is_finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    @property
+    def title(self):
+        """Начало текста для списка заданий"""
+        text = " ".join(self.text.split())
+        return text if len(text) <= 40 else text[:39] + "…"
+
+    def __repr__(self):
+        return f"GenerationJob(#{self.id}, {self.status}, {self.title!r})"
+
+
+class JobQueue(QObject):
+    """
+    Очередь заданий с одним потоком инференса.
+    Следующим выполняется ожидающее задание с наименьшим приоритетом,
+    при равном приоритете - стоящее раньше в очереди.
+    Сигналы отправляются из потока инференса, слоты окон вызываются в потоке GUI.
+    """
+    job_added = pyqtSignal(object)  # GenerationJob
+    job_changed = pyqtSignal(object)  # статус, прогресс или место в очереди
+    job_progress = pyqtSignal(object, int, str)  # задание, процент, сообщение
+    job_chunk_finished = pyqtSignal(object, int, int)  # задание, готово фрагментов, всего
+    job_stage_progress = pyqtSignal(object, object)  # задание, ProgressEvent
+    job_finished = pyqtSignal(object, bool, str, str)  # задание, success, message, file_path
+    queue_changed = pyqtSignal()  # добавление, удаление или перестановка
+
+    def __init__(self):
+        super().__init__()
+        self._jobs = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._worker = None
+        self._stopping = False
+
+    def jobs(self):
+        """Все задания: завершенные и текущее в порядке постановки, затем ожидающие в порядке выполнения"""
+        with self._condition:
+            return [job for job in self._jobs if job.status != JOB_QUEUED] + self._pending()
+
+    def pending(self):
+        """Ожидающие задания в порядке выполнения"""
+        with self._condition:
+            return self._pending()
+
+    @property
+    def current(self):
+        """Выполняемое задание или None"""
+        with self._condition:
+            return next((job for job in self._jobs if job.status == JOB_RUNNING), None)
+
+    @property
+    def is_busy(self):
+        with self._condition:
+            return any(not job.is_finished for job in self._jobs)
+
+    def submit(self, job):
+        """Постановка задания в очередь; поток инференса запускается при первом задании"""
+        with self._condition:
+            self._jobs.append(job)
+            self._trim_history()
+            self._condition.notify()
+        self._ensure_thread()
+        self.job_added.emit(job)
+        self.queue_changed.emit()
+        return job
+
+    def cancel(self, job):
+        """Отмена ожидающего задания или прерывание выполняемого на ближайшем шаге модели"""
+        with self._condition:
+            if job.status == JOB_QUEUED:
+                self._set_finished(job, JOB_CANCELLED)
+            elif job.status == JOB_RUNNING:
+                job.cancel_requested = True
+                if self._worker is not None:
+                    self._worker.stop()
+            else:
+                return
+        self.job_changed.emit(job)
+        self.queue_changed.emit()
+
+    def cancel_all(self):
+        for job in self.jobs():
+            self.cancel(job)
+
+    def move(self, job, offset):
+        """
+        Перестановка ожидающего задания на offset позиций в порядке выполнения.
+        При переходе через задание другого приоритета задание получает его приоритет.
+        """
+        with self._condition:
+            order = self._pending()
+            if job not in order:
+                return False
+            index = order.index(job)
+            target = max(0, min(len(order) - 1, index + offset))
+            if target == index:
+                return False
+            other = order[target]
+            job.priority = other.priority
+            a, b = self._jobs.index(job), self._jobs.index(other)
+            if (a < b) != (target < index):
+                self._jobs[a], self._jobs[b] = self._jobs[b], self._jobs[a]
+        self.job_changed.emit(job)
+        self.queue_changed.emit()
+        return True
+
+    def set_priority(self, job, priority):
+        with self._condition:
+            if job.status != JOB_QUEUED or job.priority == priority:
+                return
+            job.priority = priority
+        self.job_changed.emit(job)
+        self.queue_changed.emit()
+
+    def clear_finished(self):
+        """Удаление завершенных заданий из истории"""
+        with self._condition:
+            self._jobs = [job for job in self._jobs if not job.is_finished]
+        self.queue_changed.emit()
+
+    def shutdown(self, timeout_ms=5000):
+        """Отмена всех заданий и остановка потока инференса (при выходе из приложения)"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self.cancel_all()
+        if self._thread is not None:
+            self._thread.wait(timeout_ms)
+
+    def _pending(self):
+        queued = [(job.priority, index, job) for index, job in enumerate(self._jobs) if job.status == JOB_QUEUED]
+        return [job for _, _, job in sorted(queued, key=lambda item: item[:2])]
+
+    def _trim_history(self):
+        finished = [job for job in self._jobs if job.is_finished]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.remove(job)
+
+    def _set_finished(self, job, status):
+        job.status = status
+        job.finished = time.time()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        self._thread = InferenceThread(self)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+        self._thread.start()
+
+    def _take(self):
+        """Ожидание следующего задания (в потоке инференса); None - остановка"""
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+                pending = self._pending()
+                if pending:
+                    job = pending[0]
+                    job.status = JOB_RUNNING
+                    job.started = time.time()
+                    return job
+                self._condition.wait()
+
+    def _run(self, job):
+        """Выполнение задания в потоке инференса"""
+        # Импортируем здесь, чтобы избежать циклического импорта
+        from generation_window import GenerationWorker
+
+        worker = GenerationWorker(
+            job.text, job.voice_path, job.play_after, job.save_file, job.filename,
+            job.device, job.language, job.performance, job.export_format, job.bitrate
+        )
+        result = []
+        worker.progress_updated.connect(lambda value, message: self._on_progress(job, value, message))
+        worker.chunk_finished.connect(lambda done, total: self.job_chunk_finished.emit(job, done, total))
+        worker.stage_progress.connect(lambda event: self.job_stage_progress.emit(job, event))
+        worker.generation_finished.connect(lambda *args: result.append(args))
+
+        with self._condition:
+            self._worker = worker
+            if job.cancel_requested:
+                # Отмена пришла между _take и созданием воркера - run() сразу завершится
+                worker.stop()
+        self.job_changed.emit(job)
+        self.queue_changed.emit()
+        try:
+            worker.run()
+        except Exception as e:
+            # Воркер сообщает об ошибках генерации сам; здесь - непредвиденная ошибка вне его обработки
+            result[:] = [(False, f"Ошибка выполнения задания: {e}", "")]
+        finally:
+            with self._condition:
+                self._worker = None
+            export = worker.export_future
+            if result and result[0][0] and export is not None and not export.done():
+                # Кодирование идет в пуле экспорта, поток инференса берет следующее задание
+                job.status = JOB_ENCODING
+                self.job_changed.emit(job)
+                export.add_done_callback(lambda future: self._finish(job, result, future))
+            else:
+                self._finish(job, result, export)
+
+    def _finish(self, job, result, export=None):
+        """Итог задания; при экспорте - после завершения кодирования"""
+        if result:
+            success, message, file_path = result[0]
+            error = export.exception() if success and export is not None else None
+            if error is not None:
+                success, message, file_path = False, f"Ошибка кодирования: {error}", ""
+            result = (success, message, file_path)
+        with self._condition:
+            if result:
+                success, job.result_message, job.file_path = result
+                self._set_finished(job, JOB_DONE if success else JOB_FAILED)
+            else:
+                # Прерванный воркер не сообщает о завершении
+                self._set_finished(job, JOB_CANCELLED)
+            self._trim_history()
+        if result:
+            self.job_finished.emit(job, *result)
+        self.job_changed.emit(job)
+        self.queue_changed.emit()
+
+    def _on_progress(self, job, value, message):
+        job.progress = value
+        job.message = message
+        self.job_progress.emit(job, value, message)
+
+
+class InferenceThread(QThread):
+    """Долгоживущий поток инференса: задания очереди выполняются по одному"""
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    def run(self):
+        while True:
+            job = self.queue._take()
+            if job is None:
+                return
+            try:
+                self.queue._run(job)
+            except Exception as e:
+                # Ошибка одного задания не останавливает очередь: задание завершается с ошибкой (job_finished)
+                if not job.is_finished:
+                    self.queue._finish(job, [(False, f"Ошибка выполнения задания: {e}", "")])
+
+
+# Глобальная очередь для всех окон генерации
+job_queue = JobQueue()
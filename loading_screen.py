@@ -1,9 +1,15 @@
 import sys, time, math
+import logging
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QRectF, QSize, QPointF
 from PyQt6.QtGui import QMovie, QPainter, QPaintEvent, QColor, QPen, QBrush
 
+# Загружать модель в фоне, пока пользователь выбирает голос
+SPECULATIVE_PRELOAD = True
+
+logger = logging.getLogger(__name__)
+
 
 class SimpleSpinner(QWidget):
     """Простой анимированный спиннер"""
@@ -53,6 +59,7 @@ class SimpleLoadingWindow(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.start_time = time.time()
+        self.status = "Загрузка..."
         self.setWindowTitle("Загрузка...")
         self.setFixedSize(400, 200)
         # Безрамочное окно
@@ -110,7 +117,12 @@ class SimpleLoadingWindow(QWidget):
         elapsed = time.time() - self.start_time
         seconds = int(elapsed)
         milliseconds = int((elapsed - seconds) * 100)
-        self.timer_label.setText(f"Загрузка... ({seconds}.{milliseconds:02d} сек)")
+        self.timer_label.setText(f"{self.status} ({seconds}.{milliseconds:02d} сек)")
+
+    def set_status(self, status):
+        """Текущий этап загрузки"""
+        self.status = status
+        self.update_display()
         
     def close_loading(self):
         """Закрытие окна загрузки"""
@@ -118,36 +130,68 @@ class SimpleLoadingWindow(QWidget):
 
 
 class SimpleLoadingWorker(QThread):
-    """Поток для загрузки библиотек"""
+    """
+    Поток загрузки модели, прогревочного синтеза и подготовки условий голоса.
+    Без явных параметров используются текущие настройки генерации (generation_settings),
+    чтобы прогревалась та же модель (устройство, int8, бэкенд), что будет генерировать.
+    """
     
     loading_finished = pyqtSignal()
+    loading_failed = pyqtSignal(str)  # сообщение об ошибке; loading_finished все равно отправляется
+    status_changed = pyqtSignal(str)
     
-    def __init__(self):
+    def __init__(self, voice_file=None, device=None, language=None, performance=None, warmup=True):
         super().__init__()
+        self.voice_file = str(voice_file) if voice_file else None
+        self.device = device
+        self.language = language
+        self.performance = performance
+        self.warmup = warmup
         
     def run(self):
         try:
-            # Импорт основных библиотек
-            import os
-            import sys
-            import time
-            
-            # Импорт PyQt6
-            from PyQt6.QtWidgets import QApplication
-            from PyQt6.QtCore import Qt
-            
-            # Импорт torch
-            import torch
-            
-            # Импорт numpy
-            import numpy as np
-            
-            # Импорт chatterbox
-            from chatterbox.mtl_tts import ChatterboxMultilingualTTS
-            
-            self.loading_finished.emit()
+            self.status_changed.emit("Загрузка модели...")
+            from voice import VoiceGenerator
+            from generation_settings import generation_settings
+
+            # Устройство по умолчанию определяется здесь: опрос CUDA не должен блокировать окно
+            self.device = self.device or generation_settings.device
+            self.language = self.language or generation_settings.language
+            self.performance = self.performance or generation_settings.performance
+
+            # Если модель уже загружается в фоне, ждем ее вместо повторной загрузки
+            voice_generator = VoiceGenerator(device=self.device, language=self.language,
+                                             performance=self.performance)
+            voice_generator.load_model()
+
+            # torch уже загружен - обновляем кэш возможностей устройств для следующих запусков
+            from device_info import refresh_device_cache
+            refresh_device_cache()
+
+            self.status_changed.emit("Подготовка голоса...")
+            voice_generator.preload(self.voice_file, warmup=self.warmup)
             
         except Exception as e:
-            self.loading_finished.emit()
+            # Ошибка загрузки повторится и будет показана при генерации
+            logger.warning("Ошибка предварительной загрузки модели: %s", e)
+            self.loading_failed.emit(str(e))
+
+        self.loading_finished.emit()
+
+
+# Фоновая загрузка, запущенная из менеджера голосов (ссылка держит поток живым)
+_speculative_worker = None
 
 
+def start_speculative_preload(device=None, language=None, performance=None):
+    """
+    Упреждающая загрузка и прогрев модели в фоне с низким приоритетом
+    (по умолчанию - для текущих настроек генерации)
+    """
+    global _speculative_worker
+    if not SPECULATIVE_PRELOAD:
+        return
+    if _speculative_worker is not None and _speculative_worker.isRunning():
+        return
+    _speculative_worker = SimpleLoadingWorker(device=device, language=language, performance=performance)
+    _speculative_worker.start(QThread.Priority.LowPriority)
@@ -1,5 +1,11 @@
+import os
 import sys
+import time
 from pathlib import Path
+
+# Отсчет времени запуска до импорта Qt
+STARTUP_TIME = time.perf_counter()
+
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 from styles import AppStyles
@@ -21,4 +27,17 @@ from voice_manager import VoiceManagerWindow
 window = VoiceManagerWindow()
 window.show()
 
+# Профилирование запуска: время до интерактивного окна и загруженные тяжелые модули
+if os.environ.get("AI_VOICE_STARTUP_PROFILE"):
+    from PyQt6.QtCore import QTimer
+
+    def report_startup():
+        import json
+        heavy = sorted(name for name in ("torch", "torchaudio", "chatterbox", "transformers") if name in sys.modules)
+        print(json.dumps({"startup_s": time.perf_counter() - STARTUP_TIME, "heavy_modules": heavy}), flush=True)
+        app.quit()
+
+    # Срабатывает после запуска цикла событий, когда окно уже отрисовано
+    QTimer.singleShot(0, report_startup)
+
 sys.exit(app.exec())
\ No newline at end of file
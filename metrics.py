@@ -0,0 +1,152 @@
+"""
+Метрики генерации: время по этапам, скорость семплирования, RTF и пиковая память
+"""
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+
+# Файл журнала метрик (одна запись JSON на строку)
+METRICS_FILE = Path("logs") / "metrics.jsonl"
+
+# Этапы, время которых накапливается в записи (секунды)
+STAGE_FIELDS = ("load", "conditioning", "sampling", "decoding", "vocoder", "watermark", "playback", "save")
+
+_write_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    """Пиковый объем резидентной памяти процесса в МБ (None, если недоступно)"""
+    try:
+        import resource
+    except ImportError:
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize / (1024 * 1024) if counters else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb():
+    """Текущий объем резидентной памяти процесса в МБ (None, если недоступно)"""
+    if sys.platform == "win32":
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize / (1024 * 1024) if counters else None
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _windows_memory_counters():
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+class GenerationMetrics:
+    """
+    Запись метрик одной генерации. Время этапов в секундах; фрагменты
+    потоковой генерации суммируются через merge().
+    """
+
+    def __init__(self, device="", language="", text_chars=0):
+        self.timestamp = time.time()
+        self.device = str(device)
+        self.language = language
+        self.text_chars = text_chars
+        self.chunks = 0
+        self.tokens = 0
+        self.audio_seconds = 0.0
+        self.generation_time = 0.0
+        self.stages = dict.fromkeys(STAGE_FIELDS, 0.0)
+
+    @property
+    def tokens_per_sec(self):
+        sampling = self.stages["sampling"]
+        return self.tokens / sampling if sampling > 0 else 0.0
+
+    @property
+    def rtf(self):
+        """Коэффициент реального времени: время генерации / длительность аудио"""
+        return self.generation_time / self.audio_seconds if self.audio_seconds > 0 else 0.0
+
+    def add_stage(self, stage, seconds):
+        if stage in self.stages:
+            self.stages[stage] += seconds
+
+    def add_tracker(self, tracker, generation_time, audio_seconds):
+        """Учет одного вызова модели по данным ProgressTracker"""
+        for stage, seconds in tracker.durations.items():
+            self.add_stage(stage, seconds)
+        self.chunks += 1
+        self.tokens += max(tracker.tokens, 0)
+        self.generation_time += generation_time
+        self.audio_seconds += audio_seconds
+
+    def merge(self, other):
+        """Добавление метрик другого фрагмента"""
+        for stage, seconds in other.stages.items():
+            self.add_stage(stage, seconds)
+        self.chunks += other.chunks
+        self.tokens += other.tokens
+        self.generation_time += other.generation_time
+        self.audio_seconds += other.audio_seconds
+
+    def to_dict(self):
+        from result_cache import model_version
+
+        record = {
+            "timestamp": self.timestamp,
+            "device": self.device,
+            "language": self.language,
+            "model_version": model_version(),
+            "text_chars": self.text_chars,
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "tokens_per_sec": round(self.tokens_per_sec, 2),
+            "audio_seconds": round(self.audio_seconds, 3),
+            "generation_time": round(self.generation_time, 3),
+            "rtf": round(self.rtf, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        record.update({f"{stage}_time": round(seconds, 4) for stage, seconds in self.stages.items()})
+        return record
+
+    def __repr__(self):
+        stages = ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in self.stages.items() if seconds)
+        return f"GenerationMetrics({stages}, {self.tokens_per_sec:.1f} tok/s, RTF {self.rtf:.2f})"
+
+
+def append_metrics(metrics, path=METRICS_FILE):
+    """Добавление записи в журнал метрик (ошибки записи не прерывают генерацию)"""
+    record = metrics.to_dict() if isinstance(metrics, GenerationMetrics) else metrics
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        return False
+    return True
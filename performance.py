@@ -0,0 +1,149 @@
+"""
+Режим производительности для CPU: потоки, inference_mode, bfloat16, int8-квантизация
+и бэкенд выполнения (eager, torch.compile, ONNX Runtime)
+"""
+import os
+from contextlib import contextmanager, ExitStack
+
+# Вариант модели в реестре, если веса трансформера квантизованы
+INT8_VARIANT = "int8"
+# Бэкенды выполнения (реализация в backends.py)
+BACKEND_EAGER = "eager"
+BACKEND_COMPILE = "compile"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_EAGER, BACKEND_COMPILE, BACKEND_ONNX)
+# Бэкенд по умолчанию можно задать переменной окружения
+DEFAULT_BACKEND = os.environ.get("AI_VOICE_BACKEND", BACKEND_EAGER)
+
+
+class PerformanceConfig:
+    """
+    Настройки выполнения модели.
+    intra_op_threads / inter_op_threads: число потоков torch (None - по умолчанию);
+    inference_mode: генерация без учета автоградиента;
+    bf16_autocast: семплирование токенов T3 в bfloat16 (только CPU);
+    int8_quantization: динамическая int8-квантизация линейных слоев трансформера T3 (только CPU);
+    backend: eager, compile (torch.compile) или onnx (декодер S3Gen в ONNX Runtime).
+    """
+
+    FIELDS = ("intra_op_threads", "inter_op_threads", "inference_mode", "bf16_autocast", "int8_quantization",
+              "backend")
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=None, inference_mode=True,
+                 bf16_autocast=False, int8_quantization=False, backend=DEFAULT_BACKEND):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.inference_mode = inference_mode
+        self.bf16_autocast = bf16_autocast
+        self.int8_quantization = int8_quantization
+        self.backend = backend
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in cls.FIELDS if key in data})
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def model_variant(self, device):
+        """
+        Вариант модели в реестре: квантизованная и подготовленная бэкендом модели
+        загружаются отдельно. Части варианта перечислены через '+' в порядке применения.
+        """
+        parts = []
+        if self.int8_quantization and str(device).startswith("cpu"):
+            parts.append(INT8_VARIANT)
+        if self.backend and self.backend != BACKEND_EAGER:
+            parts.append(self.backend)
+        return "+".join(parts)
+
+    def result_params(self, device):
+        """Настройки, от которых зависит синтезированное аудио (для ключа кэша результатов)"""
+        return {
+            "variant": self.model_variant(device),
+            "bf16": bool(self.bf16_autocast and str(device).startswith("cpu")),
+            "backend": self.backend or BACKEND_EAGER,
+        }
+
+    def label(self):
+        """Краткое описание для отчетов"""
+        parts = [f"threads={self.intra_op_threads or 'auto'}/{self.inter_op_threads or 'auto'}"]
+        parts += [name for name in ("inference_mode", "bf16_autocast", "int8_quantization") if getattr(self, name)]
+        if self.backend and self.backend != BACKEND_EAGER:
+            parts.append(f"backend={self.backend}")
+        return "+".join(parts)
+
+    def __eq__(self, other):
+        return isinstance(other, PerformanceConfig) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PerformanceConfig({self.label()})"
+
+
+# Число потоков torch до первой настройки (intra-op, inter-op): восстанавливается для None
+_default_threads = None
+
+
+def apply_thread_settings(config):
+    """Настройка числа потоков torch (глобально для процесса); None - исходное число потоков"""
+    global _default_threads
+    import torch
+
+    if _default_threads is None:
+        _default_threads = (torch.get_num_threads(), torch.get_num_interop_threads())
+    intra_op_threads = config.intra_op_threads or _default_threads[0]
+    inter_op_threads = config.inter_op_threads or _default_threads[1]
+
+    if torch.get_num_threads() != intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if torch.get_num_interop_threads() != inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Число inter-op потоков можно задать только до первой параллельной операции
+            pass
+
+
+def quantize_model(model):
+    """Динамическая int8-квантизация линейных слоев трансформера T3 на месте"""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    quantize_dynamic(model.t3.tfmr, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+@contextmanager
+def _autocast_method(owner, name, dtype):
+    """Выполнение метода объекта под autocast (через атрибут экземпляра, снимается после блока)"""
+    import torch
+
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        with torch.autocast(device_type="cpu", dtype=dtype):
+            return original(*args, **kwargs)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        delattr(owner, name)
+
+
+@contextmanager
+def inference_context(config, model, device):
+    """
+    Контекст генерации: потоки, inference_mode и bfloat16 для семплирования T3.
+    S3Gen остается в float32 - вокодер использует операции без bfloat16 (istft).
+    """
+    import torch
+
+    apply_thread_settings(config)
+    with ExitStack() as stack:
+        if config.inference_mode:
+            stack.enter_context(torch.inference_mode())
+        t3 = getattr(model, "t3", None)
+        if config.bf16_autocast and str(device).startswith("cpu") and hasattr(t3, "inference"):
+            stack.enter_context(_autocast_method(t3, "inference", torch.bfloat16))
+        yield
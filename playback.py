@@ -0,0 +1,412 @@
+"""
+Движок воспроизведения: один постоянно открытый выходной поток, который читает
+кольцевой буфер без блокировок. Треки ставятся в очередь и могут дополняться
+фрагментами, пока синтез еще идет; поддерживаются остановка, перемотка и пропуск.
+"""
+import os
+import time
+import atexit
+import threading
+from collections import deque
+
+import numpy as np
+
+# Размер блока выходного потока (кадры) и емкость кольцевого буфера (секунды)
+BLOCK_SIZE = 1024
+BUFFER_SECONDS = 0.5
+# Интервал подкачки буфера во время воспроизведения и опроса в простое (секунды)
+FEED_INTERVAL = 0.01
+IDLE_POLL_INTERVAL = 0.5
+# Через сколько секунд простоя выходной поток закрывается (освобождает устройство)
+IDLE_CLOSE_SECONDS = 60.0
+# Выход по умолчанию: sounddevice или null (без звуковой карты, для тестов и серверов)
+AUDIO_SINK = os.environ.get("AI_VOICE_AUDIO_SINK", "sounddevice")
+
+
+class RingBuffer:
+    """
+    Кольцевой буфер float32 для одного писателя и одного читателя без блокировок.
+    Писатель меняет только write_pos, читатель - только read_pos; позиции монотонно
+    растут, присваивание int атомарно. Данные публикуются после копирования.
+    Сброс (discard) - метка писателя, которую читатель применяет при следующем чтении.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self._discard_pos = 0
+
+    @property
+    def available(self):
+        """Кадров, еще не прочитанных читателем"""
+        return self.write_pos - self.read_pos
+
+    @property
+    def space(self):
+        return self.capacity - self.available
+
+    def write(self, samples):
+        """Запись сколько помещается; возвращает число записанных кадров (писатель)"""
+        count = min(len(samples), self.space)
+        if count <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:count - first] = samples[first:count]
+        self.write_pos += count
+        return count
+
+    def discard(self):
+        """Отбросить все записанное (писатель); читатель пропустит данные до текущей позиции"""
+        self._discard_pos = self.write_pos
+
+    def read_into(self, out):
+        """Чтение в массив out; возвращает число прочитанных кадров (читатель)"""
+        read_pos = max(self.read_pos, self._discard_pos)
+        count = min(len(out), self.write_pos - read_pos)
+        if count > 0:
+            start = read_pos % self.capacity
+            first = min(count, self.capacity - start)
+            out[:first] = self._data[start:start + first]
+            out[first:count] = self._data[:count - first]
+            read_pos += count
+        self.read_pos = read_pos
+        return max(count, 0)
+
+
+class SoundDeviceSink:
+    """Выходной поток sounddevice; данные запрашиваются функцией render из аудиопотока"""
+
+    def __init__(self, sample_rate, block_size=BLOCK_SIZE):
+        import sounddevice as sd
+
+        self.sample_rate = sample_rate
+        self._render = None
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate, channels=1, dtype="float32",
+            blocksize=block_size, callback=self._callback
+        )
+
+    def start(self, render):
+        self._render = render
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        self._render(outdata[:, 0])
+
+    def close(self):
+        self._stream.stop()
+        self._stream.close()
+
+
+class NullSink:
+    """
+    Выход без звуковой карты. С speed потребляет буфер в своем потоке
+    (1.0 - в реальном времени), без speed - только по вызовам pump().
+    При record=True сыгранные кадры сохраняются в played.
+    """
+
+    def __init__(self, sample_rate, block_size=BLOCK_SIZE, speed=1.0, record=False):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.speed = speed
+        self.record = record
+        self.played = []
+        self.frames_rendered = 0
+        self._render = None
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self, render):
+        self._render = render
+        if self.speed:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def pump(self, blocks=1):
+        """Запрос blocks блоков, как это сделал бы аудиопоток"""
+        for _ in range(blocks):
+            out = np.zeros(self.block_size, dtype=np.float32)
+            self._render(out)
+            self.frames_rendered += self.block_size
+            if self.record:
+                self.played.append(out)
+
+    def _run(self):
+        interval = self.block_size / self.sample_rate / self.speed
+        while not self._closed.wait(interval):
+            self.pump()
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def default_sink_factory(sample_rate, block_size):
+    if AUDIO_SINK == "null":
+        return NullSink(sample_rate, block_size)
+    return SoundDeviceSink(sample_rate, block_size)
+
+
+class PlaybackTrack:
+    """
+    Трек в очереди воспроизведения. Фрагменты добавляются через feed() до finish().
+    Громкость нормализуется по максимальному пику всего переданного на момент чтения:
+    трек, переданный целиком, нормализуется как единый массив. У потокового трека
+    кадры, уже перенесенные в кольцевой буфер, сохраняют прежнее усиление - если
+    следующий фрагмент громче, громкость после него станет ниже.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.error = None
+        self.cancelled = False
+        self.done = threading.Event()
+        # Кадров сыграно (по позиции читателя буфера)
+        self.played_frames = 0
+        self._data = np.zeros(0, dtype=np.float32)
+        self._frames = 0
+        self._peak = 0.0
+        self._finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def frames(self):
+        return self._frames
+
+    @property
+    def finished(self):
+        """Все фрагменты переданы"""
+        return self._finished
+
+    @property
+    def duration(self):
+        return self._frames / self.sample_rate
+
+    @property
+    def position(self):
+        return self.played_frames / self.sample_rate
+
+    def feed(self, samples):
+        """Добавление фрагмента (можно вызывать, пока трек уже играет)"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if samples.size:
+                self._peak = max(self._peak, float(np.max(np.abs(samples))))
+            end = self._frames + len(samples)
+            if end > len(self._data):
+                # Емкость растет вдвое, чтобы добавление фрагментов не копировало весь трек каждый раз
+                grown = np.zeros(max(end, 2 * len(self._data)), dtype=np.float32)
+                grown[:self._frames] = self._data[:self._frames]
+                self._data = grown
+            self._data[self._frames:end] = samples
+            self._frames = end
+
+    def finish(self):
+        self._finished = True
+
+    def read(self, start, count):
+        """Кадры трека с усилением по текущему пику (нормализуются только еще не прочитанные данные)"""
+        with self._lock:
+            return self._data[start:min(start + count, self._frames)] / (self._peak + 1e-9)
+
+    def wait(self, timeout=None):
+        """Ожидание окончания воспроизведения; возвращает True без ошибок и остановки"""
+        self.done.wait(timeout)
+        return self.done.is_set() and self.error is None and not self.cancelled
+
+    def _complete(self, error=None, cancelled=False):
+        self.error = error
+        self.cancelled = cancelled
+        self.done.set()
+
+
+class PlaybackEngine:
+    """
+    Воспроизведение очереди треков через один выходной поток.
+    Поток подкачки переносит кадры текущего трека в кольцевой буфер,
+    аудиопоток только читает буфер, поэтому вызывающие потоки никогда
+    не ждут воспроизведения.
+    """
+
+    def __init__(self, sink_factory=default_sink_factory, block_size=BLOCK_SIZE,
+                 buffer_seconds=BUFFER_SECONDS, idle_close_seconds=IDLE_CLOSE_SECONDS):
+        self.sink_factory = sink_factory
+        self.block_size = block_size
+        self.buffer_seconds = buffer_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self._tracks = deque()
+        self._current = None
+        self._stop_current = False
+        self._seek_frames = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._sink = None
+        self._ring = None
+        self._track_start = 0
+        self._track_base = 0
+        self._cursor = 0
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def is_playing(self):
+        with self._lock:
+            return self._current is not None or bool(self._tracks)
+
+    def queued(self):
+        """Треки, ожидающие воспроизведения"""
+        with self._lock:
+            return list(self._tracks)
+
+    def play(self, sample_rate):
+        """Новый трек в конце очереди; фрагменты передаются через track.feed()"""
+        track = PlaybackTrack(sample_rate)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Движок воспроизведения закрыт")
+            self._tracks.append(track)
+            self._ensure_thread()
+        self._wakeup.set()
+        return track
+
+    def enqueue(self, samples, sample_rate):
+        """Постановка готового аудио в очередь"""
+        track = self.play(sample_rate)
+        track.feed(samples)
+        track.finish()
+        self._wakeup.set()
+        return track
+
+    def skip(self, track=None):
+        """Остановка трека (по умолчанию текущего); ожидающий трек убирается из очереди"""
+        with self._lock:
+            if track is None or track is self._current:
+                self._stop_current = self._current is not None
+            elif track in self._tracks:
+                self._tracks.remove(track)
+                track._complete(cancelled=True)
+        self._wakeup.set()
+
+    def stop(self):
+        """Остановка воспроизведения и очистка очереди"""
+        with self._lock:
+            while self._tracks:
+                self._tracks.popleft()._complete(cancelled=True)
+            self._stop_current = self._current is not None
+        self._wakeup.set()
+
+    def seek(self, seconds):
+        """Перемотка текущего трека"""
+        with self._lock:
+            if self._current is not None:
+                self._seek_frames = max(0, int(seconds * self._current.sample_rate))
+        self._wakeup.set()
+
+    def close(self):
+        """Остановка воспроизведения и закрытие выходного потока"""
+        self.stop()
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="playback", daemon=True)
+            self._thread.start()
+
+    def _render(self, out):
+        """Вызывается аудиопотоком: только чтение буфера, без блокировок"""
+        count = self._ring.read_into(out)
+        if count < len(out):
+            out[count:] = 0.0
+
+    def _open_sink(self, sample_rate):
+        if self._sink is not None and self._sink.sample_rate == sample_rate:
+            return
+        self._close_sink()
+        self._ring = RingBuffer(max(int(sample_rate * self.buffer_seconds), 2 * self.block_size))
+        sink = self.sink_factory(sample_rate, self.block_size)
+        sink.start(self._render)
+        self._sink = sink
+
+    def _close_sink(self):
+        if self._sink is not None:
+            sink, self._sink = self._sink, None
+            sink.close()
+
+    def _run(self):
+        idle_since = time.monotonic()
+        while True:
+            track = self._current
+            self._wakeup.wait(FEED_INTERVAL if track is not None else IDLE_POLL_INTERVAL)
+            self._wakeup.clear()
+
+            with self._lock:
+                if self._closed:
+                    break
+                starting = False
+                if self._current is None and self._tracks:
+                    self._current = self._tracks.popleft()
+                    starting = True
+                track = self._current
+                stop, self._stop_current = self._stop_current, False
+                seek, self._seek_frames = self._seek_frames, None
+
+            if track is None:
+                if self._sink is not None and time.monotonic() - idle_since > self.idle_close_seconds:
+                    self._close_sink()
+                continue
+
+            try:
+                if starting:
+                    self._open_sink(track.sample_rate)
+                    self._track_start = self._ring.write_pos
+                    self._track_base = 0
+                    self._cursor = 0
+                if stop:
+                    self._ring.discard()
+                    self._finish_track(track, cancelled=True)
+                    idle_since = time.monotonic()
+                    continue
+                if seek is not None:
+                    self._ring.discard()
+                    self._cursor = self._track_base = min(seek, track.frames)
+                    self._track_start = self._ring.write_pos
+
+                self._cursor += self._ring.write(track.read(self._cursor, self._ring.space))
+                track.played_frames = self._track_base + max(0, self._ring.read_pos - self._track_start)
+
+                if track.finished and self._cursor >= track.frames and self._ring.available <= 0:
+                    self._finish_track(track)
+                    idle_since = time.monotonic()
+            except Exception as e:
+                self._finish_track(track, error=e)
+                self._close_sink()
+                idle_since = time.monotonic()
+
+        self._close_sink()
+
+    def _finish_track(self, track, error=None, cancelled=False):
+        with self._lock:
+            if self._current is track:
+                self._current = None
+        track._complete(error=error, cancelled=cancelled)
+        # Следующий трек начинается без ожидания интервала подкачки
+        self._wakeup.set()
+
+
+# Глобальный движок воспроизведения для всех окон и заданий
+playback_engine = PlaybackEngine()
+# Выходной поток закрывается до завершения интерпретатора, пока аудиопоток еще может вызывать Python
+atexit.register(playback_engine.close)
@@ -0,0 +1,258 @@
+"""
+Структурированный прогресс генерации: события этапов модели вместо разбора вывода tqdm.
+Те же хуки проверяют токен отмены на каждом шаге семплирования и декодирования.
+"""
+import time
+import threading
+from contextlib import contextmanager, ExitStack
+
+# Этапы генерации
+STAGE_CONDITIONING = "conditioning"
+STAGE_SAMPLING = "sampling"
+STAGE_DECODING = "decoding"
+STAGE_VOCODER = "vocoder"
+STAGE_WATERMARK = "watermark"
+STAGE_DONE = "done"
+
+# Предел числа токенов T3 (как max_new_tokens в ChatterboxMultilingualTTS.generate)
+SAMPLING_MAX_TOKENS = 1000
+# Число шагов решателя потокового декодера S3Gen
+DECODER_STEPS = 10
+# Минимальный интервал между событиями одного этапа (секунды)
+MIN_EVENT_INTERVAL = 0.1
+
+
+class GenerationCancelled(Exception):
+    """Генерация прервана через CancellationToken"""
+
+
+class CancellationToken:
+    """Флаг отмены генерации, безопасный для вызова из любого потока"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled()
+
+
+class ProgressEvent:
+    """Событие прогресса: этап, шаг, всего шагов, скорость токенов и номер фрагмента"""
+
+    __slots__ = ("stage", "step", "total", "tokens_per_sec", "chunk", "chunks")
+
+    def __init__(self, stage, step=0, total=0, tokens_per_sec=0.0, chunk=0, chunks=1):
+        self.stage = stage
+        self.step = step
+        self.total = total
+        self.tokens_per_sec = tokens_per_sec
+        self.chunk = chunk
+        self.chunks = chunks
+
+    @property
+    def fraction(self):
+        """Доля выполнения этапа от 0 до 1"""
+        return min(self.step / self.total, 1.0) if self.total else 0.0
+
+    def __repr__(self):
+        return (f"ProgressEvent({self.stage!r}, {self.step}/{self.total}, "
+                f"{self.tokens_per_sec:.1f} tok/s, chunk {self.chunk + 1}/{self.chunks})")
+
+
+def _find_module(root, path):
+    module = root
+    for name in path.split("."):
+        module = getattr(module, name, None)
+        if module is None:
+            return None
+    return module if hasattr(module, "register_forward_hook") else None
+
+
+def _find_method(root, path):
+    """Метод объекта по пути вида "s3gen.mel2wav.inference" или None"""
+    owner_path, _, name = path.rpartition(".")
+    owner = root
+    for attr in owner_path.split("."):
+        owner = getattr(owner, attr, None)
+        if owner is None:
+            return None, None
+    return (owner, name) if callable(getattr(owner, name, None)) else (None, None)
+
+
+@contextmanager
+def _wrap_method(owner, name, before=None, after=None):
+    """
+    Вызов before/after вокруг метода экземпляра на время блока.
+    Модель вызывает estimator.forward() и mel2wav.inference() напрямую, минуя __call__,
+    поэтому forward-хуки этих модулей не срабатывают. Собственный атрибут экземпляра
+    (например, forward после torch.compile) после блока восстанавливается.
+    """
+    own = vars(owner).get(name)
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        if before is not None:
+            before()
+        result = original(*args, **kwargs)
+        if after is not None:
+            after()
+        return result
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        if own is not None:
+            setattr(owner, name, own)
+        else:
+            delattr(owner, name)
+
+
+def _blocks(module):
+    """Дочерние блоки модуля; списки модулей (ModuleList) раскрываются, так как сами не вызываются"""
+    for child in module.children():
+        if hasattr(child, "__iter__"):
+            yield from child
+        else:
+            yield child
+
+
+def supports_progress_hooks(model):
+    """Есть ли у модели точки подключения для отслеживания семплирования"""
+    return _find_module(model, "t3.tfmr") is not None
+
+
+class ProgressTracker:
+    """
+    Отслеживание одной генерации через точки входа модели: каждый вызов
+    трансформера T3 (forward-хук) - один токен; s3gen.inference начинает
+    декодирование, каждый вызов estimator.forward - один шаг решателя,
+    mel2wav.inference - вокодер, после него - водяной знак.
+    События одного этапа прореживаются. Время каждого этапа накапливается
+    в durations (секунды).
+    Если передан cancel_token, перед каждым токеном, шагом декодера и блоком
+    вокодера проверяется отмена: GenerationCancelled прерывает model.generate.
+    """
+
+    def __init__(self, callback=None, chunk=0, chunks=1, max_tokens=SAMPLING_MAX_TOKENS, synchronize=None,
+                 cancel_token=None):
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.chunk = chunk
+        self.chunks = chunks
+        self.max_tokens = max_tokens
+        # Для CUDA границы этапов синхронизируются, иначе время асинхронных ядер уйдет в следующий этап
+        self.synchronize = synchronize
+        self.tokens = 0
+        self.durations = {}
+        self._stage = None
+        self._step = 0
+        self._stage_started = 0.0
+        self._last_emit = 0.0
+
+    @property
+    def tokens_per_sec(self):
+        elapsed = time.perf_counter() - self._stage_started
+        return self.tokens / elapsed if self.tokens > 0 and elapsed > 0 else 0.0
+
+    def emit(self, stage, step=0, total=0, force=False):
+        """Отправка события; внутри этапа не чаще MIN_EVENT_INTERVAL"""
+        now = time.perf_counter()
+        if stage != self._stage:
+            if self.synchronize is not None:
+                self.synchronize()
+                now = time.perf_counter()
+            self._close_stage(now)
+            self._stage = stage
+            self._stage_started = now
+            force = True
+        if self.callback is None or not force and now - self._last_emit < MIN_EVENT_INTERVAL:
+            return
+        self._last_emit = now
+        tokens_per_sec = self.tokens_per_sec if stage == STAGE_SAMPLING else 0.0
+        self.callback(ProgressEvent(stage, step, total, tokens_per_sec, self.chunk, self.chunks))
+
+    def _close_stage(self, now):
+        if self._stage is not None:
+            self.durations[self._stage] = self.durations.get(self._stage, 0.0) + now - self._stage_started
+
+    def check_cancelled(self, *args):
+        """Прерывание генерации, если запрошена отмена (подходит как pre-hook)"""
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def _on_sampling_step(self, module, args):
+        self.check_cancelled()
+        if self._stage != STAGE_SAMPLING:
+            # Первый вызов - прямой проход по промпту, дальше по вызову на токен
+            self.tokens = -1
+            self.emit(STAGE_SAMPLING, 0, self.max_tokens)
+
+    def _on_token(self, module, args, output):
+        self.tokens += 1
+        if self.tokens > 0:
+            self.emit(STAGE_SAMPLING, self.tokens, self.max_tokens)
+
+    def _on_decoding(self):
+        # Декодирование начинается с входа в s3gen.inference: кодировщик потока тоже его часть
+        self.check_cancelled()
+        self._step = 0
+        self.emit(STAGE_DECODING, 0, DECODER_STEPS)
+
+    def _on_decoder_step(self):
+        if self._stage != STAGE_DECODING:
+            self._step = 0
+        self._step += 1
+        self.emit(STAGE_DECODING, self._step, DECODER_STEPS, force=self._step >= DECODER_STEPS)
+
+    def _on_vocoder(self):
+        self.check_cancelled()
+        self.emit(STAGE_VOCODER, 0, 1)
+
+    def _on_vocoder_done(self):
+        # После вокодера модель накладывает водяной знак
+        self.emit(STAGE_WATERMARK, 0, 1)
+
+    @contextmanager
+    def attach(self, model):
+        """Подключение хуков к модели на время генерации"""
+        handles = []
+        with ExitStack() as stack:
+            tfmr = _find_module(model, "t3.tfmr")
+            if tfmr is not None:
+                # T3 вызывает трансформер через __call__ - достаточно forward-хуков
+                handles.append(tfmr.register_forward_pre_hook(self._on_sampling_step))
+                handles.append(tfmr.register_forward_hook(self._on_token))
+            owner, name = _find_method(model, "s3gen.inference")
+            if owner is not None:
+                stack.enter_context(_wrap_method(owner, name, before=self._on_decoding))
+            owner, name = _find_method(model, "s3gen.flow.decoder.estimator.forward")
+            if owner is not None:
+                stack.enter_context(_wrap_method(owner, name, before=self.check_cancelled,
+                                                 after=self._on_decoder_step))
+            owner, name = _find_method(model, "s3gen.mel2wav.inference")
+            if owner is not None:
+                stack.enter_context(_wrap_method(owner, name, before=self._on_vocoder,
+                                                 after=self._on_vocoder_done))
+            vocoder = _find_module(model, "s3gen.mel2wav")
+            if vocoder is not None and self.cancel_token is not None:
+                # Вокодер - один вызов; отмена проверяется перед каждым его блоком (блоки вызываются через __call__)
+                for layer in _blocks(vocoder):
+                    handles.append(layer.register_forward_pre_hook(self.check_cancelled))
+            try:
+                yield self
+            finally:
+                for handle in handles:
+                    handle.remove()
+
+    def finish(self):
+        """Завершение генерации: закрывает последний этап"""
+        self.emit(STAGE_DONE, 1, 1, force=True)
@@ -0,0 +1,208 @@
+"""
+Кэш готовых результатов синтеза с адресацией по содержимому и вытеснением LRU
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+from contextlib import contextmanager
+
+from conditioning_cache import conditioning_cache
+from performance import PerformanceConfig
+
+RESULT_CACHE_DIR = Path("cache") / "results"
+# Ограничение размера кэша (МБ)
+RESULT_CACHE_MAX_MB = 1024
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = "index.lock"
+
+
+def normalize_text(text):
+    """Нормализация текста для ключа кэша"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def model_version():
+    """Версия пакета модели для ключа кэша"""
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version("chatterbox-tts")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def link_or_copy(source, target):
+    """Жесткая ссылка на файл, при невозможности - копия"""
+    source, target = Path(source), Path(target)
+    tmp_path = target.with_name(target.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    tmp_path.replace(target)
+
+
+@contextmanager
+def file_lock(lock_path):
+    """Межпроцессная блокировка по файлу: кэш общий для окна генерации, сервера и пакетной обработки"""
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                f.seek(0)
+                try:
+                    # LK_LOCK ждет около 10 секунд, затем бросает OSError - ждем дальше
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ResultCache:
+    """
+    Кэш аудио на диске. Ключ - хэш нормализованного текста, содержимого голоса,
+    языка, параметров семплирования, режима выполнения модели и версии модели.
+    При превышении лимита удаляются давно не использованные записи.
+    Индекс (ключ -> {"size": байты, "last_used": время}) читается с диска
+    при каждом обращении под файловой блокировкой, так как кэш делят процессы.
+    """
+
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_mb=RESULT_CACHE_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def key_for(self, text, voice_file=None, language="ru", params=None, performance=None, device="cpu",
+                sampling="generate"):
+        """
+        Ключ кэша для параметров генерации.
+        performance (PerformanceConfig) и device задают вариант модели (int8, бэкенд) и bfloat16,
+        sampling - путь семплирования T3 (generate() или пакетный, см. batch_inference):
+        результаты разных режимов не подменяют друг друга.
+        """
+        if params is None:
+            from batch_inference import (TEMPERATURE, CFG_WEIGHT, REPETITION_PENALTY,
+                                         MIN_P, TOP_P, MAX_NEW_TOKENS)
+            params = {
+                "temperature": TEMPERATURE, "cfg_weight": CFG_WEIGHT,
+                "repetition_penalty": REPETITION_PENALTY, "min_p": MIN_P,
+                "top_p": TOP_P, "max_new_tokens": MAX_NEW_TOKENS,
+            }
+        voice_hash = conditioning_cache.content_hash(voice_file) if voice_file else ""
+        payload = json.dumps({
+            "text": normalize_text(text),
+            "voice": voice_hash,
+            "language": language,
+            "params": params,
+            "sampling": sampling,
+            "performance": (performance or PerformanceConfig()).result_params(device),
+            "model": model_version(),
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return self.cache_dir / f"{key}.wav"
+
+    def lookup(self, key):
+        """Путь к закэшированному аудио или None"""
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        with self._index() as index:
+            if key not in index:
+                # Файл без записи в индексе принимается в кэш
+                index[key] = {"size": path.stat().st_size}
+            index[key]["last_used"] = time.time()
+        return path
+
+    def materialize(self, key, target_path):
+        """Копия (или жесткая ссылка) закэшированного аудио по нужному пути"""
+        path = self.lookup(key)
+        if path is None:
+            return False
+        link_or_copy(path, target_path)
+        return True
+
+    def store(self, key, source_path, move=False):
+        """Добавление готового WAV файла в кэш"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        if move:
+            Path(source_path).replace(path)
+        else:
+            link_or_copy(source_path, path)
+
+        with self._index() as index:
+            index[key] = {"size": path.stat().st_size, "last_used": time.time()}
+            self._evict(index)
+
+    def temp_path(self, key):
+        """Путь для временной записи аудио перед store(move=True)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir / f"{key}.part.wav"
+
+    @contextmanager
+    def _index(self):
+        """Индекс с диска под блокировкой потоков и процессов; изменения сохраняются после блока"""
+        with self._lock, file_lock(self.cache_dir / LOCK_FILENAME):
+            index = self._load_index()
+            saved = json.dumps(index, sort_keys=True)
+            yield index
+            if json.dumps(index, sort_keys=True) != saved:
+                self._save_index(index)
+
+    def _evict(self, index):
+        # Сверка с папкой: записи без файлов удаляются, файлы без записей
+        # (индекс перезаписан другим процессом до этой версии) учитываются в лимите
+        for key in [k for k in index if not self.path_for(k).exists()]:
+            del index[key]
+        for path in self.cache_dir.glob("*.wav"):
+            # Временные файлы ({ключ}.part.wav и т.п.) в индекс не попадают
+            if "." not in path.stem and path.stem not in index:
+                stat = path.stat()
+                index[path.stem] = {"size": stat.st_size, "last_used": stat.st_mtime}
+
+        total = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= index.pop(key)["size"]
+            self.path_for(key).unlink(missing_ok=True)
+
+    def _load_index(self):
+        try:
+            with open(self.cache_dir / INDEX_FILENAME, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _save_index(self, index):
+        index_path = self.cache_dir / INDEX_FILENAME
+        tmp_path = index_path.with_name(INDEX_FILENAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        tmp_path.replace(index_path)
+
+
+# Глобальный экземпляр для использования в других модулях
+result_cache = ResultCache()
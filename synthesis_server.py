@@ -0,0 +1,400 @@
+"""
+Локальный HTTP сервер синтеза речи с очередью запросов и микро-пакетами
+
+Пример:
+    python synthesis_server.py --device cpu --port 8765
+
+    POST /synthesize  {"text": "...", "voice": "имя", "language": "ru", "stream": false}
+    GET  /health
+
+Ответ - WAV (audio/wav). При "stream": true аудио отдается частями
+(chunked transfer) по мере генерации предложений; потоковый запрос
+занимает одно место в очереди независимо от длины текста.
+"""
+import io
+import sys
+import json
+import time
+import wave
+import argparse
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from text_utils import split_text_into_chunks
+
+VOICES_DIR = Path("voices")
+# Максимальное число запросов в очереди (потоковый - один запрос), сверх него - 429
+DEFAULT_QUEUE_SIZE = 32
+# Максимальный размер микро-пакета
+DEFAULT_MAX_BATCH = 4
+# Сколько ждать соседние запросы для объединения в пакет (сек)
+DEFAULT_BATCH_WINDOW = 0.05
+# Таймаут одного запроса (сек)
+DEFAULT_REQUEST_TIMEOUT = 120.0
+
+
+class QueueFullError(Exception):
+    """Очередь запросов заполнена"""
+
+
+class SynthesisRequest:
+    """Запрос на синтез одного фрагмента"""
+
+    def __init__(self, text, voice, language, timeout, stream=False):
+        self.text = text
+        self.voice = voice
+        self.language = language
+        # Фрагмент потокового запроса: место в очереди занято самим потоком
+        self.stream = stream
+        self.deadline = time.monotonic() + timeout
+        self.audio = None
+        self.sample_rate = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def group_key(self):
+        return self.voice, self.language
+
+    def expired(self):
+        return time.monotonic() > self.deadline
+
+    def cancel(self):
+        """Отмена запроса: поток инференса пропустит его"""
+        self.deadline = 0.0
+
+    def set_result(self, audio, sample_rate):
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self._done.set()
+
+    def set_error(self, error):
+        self.error = error
+        self._done.set()
+
+    def wait(self):
+        """Ожидание результата до истечения таймаута"""
+        if not self._done.wait(max(0.0, self.deadline - time.monotonic())):
+            raise TimeoutError("Истекло время ожидания синтеза")
+        if self.error is not None:
+            raise self.error
+        return self.audio, self.sample_rate
+
+
+class VoiceGeneratorBackend:
+    """
+    Синтез через общую резидентную модель VoiceGenerator.
+    Микро-пакет генерируется по одному фрагменту через generate();
+    при batched_sampling=True - пакетным семплированием T3 (без анализатора выравнивания).
+    """
+
+    def __init__(self, device="cuda", batched_sampling=False):
+        self.device = device
+        self.batched_sampling = batched_sampling
+        self._generators = {}
+
+    def synthesize(self, texts, voice, language):
+        from voice import VoiceGenerator
+
+        generator = self._generators.setdefault(language, VoiceGenerator(device=self.device, language=language))
+        batch_size = len(texts) if self.batched_sampling else 1
+        audios, sr, _ = generator.generate_batch(texts, voice, batch_size=batch_size)
+        return [audio.squeeze().detach().cpu().numpy().astype(np.float32) for audio in audios], sr
+
+
+class MicroBatcher:
+    """
+    Очередь запросов с одним потоком инференса.
+    Запросы с одинаковым голосом и языком, пришедшие в пределах batch_window,
+    объединяются в один вызов модели.
+    В очереди не больше queue_size мест: место занимает ожидающий запрос
+    или открытый потоковый запрос (его фрагменты мест не занимают).
+    """
+
+    def __init__(self, backend, queue_size=DEFAULT_QUEUE_SIZE, max_batch=DEFAULT_MAX_BATCH,
+                 batch_window=DEFAULT_BATCH_WINDOW):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._requests = []  # ожидающие запросы в порядке поступления
+        self._streams = 0  # открытые потоковые запросы
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def queued(self):
+        """Число ожидающих фрагментов"""
+        with self._condition:
+            return len(self._requests)
+
+    @property
+    def streams(self):
+        """Число открытых потоковых запросов"""
+        with self._condition:
+            return self._streams
+
+    def submit(self, text, voice=None, language="ru", timeout=DEFAULT_REQUEST_TIMEOUT, stream=False):
+        """
+        Постановка запроса в очередь; при переполнении - QueueFullError.
+        stream=True - фрагмент потокового запроса, место под который занято stream_slot().
+        """
+        request = SynthesisRequest(text, voice, language, timeout, stream)
+        with self._condition:
+            if not stream and self._occupied() >= self.queue_size:
+                raise QueueFullError("Очередь синтеза заполнена")
+            self._requests.append(request)
+            self._condition.notify()
+        return request
+
+    @contextmanager
+    def stream_slot(self):
+        """Место в очереди на все время потокового запроса; при переполнении - QueueFullError"""
+        with self._condition:
+            if self._occupied() >= self.queue_size:
+                raise QueueFullError("Очередь синтеза заполнена")
+            self._streams += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._streams -= 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _occupied(self):
+        return self._streams + sum(1 for r in self._requests if not r.stream)
+
+    def _next_batch(self):
+        """Сбор пакета запросов с одинаковым голосом и языком"""
+        with self._condition:
+            if not self._requests:
+                self._condition.wait(0.1)
+                if not self._requests:
+                    return []
+
+            key = self._requests[0].group_key
+            deadline = time.monotonic() + self.batch_window
+            while sum(1 for r in self._requests if r.group_key == key) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [r for r in self._requests if r.group_key == key][:self.max_batch]
+            self._requests = [r for r in self._requests if r not in batch]
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+
+            # Просроченные запросы не тратят время модели
+            for request in [r for r in batch if r.expired()]:
+                request.set_error(TimeoutError("Истекло время ожидания синтеза"))
+            batch = [r for r in batch if not r.expired()]
+            if not batch:
+                continue
+
+            voice, language = batch[0].group_key
+            try:
+                audios, sample_rate = self.backend.synthesize([r.text for r in batch], voice, language)
+            except Exception as e:
+                for request in batch:
+                    request.set_error(e)
+                continue
+
+            for request, audio in zip(batch, audios):
+                request.set_result(audio, sample_rate)
+
+
+def _pcm16(audio):
+    audio = np.clip(np.asarray(audio, dtype=np.float32).reshape(-1), -1.0, 1.0)
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(audio, sample_rate):
+    """Кодирование моно аудио float32 в WAV PCM16"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(_pcm16(audio))
+    return buffer.getvalue()
+
+
+def streaming_wav_header(sample_rate):
+    """Заголовок WAV неизвестной длины для потоковой отдачи"""
+    unknown = 0xFFFFFFFF
+    return (b"RIFF" + unknown.to_bytes(4, "little") + b"WAVEfmt "
+            + (16).to_bytes(4, "little") + (1).to_bytes(2, "little") + (1).to_bytes(2, "little")
+            + sample_rate.to_bytes(4, "little") + (sample_rate * 2).to_bytes(4, "little")
+            + (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+            + b"data" + unknown.to_bytes(4, "little"))
+
+
+class SynthesisHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP запросов синтеза"""
+
+    server_version = "AIVoiceServer/1.0"
+    # Transfer-Encoding: chunked допустим только в HTTP/1.1
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        batcher = self.server.batcher
+        self._send_json(HTTPStatus.OK, {
+            "status": "ok", "queued": batcher.queued, "streams": batcher.streams, "queue_size": batcher.queue_size,
+        })
+
+    def do_POST(self):
+        if self.path != "/synthesize":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            text = str(payload.get("text", "")).strip()
+            voice = self._resolve_voice(payload.get("voice"))
+            language = str(payload.get("language", "ru"))
+            timeout = min(float(payload.get("timeout", self.server.request_timeout)), self.server.request_timeout)
+        except (ValueError, TypeError) as e:
+            # Тело могло остаться непрочитанным - соединение не переиспользуем
+            self.close_connection = True
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        if not text:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "text is required"})
+            return
+
+        try:
+            if payload.get("stream"):
+                self._stream(text, voice, language, timeout)
+            else:
+                request = self.server.batcher.submit(text, voice, language, timeout)
+                audio, sample_rate = request.wait()
+                self._send_bytes(HTTPStatus.OK, encode_wav(audio, sample_rate), "audio/wav")
+        except QueueFullError as e:
+            self._send_json(HTTPStatus.TOO_MANY_REQUESTS, {"error": str(e)}, {"Retry-After": "1"})
+        except TimeoutError as e:
+            self._send_json(HTTPStatus.GATEWAY_TIMEOUT, {"error": str(e)})
+        except Exception as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+
+    def _stream(self, text, voice, language, timeout):
+        """
+        Потоковая отдача: запрос занимает одно место в очереди, предложения ставятся
+        в нее по одному - следующее синтезируется, пока отдается текущее.
+        При переполнении очереди отвечаем 429 до начала ответа.
+        """
+        chunks = split_text_into_chunks(text) or [text]
+        batcher = self.server.batcher
+        with batcher.stream_slot():
+            request = batcher.submit(chunks[0], voice, language, timeout, stream=True)
+            try:
+                audio, sample_rate = request.wait()
+            except Exception:
+                request.cancel()
+                raise
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                data = streaming_wav_header(sample_rate) + _pcm16(audio)
+                for chunk in chunks[1:]:
+                    request = batcher.submit(chunk, voice, language, timeout, stream=True)
+                    self._write_chunk(data)
+                    audio, _ = request.wait()
+                    data = _pcm16(audio)
+                self._write_chunk(data)
+                self._write_chunk(b"")
+            except Exception as e:
+                # Ответ уже начат - обрываем соединение, ожидающий фрагмент отменяем
+                request.cancel()
+                self.close_connection = True
+                self.log_error("Потоковая отдача прервана: %s", e)
+
+    def _resolve_voice(self, voice):
+        if not voice:
+            return None
+        path = VOICES_DIR / f"{Path(str(voice)).stem}.wav"
+        if not path.exists():
+            raise ValueError(f"voice not found: {voice}")
+        return str(path)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_bytes(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(status, body, "application/json; charset=utf-8", headers)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
+
+
+class SynthesisServer(ThreadingHTTPServer):
+    """HTTP сервер с общей очередью синтеза"""
+
+    daemon_threads = True
+
+    def __init__(self, address, batcher, request_timeout=DEFAULT_REQUEST_TIMEOUT):
+        super().__init__(address, SynthesisHandler)
+        self.batcher = batcher
+        self.request_timeout = request_timeout
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный сервер синтеза речи")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--device", default="cuda", help="устройство (cuda или cpu)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW, help="окно сбора пакета (сек)")
+    parser.add_argument("--batched-sampling", action="store_true",
+                        help="пакетное семплирование микро-пакета (быстрее, без анализатора выравнивания)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT, help="таймаут запроса (сек)")
+    args = parser.parse_args(argv)
+
+    batcher = MicroBatcher(VoiceGeneratorBackend(args.device, args.batched_sampling), args.queue_size, args.max_batch, args.batch_window)
+    server = SynthesisServer((args.host, args.port), batcher, args.timeout)
+    print(f"Сервер синтеза запущен на http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Утилиты для работы с текстом
+"""
+import re
+
+# Максимальная длина фрагмента для одной генерации (символов)
+MAX_CHUNK_CHARS = 300
+# Фрагменты короче этого склеиваются со следующими
+MIN_CHUNK_CHARS = 20
+
+# Конец предложения, в том числе с закрывающими кавычками и скобками (до двух) - они остаются
+# в предложении: lookbehind в re только фиксированной длины, поэтому варианты перечислены
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?:(?<=[.!?…])|(?<=[.!?…]["»)\]])|(?<=[.!?…]["»)\]]{2}))\s+')
+CLAUSE_SPLIT_PATTERN = re.compile(r'(?<=[,;:—–])\s+')
+
+
+def _split_long(text, max_chars):
+    """Разбиение слишком длинного предложения по частям фразы, затем по словам (длинное слово - по символам)"""
+    parts = []
+    for clause in CLAUSE_SPLIT_PATTERN.split(text):
+        if len(clause) <= max_chars:
+            parts.append(clause)
+            continue
+
+        current = ""
+        words = []
+        for word in clause.split():
+            words.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+        for word in words:
+            if current and len(current) + 1 + len(word) > max_chars:
+                parts.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        if current:
+            parts.append(current)
+
+    # Склеиваем соседние части, пока они влезают в лимит
+    merged = []
+    for part in parts:
+        if merged and len(merged[-1]) + 1 + len(part) <= max_chars:
+            merged[-1] = f"{merged[-1]} {part}"
+        else:
+            merged.append(part)
+    return merged
+
+
+def split_text_into_chunks(text, max_chars=MAX_CHUNK_CHARS, min_chars=MIN_CHUNK_CHARS):
+    """
+    Разбиение текста на фрагменты по предложениям (и частям фраз для длинных предложений)
+    """
+    text = " ".join(text.split())
+    if not text:
+        return []
+
+    pieces = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            pieces.extend(_split_long(sentence, max_chars))
+        else:
+            pieces.append(sentence)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < min_chars and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
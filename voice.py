@@ -1,66 +1,462 @@
 import os
+import gc
 import time
+import threading
+from contextlib import contextmanager
 import torch
-import torchaudio as ta
 import numpy as np
-from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+from conditioning_cache import conditioning_cache, copy_conds
+from text_utils import split_text_into_chunks
+from batch_inference import DEFAULT_BATCH_SIZE, generate_batch
+from audio_utils import StreamingWavWriter
+from playback import playback_engine
+from progress import ProgressTracker, GenerationCancelled, STAGE_CONDITIONING, supports_progress_hooks
+from metrics import GenerationMetrics
+from performance import PerformanceConfig, INT8_VARIANT, BACKENDS, inference_context, quantize_model
+from backends import apply_backend
 
-class VoiceGenerator:
-    def __init__(self, device="cuda", language="ru"):
-        self.device = torch.device(device if torch.cuda.is_available() else "cpu")
-        self.language = language
-        self.model = None
-        self.is_loaded = False
+# Через сколько секунд простоя модель выгружается из памяти
+MODEL_IDLE_TIMEOUT = 600.0
+# Лимит памяти под все загруженные модели (МБ), None - без ограничений
+MODEL_MEMORY_BUDGET_MB = None
+# Короткие тексты для прогревочного синтеза после загрузки модели
+WARMUP_TEXTS = {"ru": "Привет.", "en": "Hello."}
 
 
-    def load_model(self):
-        """Загрузка модели (вызывается автоматически при первой генерации)"""
-        if self.is_loaded:
+def resolve_device(device="cuda"):
+    """Выбор устройства с откатом на CPU, если CUDA недоступна"""
+    return torch.device(device if torch.cuda.is_available() else "cpu")
+
+
+def model_key(device, variant=""):
+    """Ключ модели в реестре: устройство и вариант (например, int8 или int8+onnx)"""
+    key = str(resolve_device(device))
+    return f"{key}:{variant}" if variant else key
+
+
+def release_memory(device):
+    """Возврат памяти прерванной генерации: промежуточные тензоры и кэш CUDA"""
+    gc.collect()
+    if torch.device(device).type == "cuda" and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def load_pretrained_model(device):
+    """Загрузка многоязычной модели Chatterbox на устройство"""
+    from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+    return ChatterboxMultilingualTTS.from_pretrained(device)
+
+
+class _ModelEntry:
+    """Загруженная модель и ее служебное состояние"""
+
+    def __init__(self, model, size_mb):
+        self.model = model
+        self.size_mb = size_mb
+        # Встроенные условия голоса модели: восстанавливаются для генерации без референса,
+        # так как модель общая и model.conds остаются от предыдущего голоса
+        self.default_conds = copy_conds(getattr(model, "conds", None))
+        self.lock = threading.RLock()
+        self.last_used = time.monotonic()
+        self.users = 0
+        self.warmed = False
+
+
+class ModelRegistry:
+    """
+    Реестр моделей на весь процесс: одна загруженная модель на устройство.
+    Модель выгружается после простоя и при превышении лимита памяти.
+    Загрузка идет вне общей блокировки: остальные потоки, запросившие ту же модель,
+    ждут ее событие в _loading, а обращения к другим моделям не блокируются.
+    """
+
+    def __init__(self, idle_timeout=MODEL_IDLE_TIMEOUT, memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                 loader=load_pretrained_model):
+        self.idle_timeout = idle_timeout
+        self.memory_budget_mb = memory_budget_mb
+        self.loader = loader
+        self._entries = {}
+        self._loading = {}  # ключ модели -> threading.Event загрузки в процессе
+        self._lock = threading.RLock()
+        self._idle_timer = None
+
+    def configure(self, idle_timeout=None, memory_budget_mb=None):
+        """Изменение таймаута простоя и лимита памяти"""
+        with self._lock:
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            if memory_budget_mb is not None:
+                self.memory_budget_mb = memory_budget_mb
+            self._enforce_budget()
+            self._schedule_idle_check()
+
+    def set_loader(self, loader):
+        """Замена функции загрузки модели (например, заглушкой для бенчмарков); выгружает прежние модели"""
+        with self._lock:
+            self.loader = loader
+            self.unload_all()
+
+    def get(self, device, variant=""):
+        """Уже загруженная модель для устройства или None"""
+        with self._lock:
+            entry = self._entries.get(model_key(device, variant))
+            return entry.model if entry else None
+
+    def acquire(self, device, variant=""):
+        """Получение модели для устройства (загружается один раз)"""
+        return self._get_entry(device, variant=variant).model
+
+    @contextmanager
+    def use(self, device, variant=""):
+        """
+        Монопольное использование модели на время генерации.
+        Пока модель используется, она не выгружается.
+        """
+        entry = self._get_entry(device, pin=True, variant=variant)
+        try:
+            with entry.lock:
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+            self._schedule_idle_check()
+
+    def unload(self, device, variant=""):
+        """Принудительная выгрузка модели устройства"""
+        with self._lock:
+            key = model_key(device, variant)
+            entry = self._entries.get(key)
+            if entry and entry.users == 0:
+                self._drop(key)
+
+    def unload_all(self):
+        """Выгрузка всех неиспользуемых моделей"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.users == 0]:
+                self._drop(key)
+
+    def default_conds(self, device, variant=""):
+        """Копия встроенных условий голоса загруженной модели или None"""
+        with self._lock:
+            entry = self._entries.get(model_key(device, variant))
+            return copy_conds(entry.default_conds) if entry else None
+
+    def is_warmed(self, device, variant=""):
+        """Выполнялся ли прогревочный синтез для загруженной модели устройства"""
+        with self._lock:
+            entry = self._entries.get(model_key(device, variant))
+            return entry is not None and entry.warmed
+
+    def mark_warmed(self, device, variant=""):
+        with self._lock:
+            entry = self._entries.get(model_key(device, variant))
+            if entry is not None:
+                entry.warmed = True
+
+    def loaded_devices(self):
+        with self._lock:
+            return list(self._entries)
+
+    def _get_entry(self, device, pin=False, variant=""):
+        torch_device = resolve_device(device)
+        key = model_key(torch_device, variant)
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    if pin:
+                        entry.users += 1
+                    break
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Модель загружает другой поток; при его ошибке загрузка повторяется здесь
+            loading.wait()
+
+        if entry is None:
+            try:
+                entry = _ModelEntry(*self._load(torch_device, variant))
+            finally:
+                with self._lock:
+                    del self._loading[key]
+                    if entry is not None:
+                        entry.last_used = time.monotonic()
+                        if pin:
+                            entry.users += 1
+                        self._entries[key] = entry
+                        self._enforce_budget(keep=key)
+                loading.set()
+
+        self._schedule_idle_check()
+        return entry
+
+    def _load(self, torch_device, variant):
+        """Загрузка модели и применение варианта (int8, бэкенд); возвращает модель и ее размер в МБ"""
+        model = self.loader(torch_device)
+        for part in filter(None, variant.split("+")):
+            if part == INT8_VARIANT:
+                model = quantize_model(model)
+            elif part in BACKENDS:
+                model = apply_backend(model, part, torch_device)
+        return model, self._estimate_size_mb(model)
+
+    @staticmethod
+    def _estimate_size_mb(model):
+        """Оценка объема весов модели в МБ"""
+        total = 0
+        for name in ("t3", "s3gen", "ve"):
+            module = getattr(model, name, None)
+            if isinstance(module, torch.nn.Module):
+                total += sum(p.numel() * p.element_size() for p in module.parameters())
+        return total / (1024 * 1024)
+
+    def _enforce_budget(self, keep=None):
+        """Выгрузка давно не использованных моделей сверх лимита памяти"""
+        if self.memory_budget_mb is None:
             return
 
-        self.model = ChatterboxMultilingualTTS.from_pretrained(self.device)
-        self.is_loaded = True
+        candidates = sorted(
+            (k for k, e in self._entries.items() if k != keep and e.users == 0),
+            key=lambda k: self._entries[k].last_used
+        )
+        while candidates and sum(e.size_mb for e in self._entries.values()) > self.memory_budget_mb:
+            self._drop(candidates.pop(0))
+
+    def _schedule_idle_check(self):
+        with self._lock:
+            if self._idle_timer is not None or not self._entries or not self.idle_timeout:
+                return
+            self._idle_timer = threading.Timer(self.idle_timeout, self._unload_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def _unload_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            now = time.monotonic()
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if entry.users == 0 and now - entry.last_used >= self.idle_timeout:
+                    self._drop(key)
+        self._schedule_idle_check()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        entry.model = None
+        gc.collect()
+        if key.startswith("cuda") and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+# Глобальный реестр для использования во всех потоках и окнах
+model_registry = ModelRegistry()
+
+
+def _to_playback_array(audio):
+    return audio.squeeze().detach().cpu().numpy().astype(np.float32)
+
+
+class AudioStreamPlayer:
+    """
+    Воспроизведение аудио по мере поступления фрагментов через общий playback_engine.
+    Фрагменты копируются в трек движка, поэтому генерация следующих фрагментов
+    не ждет воспроизведения.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.track = playback_engine.play(sample_rate)
 
-    def generate_speech(self, text, reference_file=None):
+    def feed(self, audio):
+        """Добавление фрагмента в очередь воспроизведения"""
+        self.track.feed(_to_playback_array(audio))
+
+    def close(self, wait=False):
+        """Все фрагменты переданы; при wait=True ждет окончания воспроизведения"""
+        self.track.finish()
+        if wait:
+            return self.track.wait()
+        return self.track.error is None
+
+    def stop(self):
+        """Прерывание воспроизведения трека"""
+        playback_engine.skip(self.track)
+
+
+class VoiceGenerator:
+    def __init__(self, device="cuda", language="ru", performance=None):
+        self.device = resolve_device(device)
+        self.language = language
+        # Потоки, inference_mode, bfloat16 и int8 (см. PerformanceConfig)
+        self.performance = performance or PerformanceConfig()
+        self.variant = self.performance.model_variant(self.device)
+        # Метрики последнего вызова генерации (GenerationMetrics)
+        self.last_metrics = None
+
+    @property
+    def model(self):
+        return model_registry.get(self.device, self.variant)
+
+    @property
+    def is_loaded(self):
+        return self.model is not None
+
+    def load_model(self):
         """
-        Основная функция генерации речи
+        Загрузка модели (вызывается автоматически при первой генерации).
+        Возвращает время загрузки в секундах.
         """
-        if not self.is_loaded:
-            self.load_model()
+        start_time = time.perf_counter()
+        model_registry.acquire(self.device, self.variant)
+        return time.perf_counter() - start_time
 
+    def preload(self, reference_file=None, warmup=True):
+        """
+        Подготовка к первой генерации: загрузка модели, условия голоса из кэша
+        и прогревочный синтез (инициализация ядер и выделение памяти), чтобы
+        первая генерация была такой же быстрой, как последующие.
+        """
+        self.load_model()
         if reference_file and not os.path.exists(reference_file):
             reference_file = None
 
-        start_time = time.time()
+        with model_registry.use(self.device, self.variant) as model:
+            self._apply_voice(model, reference_file)
+            if warmup and not model_registry.is_warmed(self.device, self.variant):
+                with inference_context(self.performance, model, self.device):
+                    model.generate(
+                        text=WARMUP_TEXTS.get(self.language, WARMUP_TEXTS["en"]),
+                        language_id=self.language
+                    )
+                model_registry.mark_warmed(self.device, self.variant)
 
+    def _apply_voice(self, model, reference_file):
+        """Условия голоса: из кэша для референса, иначе встроенный голос модели"""
         if reference_file:
-            audio = self.model.generate(
-                text=text,
-                language_id=self.language,
-                audio_prompt_path=reference_file
-            )
+            # Условия голоса берутся из кэша вместо audio_prompt_path
+            model.conds = conditioning_cache.get(model, reference_file)
         else:
-            audio = self.model.generate(
-                text=text,
-                language_id=self.language
-            )
+            model.conds = model_registry.default_conds(self.device, self.variant)
+
+    @property
+    def progress_supported(self):
+        """Доступны ли структурированные события прогресса для загруженной модели"""
+        model = self.model
+        return model is not None and supports_progress_hooks(model)
+
+    def generate_speech(self, text, reference_file=None, on_progress=None, cancel_token=None):
+        """
+        Основная функция генерации речи.
+        on_progress(ProgressEvent) получает этапы генерации и скорость семплирования.
+        cancel_token (CancellationToken) прерывает генерацию на ближайшем шаге
+        с исключением GenerationCancelled.
+        Время по этапам сохраняется в self.last_metrics.
+        """
+        return self._generate(text, reference_file, self._tracker(on_progress, cancel_token=cancel_token))
+
+    def _tracker(self, on_progress, chunk=0, chunks=1, cancel_token=None):
+        synchronize = torch.cuda.synchronize if self.device.type == "cuda" else None
+        return ProgressTracker(on_progress, chunk, chunks, synchronize=synchronize, cancel_token=cancel_token)
+
+    def _generate(self, text, reference_file, tracker):
+        if reference_file and not os.path.exists(reference_file):
+            reference_file = None
+
+        with model_registry.use(self.device, self.variant) as model:
+            start_time = time.time()
+
+            tracker.check_cancelled()
+            tracker.emit(STAGE_CONDITIONING)
+            self._apply_voice(model, reference_file)
 
-        gen_time = time.time() - start_time
-        sr = getattr(self.model, "sr", 24000)
+            # Хуки ставятся под блокировкой модели, поэтому события относятся только к этой генерации
+            cancelled = False
+            try:
+                with tracker.attach(model), inference_context(self.performance, model, self.device):
+                    audio = model.generate(
+                        text=text,
+                        language_id=self.language
+                    )
+            except GenerationCancelled:
+                cancelled = True
+            if cancelled:
+                # Память освобождается после выхода из обработчика, когда кадры генерации уже не нужны
+                release_memory(self.device)
+                raise GenerationCancelled()
+            tracker.finish()
+
+            gen_time = time.time() - start_time
+            sr = getattr(model, "sr", 24000)
+
+        metrics = GenerationMetrics(self.device, self.language, len(text))
+        audio_seconds = audio.shape[-1] / sr if audio is not None else 0.0
+        metrics.add_tracker(tracker, gen_time, audio_seconds)
+        self.last_metrics = metrics
         return audio, sr, gen_time
 
-    def play_audio(self, audio, sample_rate):
-        """Воспроизведение аудио"""
+    def generate_batch(self, texts, reference_file=None, batch_size=DEFAULT_BATCH_SIZE, cancel_token=None):
+        """
+        Пакетная генерация нескольких фрагментов за один проход модели.
+        Фрагменты группируются по длине; аудио возвращается в исходном порядке.
+        """
+        texts = list(texts)
+        if reference_file and not os.path.exists(reference_file):
+            reference_file = None
+
+        with model_registry.use(self.device, self.variant) as model:
+            start_time = time.time()
+
+            self._apply_voice(model, reference_file)
+
+            # Пакетный путь не вызывает t3.inference, поэтому bfloat16 к нему не применяется
+            tracker = self._tracker(None, cancel_token=cancel_token)
+            cancelled = False
+            try:
+                with tracker.attach(model), inference_context(self.performance, model, self.device):
+                    audios = generate_batch(model, texts, self.language, batch_size=batch_size)
+            except GenerationCancelled:
+                cancelled = True
+            if cancelled:
+                release_memory(self.device)
+                raise GenerationCancelled()
+
+            gen_time = time.time() - start_time
+            sr = getattr(model, "sr", 24000)
+
+        metrics = GenerationMetrics(self.device, self.language, sum(len(t) for t in texts))
+        metrics.chunks = len(audios)
+        metrics.generation_time = gen_time
+        metrics.audio_seconds = sum(a.shape[-1] for a in audios if a is not None) / sr
+        self.last_metrics = metrics
+        return audios, sr, gen_time
+
+    def generate_stream(self, text, reference_file=None, on_progress=None, cancel_token=None):
+        """
+        Потоковая генерация: текст делится на предложения, аудио отдается по фрагментам.
+        Возвращает генератор кортежей (индекс, всего, аудио, частота, время генерации).
+        События on_progress содержат номер фрагмента и их общее число;
+        self.last_metrics после каждого фрагмента относится к этому фрагменту.
+        """
+        chunks = split_text_into_chunks(text)
+        for index, chunk in enumerate(chunks):
+            tracker = self._tracker(on_progress, index, len(chunks), cancel_token=cancel_token)
+            audio, sr, gen_time = self._generate(chunk, reference_file, tracker)
+            yield index, len(chunks), audio, sr, gen_time
+
+    def play_audio(self, audio, sample_rate, wait=False):
+        """
+        Постановка аудио в очередь воспроизведения (не блокирует вызывающий поток).
+        При wait=True ждет окончания воспроизведения.
+        """
         if audio is None:
             return False
 
-        import sounddevice as sd
-        wav = audio.squeeze().cpu().numpy().astype(np.float32)
-        wav = wav / (np.max(np.abs(wav)) + 1e-9)
-
-        sd.play(wav, sample_rate)
-        sd.wait()
-        return True
+        track = playback_engine.enqueue(_to_playback_array(audio), sample_rate)
+        return track.wait() if wait else track.error is None
 
     def save_audio(self, audio, sample_rate, filename):
         """Сохранение аудио в файл"""
@@ -71,5 +467,16 @@ class VoiceGenerator:
         if wav.ndim == 1:
             wav = wav.unsqueeze(0)
 
+        import torchaudio as ta
         ta.save(filename, wav, sample_rate)
-        return True
\ No newline at end of file
+        return True
+
+    def open_writer(self, filename, sample_rate, use_mmap=False):
+        """Потоковая запись аудио в файл по фрагментам (см. StreamingWavWriter)"""
+        return StreamingWavWriter(filename, sample_rate, use_mmap=use_mmap)
+
+    def load_audio(self, filename):
+        """Загрузка аудио из файла"""
+        import torchaudio as ta
+        audio, sample_rate = ta.load(filename)
+        return audio, sample_rate
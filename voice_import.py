@@ -0,0 +1,225 @@
+"""
+Импорт голосов: конвертация в WAV и анализ в пуле потоков с отменой
+"""
+import os
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from audio_utils import (get_audio_duration, calculate_voice_accuracy, convert_to_voice_wav,
+                         is_voice_format, optimize_voice_prompt, UnsupportedAudioError)
+from conditioning_cache import conditioning_cache
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.ogg', '.m4a', '.flac', '.aac'}
+FFMPEG_TIMEOUT = 60
+# Суффикс незавершенного файла (не попадает в voices/*.wav)
+PARTIAL_SUFFIX = ".wav.part"
+# Папка с исходными (необрезанными) записями голосов
+ORIGINALS_DIRNAME = "originals"
+
+
+class ImportCancelled(Exception):
+    """Импорт отменен пользователем"""
+
+
+def original_path_for(voice_file):
+    """Путь к исходной записи голоса до оптимизации референса"""
+    voice_file = Path(voice_file)
+    return voice_file.parent / ORIGINALS_DIRNAME / voice_file.name
+
+
+def find_audio_files(folder):
+    """Аудиофайлы в папке (без вложенных папок), отсортированные по имени"""
+    return sorted(
+        (p for p in Path(folder).iterdir() if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS),
+        key=lambda p: p.name.lower()
+    )
+
+
+class VoiceImporter:
+    """
+    Импорт аудиофайлов в voices/.
+    Файлы обрабатываются параллельно (число потоков по числу ядер): декодируются
+    в процессе либо дочерним процессом ffmpeg. Отмена завершает дочерние процессы
+    и удаляет незавершенные файлы.
+    Референс обрезается до лучшего фрагмента оптимальной длительности, исходная
+    запись сохраняется в voices/originals/.
+    """
+
+    def __init__(self, voices_dir, optimal_duration=15.0, max_workers=None, optimize_prompt=True):
+        self.voices_dir = Path(voices_dir)
+        self.optimal_duration = optimal_duration
+        self.optimize_prompt = optimize_prompt
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._reserved = set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Отмена импорта: останавливает все запущенные процессы конвертации"""
+        self._cancelled.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    def import_file(self, file_path, voice_name, on_progress=None):
+        """
+        Импорт одного файла. Возвращает словарь с именем файла, длительностью и точностью.
+        """
+        on_progress = on_progress or (lambda percent: None)
+        self._check_cancelled()
+        on_progress(10)
+
+        target_path = self._reserve_target(voice_name)
+        partial_path = target_path.with_name(target_path.stem + PARTIAL_SUFFIX)
+        trimmed_path = target_path.with_name(target_path.stem + ".trim" + PARTIAL_SUFFIX)
+        original_path = original_path_for(target_path)
+        # Исходная запись перенесена в originals/ - при ошибке ее нужно вернуть и удалить
+        original_saved = False
+        try:
+            self.convert(file_path, partial_path)
+            self._check_cancelled()
+            on_progress(50)
+
+            if self.optimize_prompt and optimize_voice_prompt(partial_path, trimmed_path, self.optimal_duration):
+                original_path.parent.mkdir(exist_ok=True)
+                partial_path.replace(original_path)
+                original_saved = True
+                trimmed_path.replace(partial_path)
+            else:
+                # Прежняя исходная запись голоса с этим именем больше не актуальна
+                original_path.unlink(missing_ok=True)
+            self._check_cancelled()
+            on_progress(60)
+
+            duration = get_audio_duration(partial_path)
+            if duration == 0:
+                raise ValueError("Не удалось определить длительность аудио после конвертации")
+            accuracy, accuracy_text = calculate_voice_accuracy(duration, self.optimal_duration)
+            on_progress(80)
+
+            self._check_cancelled()
+            partial_path.replace(target_path)
+            # Сбрасываем устаревший кэш условий от прежнего голоса с этим именем
+            conditioning_cache.invalidate(target_path)
+        except BaseException:
+            if original_saved:
+                original_path.replace(partial_path)
+            partial_path.unlink(missing_ok=True)
+            trimmed_path.unlink(missing_ok=True)
+            raise
+        finally:
+            with self._lock:
+                self._reserved.discard(target_path.name.lower())
+
+        on_progress(100)
+        return {
+            "file": target_path.name,
+            "duration": duration,
+            "accuracy": accuracy,
+            "accuracy_text": accuracy_text,
+        }
+
+    def import_many(self, items, on_file_progress=None, on_file_done=None):
+        """
+        Параллельный импорт списка (путь, название голоса).
+        on_file_progress(номер, процент), on_file_done(номер, результат или None, ошибка или None).
+        """
+        results = [None] * len(items)
+
+        def run_item(number, file_path, voice_name):
+            progress = (lambda percent: on_file_progress(number, percent)) if on_file_progress else None
+            return self.import_file(file_path, voice_name, progress)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(items), 1))) as pool:
+            futures = {
+                pool.submit(run_item, number, file_path, voice_name): number
+                for number, (file_path, voice_name) in enumerate(items)
+            }
+            for future in as_completed(futures):
+                number = futures[future]
+                error = None
+                try:
+                    results[number] = future.result()
+                except ImportCancelled:
+                    error = "Отменено"
+                except Exception as e:
+                    error = str(e)
+                if on_file_done:
+                    on_file_done(number, results[number], error)
+
+        if self.cancelled:
+            raise ImportCancelled()
+        return results
+
+    def convert(self, input_path, output_path):
+        """
+        Конвертация в WAV 24 кГц моно PCM16 прямо в итоговую папку.
+        Декодирование и ресемплинг выполняются в процессе; ffmpeg запускается
+        только для форматов, которые встроенный декодер не поддерживает.
+        """
+        input_path = Path(input_path)
+
+        # Файл уже в нужном формате - достаточно копии
+        if input_path.suffix.lower() == '.wav' and is_voice_format(input_path):
+            shutil.copy2(input_path, output_path)
+            return
+
+        try:
+            convert_to_voice_wav(input_path, output_path, check_cancelled=self._check_cancelled)
+            return
+        except UnsupportedAudioError:
+            Path(output_path).unlink(missing_ok=True)
+
+        cmd = [
+            'ffmpeg', '-nostdin', '-loglevel', 'error', '-i', str(input_path),
+            '-ac', '1', '-ar', '24000', '-acodec', 'pcm_s16le', '-f', 'wav', '-y',
+            str(output_path)
+        ]
+        self._run_process(cmd)
+
+    def _run_process(self, cmd):
+        """Запуск дочернего процесса с возможностью отмены"""
+        with self._lock:
+            # Под блокировкой, чтобы cancel() не пропустил только что запущенный процесс
+            self._check_cancelled()
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            self._processes.add(process)
+        try:
+            _, stderr = process.communicate(timeout=FFMPEG_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise RuntimeError("Превышено время конвертации")
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+        self._check_cancelled()
+        if process.returncode != 0:
+            message = stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(message[-1] if message else f"ffmpeg завершился с кодом {process.returncode}")
+
+    def _reserve_target(self, voice_name):
+        """Уникальный путь в voices/ с учетом параллельно импортируемых файлов"""
+        with self._lock:
+            target_path = self.voices_dir / f"{voice_name}.wav"
+            counter = 1
+            while target_path.exists() or target_path.name.lower() in self._reserved:
+                target_path = self.voices_dir / f"{voice_name}_{counter}.wav"
+                counter += 1
+            self._reserved.add(target_path.name.lower())
+            return target_path
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise ImportCancelled()
@@ -0,0 +1,121 @@
+"""
+Индекс метаданных библиотеки голосов (длительность, точность, размер, хэш)
+"""
+import os
+import json
+import wave
+import logging
+import threading
+from pathlib import Path
+
+from audio_utils import get_audio_duration, calculate_voice_accuracy
+from conditioning_cache import file_content_hash
+
+INDEX_FILENAME = ".index.json"
+INDEX_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceIndex:
+    """
+    Постоянный индекс голосов в voices/.
+    При пересканировании открываются только файлы с изменившимся mtime или размером.
+    """
+
+    def __init__(self, voices_dir, optimal_duration=15.0):
+        self.voices_dir = Path(voices_dir)
+        self.optimal_duration = optimal_duration
+        self.index_path = self.voices_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def scan(self):
+        """Синхронизация индекса с папкой; возвращает список записей, отсортированный по имени"""
+        with self._lock:
+            known = dict(self._entries)
+
+        # Файлы читаются вне блокировки, чтобы не задерживать get() из UI
+        self.voices_dir.mkdir(exist_ok=True)
+        present = set()
+        updated = {}
+        with os.scandir(self.voices_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.is_file() or not dir_entry.name.lower().endswith(".wav"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                    entry = known.get(dir_entry.name)
+                    if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                        updated[dir_entry.name] = self._build_entry(Path(dir_entry.path), stat)
+                except (wave.Error, EOFError, OSError) as e:
+                    # Поврежденный или удаленный во время сканирования файл не попадает в список,
+                    # остальные голоса индексируются; при следующем сканировании файл проверяется снова
+                    logger.warning("Голос %s пропущен: %s", dir_entry.name, e)
+                    continue
+                present.add(dir_entry.name)
+
+        with self._lock:
+            removed = [name for name in self._entries if name not in present]
+            for name in removed:
+                del self._entries[name]
+            self._entries.update(updated)
+            if updated or removed:
+                self._save()
+            return [dict(self._entries[name]) for name in sorted(self._entries, key=str.lower)]
+
+    def entries(self):
+        """Записи сохраненного индекса без обращения к файлам"""
+        with self._lock:
+            return [dict(self._entries[name]) for name in sorted(self._entries, key=str.lower)]
+
+    def get(self, voice_file):
+        """Запись индекса для файла голоса (с обновлением при изменении файла)"""
+        voice_file = Path(voice_file)
+        with self._lock:
+            stat = voice_file.stat()
+            entry = self._entries.get(voice_file.name)
+            if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                entry = self._entries[voice_file.name] = self._build_entry(voice_file, stat)
+                self._save()
+            return dict(entry)
+
+    def remove(self, voice_file):
+        """Удаление голоса из индекса"""
+        with self._lock:
+            if self._entries.pop(Path(voice_file).name, None) is not None:
+                self._save()
+
+    def _build_entry(self, voice_file, stat):
+        duration = get_audio_duration(voice_file)
+        accuracy, accuracy_text = calculate_voice_accuracy(duration, self.optimal_duration)
+        return {
+            "file": voice_file.name,
+            "name": voice_file.stem,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "duration": duration,
+            "accuracy": accuracy,
+            "accuracy_text": accuracy_text,
+            "sha1": file_content_hash(voice_file),
+        }
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != INDEX_VERSION or data.get("optimal_duration") != self.optimal_duration:
+            return {}
+        return data.get("voices", {})
+
+    def _save(self):
+        tmp_path = self.index_path.with_name(INDEX_FILENAME + ".tmp")
+        data = {"version": INDEX_VERSION, "optimal_duration": self.optimal_duration, "voices": self._entries}
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp_path.replace(self.index_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
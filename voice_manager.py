@@ -1,23 +1,31 @@
 import sys
-import shutil
-import subprocess
+import bisect
 from pathlib import Path
-import tempfile
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QScrollArea, QLabel, QPushButton,
-                             QGridLayout, QMessageBox, QFrame, QFileDialog,
-                             QProgressDialog, QInputDialog)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QIcon, QPixmap
-
-from audio_utils import get_audio_duration, calculate_voice_accuracy, get_voice_accuracy_info
+                             QHBoxLayout, QLabel, QPushButton, QLineEdit,
+                             QMessageBox, QFileDialog, QProgressDialog, QInputDialog,
+                             QListView, QStyle, QStyledItemDelegate, QDialog,
+                             QProgressBar, QListWidget)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QSortFilterProxyModel, QSize, QTimer,
+                          QRectF, QPointF, QEvent)
+from PyQt6.QtGui import (QIcon, QPixmap, QPainter, QColor, QPen, QBrush, QFont,
+                         QLinearGradient, QCursor)
+
+from conditioning_cache import conditioning_cache
+from voice_index import VoiceIndex
+from voice_import import (VoiceImporter, ImportCancelled, AUDIO_EXTENSIONS, find_audio_files,
+                          original_path_for)
 from styles import AppStyles
 
 # Константы для оптимизации
 VOICE_CARD_SIZE = (200, 140)
 ICON_SIZE = 32
 BUTTON_SIZE = 40
+# Задержка перед фоновой загрузкой модели, чтобы окно успело отрисоваться (мс)
+SPECULATIVE_PRELOAD_DELAY_MS = 1000
+CARD_SPACING = 15
 
 
 
@@ -32,185 +40,353 @@ class AudioImportThread(QThread):
         self.voices_dir = voices_dir
         self.voice_name = voice_name
         self.optimal_duration = 15.0
+        self.importer = VoiceImporter(voices_dir, self.optimal_duration)
+
+    def cancel(self):
+        """Отмена импорта с остановкой конвертации и удалением незавершенного файла"""
+        self.importer.cancel()
 
     def run(self):
-        self.progress_updated.emit(10)
-        output_path = self.convert_to_wav(self.file_path)
-        
-        self.progress_updated.emit(30)
-        duration = self.get_audio_duration(output_path)
-        
-        if duration == 0:
-            self.import_failed.emit("Не удалось определить длительность аудио после конвертации")
+        try:
+            result = self.importer.import_file(self.file_path, self.voice_name, self.progress_updated.emit)
+        except ImportCancelled:
+            return
+        except Exception as e:
+            self.import_failed.emit(str(e))
             return
 
-        self.progress_updated.emit(50)
-        accuracy, accuracy_text = self.calculate_accuracy(duration)
-        
-        self.progress_updated.emit(80)
-        final_path = self.copy_to_voices(output_path)
-        
-        self.progress_updated.emit(100)
-        self.import_finished.emit(final_path.name, duration, accuracy, accuracy_text)
-
-    def get_audio_duration(self, file_path):
-        return get_audio_duration(file_path)
-
-    def calculate_accuracy(self, duration):
-        return calculate_voice_accuracy(duration, self.optimal_duration)
-
-    def convert_to_wav(self, input_path):
-        input_path = Path(input_path)
-
-        if input_path.suffix.lower() == '.wav':
-            return input_path
+        self.import_finished.emit(result["file"], result["duration"], result["accuracy"], result["accuracy_text"])
 
-        temp_dir = tempfile.gettempdir()
-        output_path = Path(temp_dir) / f"converted_{self.voice_name}.wav"
 
-        cmd = [
-            'ffmpeg', '-i', str(input_path),
-            '-ac', '1', '-ar', '24000', '-acodec', 'pcm_s16le', '-y',
-            str(output_path)
-        ]
+class BulkImportThread(QThread):
+    """Поток пакетного импорта файлов в пуле потоков конвертации"""
+    file_progress = pyqtSignal(int, int)  # номер файла, процент
+    file_finished = pyqtSignal(int, str, str)  # номер файла, имя в voices/, ошибка
+    import_finished = pyqtSignal(bool)  # отменен ли импорт
 
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=60)
-        return output_path
+    def __init__(self, file_paths, voices_dir):
+        super().__init__()
+        self.file_paths = [Path(p) for p in file_paths]
+        self.importer = VoiceImporter(voices_dir)
 
-    def copy_to_voices(self, source_path):
-        source_path = Path(source_path)
-        target_path = self.voices_dir / f"{self.voice_name}.wav"
+    def cancel(self):
+        self.importer.cancel()
 
-        counter = 1
-        original_name = self.voice_name
-        while target_path.exists():
-            target_path = self.voices_dir / f"{original_name}_{counter}.wav"
-            counter += 1
+    def run(self):
+        items = [(path, path.stem) for path in self.file_paths]
+        try:
+            self.importer.import_many(
+                items,
+                on_file_progress=self.file_progress.emit,
+                on_file_done=lambda number, result, error: self.file_finished.emit(
+                    number, result["file"] if result else "", error or ""
+                )
+            )
+        except ImportCancelled:
+            self.import_finished.emit(True)
+            return
+        self.import_finished.emit(False)
 
-        shutil.copy2(source_path, target_path)
-        return target_path
 
+class BulkImportDialog(QDialog):
+    """Прогресс пакетного импорта: общий и по каждому файлу"""
 
-class VoiceCard(QFrame):
-    def __init__(self, voice_file, index, accuracy=100.0, accuracy_text="100%"):
-        super().__init__()
-        self.voice_file = voice_file
-        self.index = index
-        self.accuracy = accuracy
-        self.accuracy_text = accuracy_text
+    def __init__(self, parent, file_paths):
+        super().__init__(parent)
+        self.file_paths = [Path(p) for p in file_paths]
+        self.progress = [0] * len(self.file_paths)
+        self.finished_count = 0
+        self.failed_count = 0
         self.setup_ui()
 
     def setup_ui(self):
-        self.setFixedSize(*VOICE_CARD_SIZE)
-
-        colors = AppStyles.get_voice_card_colors(self.accuracy)
-        self.setStyleSheet(AppStyles.get_voice_card_style(colors))
+        self.setWindowTitle("Импорт голосов")
+        self.setModal(True)
+        self.resize(480, 420)
 
         layout = QVBoxLayout()
-        layout.setContentsMargins(10, 10, 10, 10)
-
-        # Верхняя панель с номером и кнопкой удаления
-        top_layout = QHBoxLayout()
-
-        icon_label = QLabel(str(self.index + 1))
-        icon_label.setFixedSize(ICON_SIZE, ICON_SIZE)
-        icon_label.setStyleSheet("""
-            background: rgba(255, 255, 255, 0.9);
-            border-radius: 16px;
-            color: #2D3748;
-            font-size: 14px;
-            font-weight: bold;
-        """)
-        icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # Кнопка удаления (чёрный крестик)
-        delete_btn = QPushButton("×")
-        delete_btn.setFixedSize(ICON_SIZE, ICON_SIZE)
-        delete_btn.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                border: none;
-                color: #2D3748;
-                font-size: 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                color: #E53E3E;
-            }
-        """)
-        delete_btn.clicked.connect(self.delete_voice)
 
-        top_layout.addWidget(icon_label)
-        top_layout.addStretch()
-        top_layout.addWidget(delete_btn)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
 
-        # Название файла
-        name_label = QLabel(self.voice_file.stem)
-        name_label.setStyleSheet("color: white; font-size: 14px; font-weight: bold;")
-        name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        name_label.setWordWrap(True)
+        self.total_bar = QProgressBar()
+        self.total_bar.setRange(0, 100 * len(self.file_paths))
+        self.total_bar.setStyleSheet(AppStyles.get_progress_bar_style())
+        layout.addWidget(self.total_bar)
 
-        # Информация о файле
-        file_size = self.voice_file.stat().st_size / 1024
-        duration = get_audio_duration(self.voice_file)
-        info_text = f"{file_size:.1f} KB | {duration:.1f} сек"
+        self.files_list = QListWidget()
+        for path in self.file_paths:
+            self.files_list.addItem(f"{path.name} — в очереди")
+        layout.addWidget(self.files_list, 1)
 
-        info_label = QLabel(info_text)
-        info_label.setStyleSheet("color: #E2E8F0; font-size: 11px;")
-        info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.cancel_btn = QPushButton("Отмена")
+        self.cancel_btn.setStyleSheet(AppStyles.get_button_style("secondary"))
+        layout.addWidget(self.cancel_btn, 0, Qt.AlignmentFlag.AlignRight)
 
-        # Точность голоса
-        accuracy_type = "Точность" if self.accuracy <= 100 else "Превышение"
-        accuracy_label = QLabel(f"{accuracy_type}: {self.accuracy_text}")
-        accuracy_label.setStyleSheet("""
-            color: #FFFFFF; font-size: 12px; font-weight: bold; 
-            background: rgba(0, 0, 0, 0.3); border-radius: 8px; padding: 2px 6px;
-        """)
-        accuracy_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setLayout(layout)
+        self.update_summary()
 
-        layout.addLayout(top_layout)
-        layout.addWidget(name_label)
-        layout.addWidget(info_label)
-        layout.addWidget(accuracy_label)
+    def update_summary(self):
+        self.total_bar.setValue(sum(self.progress))
+        self.summary_label.setText(
+            f"Обработано: {self.finished_count} из {len(self.file_paths)}"
+            + (f", ошибок: {self.failed_count}" if self.failed_count else "")
+        )
 
-        self.setLayout(layout)
+    def on_file_progress(self, number, percent):
+        self.progress[number] = percent
+        self.files_list.item(number).setText(f"{self.file_paths[number].name} — {percent}%")
+        self.update_summary()
+
+    def on_file_finished(self, number, filename, error):
+        self.progress[number] = 100
+        self.finished_count += 1
+        if error:
+            self.failed_count += 1
+            self.files_list.item(number).setText(f"{self.file_paths[number].name} — ошибка: {error}")
+        else:
+            self.files_list.item(number).setText(f"{self.file_paths[number].name} — готово ({filename})")
+        self.update_summary()
+
+    def on_import_finished(self, cancelled):
+        self.cancel_btn.setText("Закрыть")
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.clicked.disconnect()
+        self.cancel_btn.clicked.connect(self.accept)
+        if cancelled:
+            self.summary_label.setText(self.summary_label.text() + " — импорт отменен")
+
+
+class VoiceListModel(QAbstractListModel):
+    """Модель списка голосов на основе записей VoiceIndex"""
+
+    InfoRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._voices = []
+        self._keys = []
+        self._rows = {}  # файл -> номер строки
+
+    @staticmethod
+    def _sort_key(info):
+        return info["name"].lower(), info["file"]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._voices)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        info = self._voices[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return info["name"]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{info['file']}\n{info['size'] / 1024:.1f} KB | {info['duration']:.1f} сек"
+        if role == self.InfoRole:
+            return info
+        return None
+
+    def set_voices(self, voices):
+        """
+        Синхронизация с новым списком. Новые голоса (первое заполнение, пересканирование)
+        загружаются одним сбросом модели с сортировкой за O(n log n); без новых голосов
+        удаляются и обновляются только отличающиеся строки.
+        """
+        new_by_file = {info["file"]: info for info in voices}
+        if any(file_name not in self._rows for file_name in new_by_file):
+            self.beginResetModel()
+            self._voices = sorted(new_by_file.values(), key=self._sort_key)
+            self._keys = [self._sort_key(info) for info in self._voices]
+            self._reindex()
+            self.endResetModel()
+            return
 
+        for row in reversed(range(len(self._voices))):
+            if self._voices[row]["file"] not in new_by_file:
+                self._remove_row(row)
+
+        for file_name, info in new_by_file.items():
+            row = self._rows[file_name]
+            if self._voices[row] == info:
+                continue
+            if self._sort_key(info) != self._keys[row]:
+                # Изменилось имя - строка переезжает на новое место
+                self.add_voice(info)
+            else:
+                self._voices[row] = info
+                model_index = self.index(row)
+                self.dataChanged.emit(model_index, model_index)
+
+    def add_voice(self, info):
+        """Вставка голоса с сохранением сортировки по имени"""
+        existing = self._rows.get(info["file"])
+        if existing is not None:
+            self._remove_row(existing)
+
+        key = self._sort_key(info)
+        row = bisect.bisect_left(self._keys, key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._voices.insert(row, info)
+        self._keys.insert(row, key)
+        self._reindex(row)
+        self.endInsertRows()
+
+    def remove_voice(self, file_name):
+        row = self._rows.get(file_name)
+        if row is not None:
+            self._remove_row(row)
+
+    def _remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[self._voices[row]["file"]]
+        del self._voices[row]
+        del self._keys[row]
+        self._reindex(row)
+        self.endRemoveRows()
+
+    def _reindex(self, start=0):
+        """Обновление номеров строк начиная со start (после вставки или удаления)"""
+        if start == 0:
+            self._rows = {}
+        for row in range(start, len(self._voices)):
+            self._rows[self._voices[row]["file"]] = row
+
+
+class VoiceCardDelegate(QStyledItemDelegate):
+    """Отрисовка карточки голоса без создания виджетов для каждой строки"""
+
+    voice_activated = pyqtSignal(QModelIndex)
+    delete_requested = pyqtSignal(QModelIndex)
+
+    def sizeHint(self, option, index):
+        return QSize(*VOICE_CARD_SIZE)
+
+    def _card_rect(self, option):
+        rect = QRectF(option.rect)
+        width, height = VOICE_CARD_SIZE
+        return QRectF(rect.center().x() - width / 2, rect.center().y() - height / 2, width, height)
+
+    def _delete_rect(self, card_rect):
+        return QRectF(card_rect.right() - 10 - ICON_SIZE, card_rect.top() + 10, ICON_SIZE, ICON_SIZE)
+
+    def paint(self, painter, option, index):
+        info = index.data(VoiceListModel.InfoRole)
+        if info is None:
+            return
 
-    def delete_voice(self):
-        """Удаление голоса с подтверждением на русском"""
-        msg_box = QMessageBox()
-        msg_box.setWindowTitle("Подтверждение удаления")
-        msg_box.setText(f'Вы уверены, что хотите удалить голос "{self.voice_file.stem}"?')
-        msg_box.setIcon(QMessageBox.Icon.Question)
+        card = self._card_rect(option)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        colors = [QColor(c) for c in AppStyles.get_voice_card_colors(info["accuracy"])]
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Фон карточки с градиентом, как в стиле AppStyles.get_voice_card_style
+        gradient = QLinearGradient(card.topLeft(), card.bottomLeft())
+        gradient.setColorAt(0, colors[2] if hovered else colors[0])
+        gradient.setColorAt(1, colors[0] if hovered else colors[1])
+        painter.setBrush(QBrush(gradient))
+        painter.setPen(QPen(QColor("#FFFFFF") if hovered else colors[2], 2))
+        painter.drawRoundedRect(card.adjusted(1, 1, -1, -1), 12, 12)
+
+        # Номер голоса
+        badge = QRectF(card.left() + 10, card.top() + 10, ICON_SIZE, ICON_SIZE)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(255, 255, 255, 230))
+        painter.drawEllipse(badge)
+        painter.setPen(QColor("#2D3748"))
+        painter.setFont(self._font(14, bold=True))
+        painter.drawText(badge, Qt.AlignmentFlag.AlignCenter, str(index.row() + 1))
+
+        # Кнопка удаления (чёрный крестик, красный при наведении)
+        delete_rect = self._delete_rect(card)
+        cursor_pos = option.widget.mapFromGlobal(QCursor.pos()) if option.widget else None
+        delete_hovered = cursor_pos is not None and delete_rect.contains(QPointF(cursor_pos))
+        painter.setPen(QColor("#E53E3E" if delete_hovered else "#2D3748"))
+        painter.setFont(self._font(20, bold=True))
+        painter.drawText(delete_rect, Qt.AlignmentFlag.AlignCenter, "×")
 
-        # Создаем кастомные кнопки на русском
-        yes_button = msg_box.addButton("Да", QMessageBox.ButtonRole.YesRole)
-        no_button = msg_box.addButton("Нет", QMessageBox.ButtonRole.NoRole)
-        msg_box.setDefaultButton(no_button)
+        # Название файла
+        painter.setPen(QColor("#FFFFFF"))
+        painter.setFont(self._font(14, bold=True))
+        name_rect = QRectF(card.left() + 10, card.top() + 45, card.width() - 20, 38)
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, info["name"])
 
-        msg_box.exec()
+        # Информация о файле
+        painter.setPen(QColor("#E2E8F0"))
+        painter.setFont(self._font(11))
+        info_rect = QRectF(card.left() + 10, card.top() + 84, card.width() - 20, 18)
+        painter.drawText(info_rect, Qt.AlignmentFlag.AlignCenter,
+                         f"{info['size'] / 1024:.1f} KB | {info['duration']:.1f} сек")
 
-        if msg_box.clickedButton() == yes_button:
-            # Удаляем файл
-            self.voice_file.unlink()
-            # Удаляем карточку из интерфейса
-            self.setParent(None)
-            self.deleteLater()
+        # Точность голоса
+        accuracy_type = "Точность" if info["accuracy"] <= 100 else "Превышение"
+        painter.setFont(self._font(12, bold=True))
+        accuracy_text = f"{accuracy_type}: {info['accuracy_text']}"
+        text_width = painter.fontMetrics().horizontalAdvance(accuracy_text) + 12
+        pill = QRectF(card.center().x() - text_width / 2, card.top() + 106, text_width, 22)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 77))
+        painter.drawRoundedRect(pill, 8, 8)
+        painter.setPen(QColor("#FFFFFF"))
+        painter.drawText(pill, Qt.AlignmentFlag.AlignCenter, accuracy_text)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            card = self._card_rect(option)
+            position = event.position()
+            if self._delete_rect(card).contains(position):
+                self.delete_requested.emit(index)
+                return True
+            if card.contains(position):
+                self.voice_activated.emit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    @staticmethod
+    def _font(pixel_size, bold=False):
+        font = QFont()
+        font.setPixelSize(pixel_size)
+        font.setBold(bold)
+        return font
+
+
+class VoiceScanThread(QThread):
+    """Фоновое пересканирование папки голосов"""
+
+    scan_finished = pyqtSignal(list)
+
+    def __init__(self, voice_index):
+        super().__init__()
+        self.voice_index = voice_index
 
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            # Закрываем текущее окно и открываем окно генерации
-            parent_window = self.window()
-            if hasattr(parent_window, 'start_generation'):
-                parent_window.start_generation(self.voice_file)
+    def run(self):
+        self.scan_finished.emit(self.voice_index.scan())
 
 
 class VoiceManagerWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.voices_dir = Path("voices")
+        self.voices_dir.mkdir(exist_ok=True)
+        self.voice_index = VoiceIndex(self.voices_dir)
+        self.scan_thread = None
+        self.rescan_pending = False
         self.setup_ui()
+        # Сразу показываем голоса из сохраненного индекса, папку пересканируем в фоне
+        self.voice_model.set_voices(self.voice_index.entries())
+        self.update_status()
         self.load_voices()
+        # Пока пользователь выбирает голос, модель загружается и прогревается в фоне
+        QTimer.singleShot(SPECULATIVE_PRELOAD_DELAY_MS, self.start_speculative_preload)
+
+    def start_speculative_preload(self):
+        from loading_screen import start_speculative_preload
+        start_speculative_preload()
 
     def setup_ui(self):
         self.setWindowTitle("Менеджер голосов")
@@ -262,6 +438,25 @@ class VoiceManagerWindow(QMainWindow):
         add_btn.clicked.connect(self.import_voice)
         add_btn.setToolTip("Добавить новый голос")
 
+        # Кнопка импорта всей папки
+        folder_btn = QPushButton("📁")
+        folder_btn.setFixedSize(BUTTON_SIZE, BUTTON_SIZE)
+        folder_btn.setStyleSheet("""
+            QPushButton {
+                background: transparent;
+                border: none;
+                font-size: 20px;
+                padding: 0px;
+                margin: 0px;
+            }
+            QPushButton:hover {
+                background: rgba(0, 0, 0, 0.08);
+                border-radius: 20px;
+            }
+        """)
+        folder_btn.clicked.connect(self.import_folder)
+        folder_btn.setToolTip("Импортировать все аудиофайлы из папки")
+
         # Название
         title_label = QLabel("Менеджер голосов")
         title_label.setStyleSheet("""
@@ -300,20 +495,51 @@ class VoiceManagerWindow(QMainWindow):
         refresh_btn.setToolTip("Обновить список")
 
         header_layout.addWidget(add_btn)
+        header_layout.addWidget(folder_btn)
         header_layout.addStretch()
+        # Поиск по названию голоса
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск голоса...")
+        self.search_edit.setFixedWidth(220)
+        self.search_edit.setStyleSheet(AppStyles.get_line_edit_style())
+        self.search_edit.textChanged.connect(self.on_search_changed)
+
         header_layout.addWidget(title_label)
         header_layout.addStretch()
+        header_layout.addWidget(self.search_edit)
         header_layout.addWidget(refresh_btn)
 
         header_widget.setLayout(header_layout)
 
-        # Область с карточками
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setStyleSheet("""
-            QScrollArea { 
+        # Список карточек: отрисовываются только видимые элементы
+        self.voice_model = VoiceListModel(self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.voice_model)
+        self.proxy_model.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+        self.card_delegate = VoiceCardDelegate(self)
+        self.card_delegate.voice_activated.connect(self.on_voice_activated)
+        self.card_delegate.delete_requested.connect(self.on_delete_requested)
+
+        self.voices_view = QListView()
+        self.voices_view.setModel(self.proxy_model)
+        self.voices_view.setItemDelegate(self.card_delegate)
+        self.voices_view.setViewMode(QListView.ViewMode.IconMode)
+        self.voices_view.setFlow(QListView.Flow.LeftToRight)
+        self.voices_view.setWrapping(True)
+        self.voices_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.voices_view.setMovement(QListView.Movement.Static)
+        self.voices_view.setUniformItemSizes(True)
+        self.voices_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.voices_view.setGridSize(QSize(VOICE_CARD_SIZE[0] + CARD_SPACING, VOICE_CARD_SIZE[1] + CARD_SPACING))
+        self.voices_view.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.voices_view.setMouseTracking(True)
+        self.voices_view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.voices_view.setStyleSheet("""
+            QListView { 
                 border: none; 
                 background: #F7FAFC; 
+                padding: 12px;
             }
             QScrollBar:vertical { 
                 background: #EDF2F7; 
@@ -330,14 +556,18 @@ class VoiceManagerWindow(QMainWindow):
             }
         """)
 
-        self.cards_widget = QWidget()
-        self.cards_layout = QGridLayout()
-        self.cards_layout.setSpacing(15)
-        self.cards_layout.setContentsMargins(20, 20, 20, 20)
-        self.cards_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.cards_widget.setLayout(self.cards_layout)
-
-        scroll_area.setWidget(self.cards_widget)
+        self.empty_label = QLabel("Пока что здесь пусто\n\nНажмите + чтобы добавить первый голос")
+        self.empty_label.setStyleSheet("""
+            color: #718096; 
+            font-size: 16px; 
+            padding: 60px; 
+            margin: 20px;
+            background: #F7FAFC; 
+            border: 2px dashed #CBD5E0; 
+            border-radius: 12px;
+        """)
+        self.empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.empty_label.setVisible(False)
 
         # Статус бар
         self.status_label = QLabel("Готов к работе")
@@ -352,20 +582,29 @@ class VoiceManagerWindow(QMainWindow):
         self.status_label.setFixedHeight(20)
 
         main_layout.addWidget(header_widget)
-        main_layout.addWidget(scroll_area, 1)
+        main_layout.addWidget(self.voices_view, 1)
+        main_layout.addWidget(self.empty_label, 1)
         main_layout.addWidget(self.status_label)
 
         central_widget.setLayout(main_layout)
 
     def import_voice(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Выберите аудиофайл", "",
-            "Аудиофайлы (*.mp3 *.wav *.ogg *.m4a *.flac *.aac);;Все файлы (*)"
+        patterns = " ".join(f"*{ext}" for ext in sorted(AUDIO_EXTENSIONS))
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Выберите аудиофайлы", "",
+            f"Аудиофайлы ({patterns});;Все файлы (*)"
         )
 
-        if not file_path:
+        if not file_paths:
             return
 
+        # Несколько файлов импортируются пакетно под своими именами
+        if len(file_paths) > 1:
+            self.start_bulk_import(file_paths)
+            return
+
+        file_path = file_paths[0]
+
         voice_name, ok = QInputDialog.getText(
             self, 'Название голоса', 'Введите название для этого голоса:',
             text=Path(file_path).stem
@@ -384,11 +623,49 @@ class VoiceManagerWindow(QMainWindow):
         self.progress_dialog = QProgressDialog("Импорт аудио...", "Отмена", 0, 100, self)
         self.progress_dialog.setWindowTitle("Импорт голоса")
         self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.canceled.connect(self.import_thread.terminate)
+        self.progress_dialog.canceled.connect(self.import_thread.cancel)
         self.progress_dialog.show()
 
         self.import_thread.start()
 
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Выберите папку с аудиофайлами")
+        if not folder:
+            return
+
+        file_paths = find_audio_files(folder)
+        if not file_paths:
+            QMessageBox.information(self, "Импорт", "В выбранной папке нет аудиофайлов")
+            return
+
+        self.start_bulk_import(file_paths)
+
+    def start_bulk_import(self, file_paths):
+        """Пакетный импорт: файлы конвертируются параллельно, карточки добавляются по мере готовности"""
+        self.bulk_import_thread = BulkImportThread(file_paths, self.voices_dir)
+        self.bulk_import_dialog = BulkImportDialog(self, file_paths)
+
+        self.bulk_import_thread.file_progress.connect(self.bulk_import_dialog.on_file_progress)
+        self.bulk_import_thread.file_finished.connect(self.bulk_import_dialog.on_file_finished)
+        self.bulk_import_thread.file_finished.connect(self.on_bulk_file_imported)
+        self.bulk_import_thread.import_finished.connect(self.bulk_import_dialog.on_import_finished)
+        self.bulk_import_dialog.cancel_btn.clicked.connect(self.cancel_bulk_import)
+        self.bulk_import_dialog.rejected.connect(self.cancel_bulk_import)
+
+        self.bulk_import_thread.start()
+        self.bulk_import_dialog.exec()
+
+    def cancel_bulk_import(self):
+        if self.bulk_import_thread.isRunning():
+            self.bulk_import_dialog.cancel_btn.setEnabled(False)
+            self.bulk_import_dialog.cancel_btn.setText("Отмена...")
+            self.bulk_import_thread.cancel()
+
+    def on_bulk_file_imported(self, number, filename, error):
+        if filename:
+            self.voice_model.add_voice(self.voice_index.get(self.voices_dir / filename))
+            self.update_status()
+
     def on_import_progress(self, value):
         if hasattr(self, 'progress_dialog'):
             self.progress_dialog.setValue(value)
@@ -410,7 +687,9 @@ class VoiceManagerWindow(QMainWindow):
         """
 
         QMessageBox.information(self, "Импорт завершен", message)
-        self.load_voices()
+        # Добавляем только новый голос вместо полной перестройки списка
+        self.voice_model.add_voice(self.voice_index.get(self.voices_dir / filename))
+        self.update_status()
 
     def on_import_failed(self, error_message):
         if hasattr(self, 'progress_dialog'):
@@ -419,44 +698,79 @@ class VoiceManagerWindow(QMainWindow):
         QMessageBox.critical(self, "Ошибка импорта", f"Не удалось импортировать аудио:\n{error_message}")
 
     def load_voices(self):
-        for i in reversed(range(self.cards_layout.count())):
-            widget = self.cards_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
-        self.voices_dir.mkdir(exist_ok=True)
-
-        voice_files = list(self.voices_dir.glob("*.wav"))
-
-        if not voice_files:
-            self.show_empty_message()
+        """Фоновое пересканирование папки; изменения применяются к модели построчно"""
+        if self.scan_thread and self.scan_thread.isRunning():
+            self.rescan_pending = True
             return
 
-        for i, voice_file in enumerate(voice_files):
-            accuracy, accuracy_text = self.calculate_voice_accuracy(voice_file)
-            
-            row, col = i // 4, i % 4
-            voice_card = VoiceCard(voice_file, i, accuracy, accuracy_text)
-            self.cards_layout.addWidget(voice_card, row, col)
+        self.status_label.setText("Обновление списка...")
+        self.scan_thread = VoiceScanThread(self.voice_index)
+        self.scan_thread.scan_finished.connect(self.on_scan_finished)
+        self.scan_thread.start()
 
-        self.status_label.setText(f"Голосов: {len(voice_files)}")
+    def on_scan_finished(self, voices):
+        self.voice_model.set_voices(voices)
+        self.update_status()
+        if self.rescan_pending:
+            self.rescan_pending = False
+            self.load_voices()
 
     def calculate_voice_accuracy(self, voice_file):
-        return get_voice_accuracy_info(voice_file)
+        info = self.voice_index.get(voice_file)
+        return info["accuracy"], info["accuracy_text"]
+
+    def on_search_changed(self, text):
+        self.proxy_model.setFilterFixedString(text.strip())
+        self.update_status()
+
+    def update_status(self):
+        """Обновление строки статуса и пустого состояния"""
+        total = self.voice_model.rowCount()
+        shown = self.proxy_model.rowCount()
+
+        self.empty_label.setVisible(total == 0)
+        self.voices_view.setVisible(total > 0)
+
+        if total == 0:
+            self.status_label.setText("Нет голосов")
+        elif shown != total:
+            self.status_label.setText(f"Голосов: {shown} из {total}")
+        else:
+            self.status_label.setText(f"Голосов: {total}")
+
+    def on_voice_activated(self, proxy_index):
+        info = proxy_index.data(VoiceListModel.InfoRole)
+        if info:
+            self.start_generation(self.voices_dir / info["file"])
+
+    def on_delete_requested(self, proxy_index):
+        info = proxy_index.data(VoiceListModel.InfoRole)
+        if info:
+            self.delete_voice(self.voices_dir / info["file"])
+
+    def delete_voice(self, voice_file):
+        """Удаление голоса с подтверждением на русском"""
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Подтверждение удаления")
+        msg_box.setText(f'Вы уверены, что хотите удалить голос "{voice_file.stem}"?')
+        msg_box.setIcon(QMessageBox.Icon.Question)
 
-    def show_empty_message(self):
-        empty_label = QLabel("Пока что здесь пусто\n\nНажмите + чтобы добавить первый голос")
-        empty_label.setStyleSheet("""
-            color: #718096; 
-            font-size: 16px; 
-            padding: 60px; 
-            background: #F7FAFC; 
-            border: 2px dashed #CBD5E0; 
-            border-radius: 12px;
-        """)
-        empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.cards_layout.addWidget(empty_label, 0, 0, 1, 4)
-        self.status_label.setText("Нет голосов")
+        # Создаем кастомные кнопки на русском
+        yes_button = msg_box.addButton("Да", QMessageBox.ButtonRole.YesRole)
+        no_button = msg_box.addButton("Нет", QMessageBox.ButtonRole.NoRole)
+        msg_box.setDefaultButton(no_button)
+
+        msg_box.exec()
+
+        if msg_box.clickedButton() == yes_button:
+            # Удаляем файл, исходную запись, кэш условий и запись индекса
+            voice_file.unlink(missing_ok=True)
+            original_path_for(voice_file).unlink(missing_ok=True)
+            conditioning_cache.invalidate(voice_file)
+            self.voice_index.remove(voice_file)
+            # Удаляем карточку из списка
+            self.voice_model.remove_voice(voice_file.name)
+            self.update_status()
 
     def start_generation(self, voice_file):
         """Запуск окна генерации с выбранным голосом"""
@@ -469,8 +783,9 @@ class VoiceManagerWindow(QMainWindow):
         # Скрываем основное окно
         self.hide()
         
-        # Запускаем поток загрузки
-        self.loading_worker = SimpleLoadingWorker()
+        # Запускаем поток загрузки: модель, прогрев и условия выбранного голоса
+        self.loading_worker = SimpleLoadingWorker(voice_file)
+        self.loading_worker.status_changed.connect(self.loading_window.set_status)
         self.loading_worker.loading_finished.connect(self.on_loading_finished)
         self.loading_worker.start()
         